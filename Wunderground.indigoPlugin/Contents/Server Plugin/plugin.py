@@ -71,21 +71,15 @@ https://github.com/DaveL17/WUnderground/blob/master/LICENSE
 
 # Built-in modules
 import datetime as dt
+import os
 import pytz
 import simplejson
-import socket
 import sys
+import threading
 import time
 import traceback
 
-try:
-    import requests
-except ImportError:
-    import urllib
-    import urllib2
-
 # Third-party modules
-from DLFramework import indigoPluginUpdateChecker
 try:
     import indigo
 except ImportError:
@@ -98,6 +92,19 @@ except ImportError:
 
 # My modules
 import DLFramework.DLFramework as Dave
+import wuCache
+import wuColumns
+import wuDecode
+import wuFetch
+import wuFormat
+import wuImage
+import wuLocation
+import wuPath
+import wuRate
+import wuProject
+import wuStates
+import wuTransport
+import wuUpdate
 
 # =================================== HEADER ==================================
 
@@ -106,21 +113,29 @@ __copyright__ = Dave.__copyright__
 __license__   = Dave.__license__
 __build__     = Dave.__build__
 __title__ = "WUnderground Plugin for Indigo Home Control"
-__version__ = "6.0.08"
+__version__ = "6.0.09"
 
 # =============================================================================
 
 kDefaultPluginPrefs = {
     u'alertLogging': False,           # Write severe weather alerts to the log?
     u'apiKey': "",                    # WU requires the api key.
+    u'budgetCallsLeft': 500,          # Calls left today (call budget planner.)
+    u'budgetInterval': 15,            # Planned minutes between downloads of each location (call budget planner.)
+    u'budgetLocations': 0,            # Locations downloaded each refresh (call budget planner.)
     u'callCounter': 500,              # WU call limit based on UW plan.
+    u'callQuotas': u"{}",             # Calls made today, by API key (see wuRate.)
+    u'callsPerMinute': 10,            # WU per-minute call limit based on WU plan.
     u'dailyCallCounter': 0,           # Number of API calls today.
     u'dailyCallDay': '1970-01-01',    # API call counter date.
     u'dailyCallLimitReached': False,  # Has the daily call limit been reached?
     u'downloadInterval': 900,         # Frequency of weather updates.
     u'itemListTempDecimal': 1,        # Precision for Indigo Item List.
     u'language': "EN",                # Language for WU text.
+    u'maxDownloadThreads': 4,         # Number of locations downloaded at the same time.
+    u'maxImageThreads': 2,            # Number of images downloaded at the same time.
     u'noAlertLogging': False,         # Suppresses "no active alerts" logging.
+    u'projectWeatherData': False,     # Keep only the parts of each download that devices use?
     u'showDebugInfo': False,          # Verbose debug logging?
     u'showDebugLevel': 1,             # Low, Medium or High debug output.
     u'uiDateFormat': u"DD-MM-YYYY",   # Preferred date format string.
@@ -129,9 +144,40 @@ kDefaultPluginPrefs = {
     u'uiTimeFormat': u"military",     # Preferred time format string.
     u'uiWindDecimal': 1,              # Precision for Indigo UI display (wind).
     u'updaterEmail': "",              # Email to notify of plugin updates.
-    u'updaterEmailsEnabled': False    # Notification of plugin updates wanted.
+    u'updaterEmailsEnabled': False,   # Notification of plugin updates wanted.
+    u'updaterETag': "",               # ETag of the last version file download.
+    u'updaterLastModified': "",       # Last-Modified of the last version file download.
+    u'updaterVersionFile': ""         # Last version file downloaded.
 }
 
+# Weather Underground API features consumed by each device model. Only the
+# features used by at least one enabled device at a location are requested.
+# Every parsed device needs 'conditions' for the observation epoch and the
+# station ID.
+kModelFeatures = {
+    u'Almanac':                       ('conditions', 'almanac'),
+    u'Astronomy':                     ('conditions', 'astronomy'),
+    u'Hourly Forecast':               ('conditions', 'hourly'),
+    u'Ten Day Forecast':              ('conditions', 'forecast10day'),
+    u'Tides':                         ('conditions', 'tide'),
+    u'Weather':                       ('geolookup', 'alerts', 'conditions', 'forecast', 'yesterday'),
+    u'Weather Underground':           ('geolookup', 'alerts', 'conditions', 'forecast', 'yesterday'),
+    u'WUnderground Almanac':          ('conditions', 'almanac'),
+    u'WUnderground Astronomy':        ('conditions', 'astronomy'),
+    u'WUnderground Device':           ('geolookup', 'alerts', 'conditions', 'forecast', 'yesterday'),
+    u'WUnderground Hourly Forecast':  ('conditions', 'hourly'),
+    u'WUnderground Ten Day Forecast': ('conditions', 'forecast10day'),
+    u'WUnderground Tides':            ('conditions', 'tide'),
+    u'WUnderground Weather':          ('geolookup', 'alerts', 'conditions', 'forecast', 'yesterday'),
+    u'WUnderground Weather Device':   ('geolookup', 'alerts', 'conditions', 'forecast', 'yesterday'),
+}
+
+# The order in which features are written into the API URL.
+kFeatureOrder = ('geolookup', 'alerts', 'almanac', 'astronomy', 'conditions', 'forecast', 'forecast10day', 'hourly', 'yesterday', 'tide')
+
+# States that are also set outside publishStates() (device status.) These are sent even when they haven't changed.
+kStatusStates = ('onOffState',)
+
 pad_log = u"{0}{1}".format('\n', " " * 34)  # 34 spaces to align with log margin.
 
 
@@ -140,20 +186,96 @@ class Plugin(indigo.PluginBase):
         indigo.PluginBase.__init__(self, pluginId, pluginDisplayName, pluginVersion, pluginPrefs)
 
         self.debug = self.pluginPrefs.get('showDebugInfo', True)
-        self.updater = indigoPluginUpdateChecker.updateChecker(self, "https://raw.githubusercontent.com/DaveL17/WUnderground/master/wunderground_version.html")
 
         self.masterWeatherDict = {}
         self.masterTriggerDict = {}
+
+        self.refreshLock    = threading.Lock()  # Guards the refresh flags below and the swap of masterWeatherDict.
+        self.refreshRunning = False             # A refresh cycle is under way.
+        self.refreshFetched = False             # The running cycle has finished downloading.
+        self.refreshPending = False             # Another cycle has been requested to follow the running one.
         self.wuOnline = True
 
+        self.callLock = threading.Lock()  # Guards the call counter prefs.
+
+        # Per-minute and per-day call limits. Daily counts are kept (by API key) in the plugin prefs.
+        self.rateLimiter = wuRate.RateLimiter()
+        self.configureRateLimiter(self.pluginPrefs)
+        if 'callQuotas' in self.pluginPrefs:
+            self.rateLimiter.loads(self.pluginPrefs['callQuotas'])
+        else:
+            self.rateLimiter.setCallsMade(self.pluginPrefs.get('apiKey', ""), self.pluginPrefs.get('dailyCallDay', ""), self.pluginPrefs.get('dailyCallCounter', 0))
+
+        # All outbound HTTP traffic goes through one keep-alive connection pool.
+        self.transport = wuTransport.Transport(self)
+        self.imageStore = wuImage.ImageStore(self.transport)
+
+        # Update checks run in the background over the shared transport.
+        self.updater = wuUpdate.UpdateChecker(self, "https://raw.githubusercontent.com/DaveL17/WUnderground/master/wunderground_version.html", self.transport)
+
+        # Location downloads are queued to a fixed pool of fetch threads (started by runConcurrentThread.)
+        try:
+            self.dispatcher = wuFetch.Dispatcher(self, workers=int(self.pluginPrefs.get('maxDownloadThreads', 4)))
+        except ValueError:
+            self.dispatcher = wuFetch.Dispatcher(self)
+
+        # Radar and satellite images have a pool of their own, so a slow image host can't delay the weather devices.
+        try:
+            self.imageDispatcher = wuFetch.Dispatcher(self, workers=int(self.pluginPrefs.get('maxImageThreads', 2)), name=u"image")
+        except ValueError:
+            self.imageDispatcher = wuFetch.Dispatcher(self, workers=2, name=u"image")
+
+        self.imageJobs    = {}  # {device id: last image job}
+        self.imageLastRun = {}  # {device id: time the last image job was queued}
+
+        # Weather Underground JSON is decoded with the fastest JSON library available.
+        self.decoder = wuDecode.Decoder()
+
+        # Weather data by location and API feature. Slow changing features are kept between cycles.
+        self.featureCache = wuCache.FeatureCache()
+
+        # Device locations that Weather Underground answers from the same place are downloaded once.
+        self.locationIndex = wuLocation.LocationIndex()
+
+        # Locations that keep failing are skipped for a while so they can't hold up the others.
+        self.circuitBreaker = wuFetch.CircuitBreaker()
+
+        # Device states are set from the state tables in wuStates, compiled once per device configuration.
+        self.stateTables = {}  # {(table name, config props): [compiled tables]}
+
+        # Converted values are shared by the devices that read the same weather data (see wuStates.LocationRecord.)
+        self.locationRecords = {}  # {id of the weather data: location record}
+
+        # Device locations whose download failed this cycle. Their devices stay marked "No comm" and aren't parsed.
+        self.failedLocations = set()
+
+        # Display settings for each device (see wuFormat.) Built again when the prefs or the device config change.
+        self.formatContexts = {}  # {device id: format context}
+
+        # Device props as last read or written by updateAddress(). The props are only written when the address changes.
+        self.deviceProps = {}  # {device id: pluginProps}
+
+        # The states last sent to the server for each device. Only states that have changed are sent again.
+        self.publishedStates = {}  # {device id: {state id: (type, value, uiValue)}}
+
+        # State updates sent by publishStates() this cycle, the server calls used to send them, and the unchanged
+        # states that weren't sent.
+        self.stateUpdates = 0
+        self.stateCalls   = 0
+        self.stateSkips   = 0
+
+        # Device props written by updateAddress() this cycle, and the writes skipped because the address hadn't changed.
+        self.propsWrites = 0
+        self.propsSkips  = 0
+
+        # The feature cache is saved here so that a restarted plugin can update its devices without a download.
+        self.cacheFile = os.path.join(indigo.server.getInstallFolderPath(), 'Preferences', 'Plugins', u"{0}.weatherCache.json.gz".format(pluginId))
+
         # ====================== Initialize DLFramework =======================
 
         self.Fogbert   = Dave.Fogbert(self)
         self.Formatter = Dave.Formatter(self)
 
-        self.date_format = self.Formatter.dateFormat()
-        self.time_format = self.Formatter.timeFormat()
-
         # Log pluginEnvironment information when plugin is first started
         self.Fogbert.pluginEnvironment()
 
@@ -176,6 +298,9 @@ class Plugin(indigo.PluginBase):
             self.debugLog(u"Plugin preference logging is suppressed. Set debug level to [High] to write them to "
                           u"the log.")
 
+        self.debugLog(u"JSON decoder: {0}".format(self.decoder.name))
+        self.debugLog(u"Streaming JSON (ijson): {0}".format(wuProject.ijson_backend or u"not installed"))
+
         # try:
         #     pydevd.settrace('localhost', port=5678, stdoutToServer=True, stderrToServer=True, suspend=False)
         # except:
@@ -195,39 +320,130 @@ class Plugin(indigo.PluginBase):
 
         self.refreshWeatherData()
 
+    def benchmarkDecoders(self):
+        """ The benchmarkDecoders() method times each available JSON library
+        against the weather data held for each location and writes the
+        results to the Indigo log (plugin menu call.) The documents are the
+        master weather dictionary re-encoded as JSON, so the method does not
+        make any API calls. """
+
+        if self.pluginPrefs['showDebugLevel'] >= 3:
+            self.debugLog(u"benchmarkDecoders() method called.")
+
+        documents = dict((location, simplejson.dumps(data)) for location, data in self.masterWeatherDict.iteritems() if data)
+
+        if not documents:
+            indigo.server.log(u"No weather data to benchmark yet. Try again after the next refresh.", type="WUnderground Status")
+            return
+
+        indigo.server.log(u"JSON decoder benchmark (active decoder: {0}. Best of 5 runs in milliseconds.)".format(self.decoder.name), type="WUnderground Info")
+
+        for name, timings in wuDecode.benchmark(documents):
+            for location in sorted(timings):
+                if timings[location] is None:
+                    result = u"failed"
+                else:
+                    result = u"{0:.3f}".format(timings[location] * 1000)
+                indigo.server.log(u"{0:<16}{1:<24}{2:>8} KB{3:>12}".format(name, location, len(documents[location]) // 1024, result), type="WUnderground Info")
+
+    def benchmarkKeyPaths(self):
+        """ The benchmarkKeyPaths() method times nestedLookup() against the
+        compiled key path getters (see wuPath) for the weather data held for
+        each location and writes the results to the Indigo log (plugin menu
+        call.) Every key path compiled by the parse methods so far is read. """
+
+        if self.pluginPrefs['showDebugLevel'] >= 3:
+            self.debugLog(u"benchmarkKeyPaths() method called.")
+
+        documents = dict((location, data) for location, data in self.masterWeatherDict.iteritems() if data)
+        paths     = wuPath.compiledPaths()
+
+        if not documents or not paths:
+            indigo.server.log(u"No weather data to benchmark yet. Try again after the next refresh.", type="WUnderground Status")
+            return
+
+        indigo.server.log(u"Key path benchmark ({0} paths. Best of 5 runs in milliseconds.)".format(len(paths)), type="WUnderground Info")
+
+        results = wuPath.benchmark(documents, paths, reference=lambda obj, keys: self.nestedLookup(obj, keys=keys))
+
+        for location in sorted(results):
+            nested, compiled = results[location]
+            indigo.server.log(u"{0:<24}nestedLookup:{1:>10.3f}    compiled:{2:>10.3f}    ({3:.1f}x)".format(location, nested * 1000, compiled * 1000, nested / max(compiled, 1e-9)),
+                              type="WUnderground Info")
+
+    def buildWeatherUrl(self, location, features):
+        """ The buildWeatherUrl() method constructs the API URL for a location
+        requesting only the features in 'features'. The ten day forecast
+        contains everything in the four day forecast, so when both are wanted
+        only the ten day forecast is requested. """
+
+        features = set(features)
+
+        if 'forecast10day' in features:
+            features.discard('forecast')
+
+        # 03/30/15, modified by raneil. Improves the odds of dodging the "invalid literal for int() with base 16: ''")
+        # [http://stackoverflow.com/questions/10158701/how-to-capture-output-of-curl-from-python-script]
+        # switches to yesterday api instead of history_DATE api.
+        feature_list = [feature if feature == 'geolookup' else u"{0}_v11".format(feature) for feature in kFeatureOrder if feature in features]
+
+        return u"http://api.wunderground.com/api/{0}/{1}/lang:{2}/q/{3}.json?apiref=97986dc4c4b7e764".format(self.pluginPrefs['apiKey'],
+                                                                                                             u"/".join(feature_list),
+                                                                                                             self.pluginPrefs['language'],
+                                                                                                             location)
+
     def callCount(self):
         """ Maintains a count of daily calls to Weather Underground to help
         ensure that the plugin doesn't go over a user-defined limit. The limit
-        is set within the plugin config dialog. """
+        is set within the plugin config dialog. Calls are counted by the rate
+        limiter when they are made (see callThrottle()); this method copies
+        today's count for the current API key to the plugin prefs. """
 
         if self.pluginPrefs['showDebugLevel'] >= 3:
             self.debugLog(u"callCount() method called.")
 
-        calls_made = self.pluginPrefs['dailyCallCounter']  # Calls today so far
-        calls_max = self.pluginPrefs.get('callCounter', 500)  # Max calls allowed per day
-        download_interval = self.pluginPrefs.get('downloadInterval', 15)
+        wu_day = dt.datetime.now(pytz.timezone('US/Pacific-New')).date()
 
-        # See if we have exceeded the daily call limit.  If we have, set the "dailyCallLimitReached" flag to be true.
-        if calls_made >= calls_max:
-            indigo.server.log(u"Daily call limit ({0}) reached. Taking the rest of the day "
-                              u"off.".format(calls_max), type="WUnderground Status")
-            self.debugLog(u"  Setting call limiter to: True")
+        with self.callLock:
+            calls_made = self.rateLimiter.callsMade(self.pluginPrefs['apiKey'], wu_day)  # Calls today so far
+            calls_max  = self.rateLimiter.per_day                                          # Max calls allowed per day
+            limit_was_reached = self.pluginPrefs.get('dailyCallLimitReached', False)
 
-            self.pluginPrefs['dailyCallLimitReached'] = True
+            self.pluginPrefs['dailyCallCounter']      = calls_made
+            self.pluginPrefs['dailyCallLimitReached'] = calls_made >= calls_max
+            self.pluginPrefs['callQuotas']            = self.rateLimiter.dumps()
 
-            self.sleep(download_interval)
+        # See if we have reached the daily call limit.
+        if calls_made >= calls_max:
+            if not limit_was_reached:
+                indigo.server.log(u"Daily call limit ({0}) reached. Taking the rest of the day "
+                                  u"off.".format(calls_max), type="WUnderground Status")
+                self.debugLog(u"  Setting call limiter to: True")
 
-        # Daily call limit has not been reached. Increment the call counter (and ensure that call limit flag is set
-        # to False.
         else:
-            # Increment call counter and write it out to the preferences dict.
-            self.pluginPrefs['dailyCallLimitReached'] = False
-            self.pluginPrefs['dailyCallCounter'] += 1
-
             # Calculate how many calls are left for debugging purposes.
             calls_left = calls_max - calls_made
             self.debugLog(u"  {0} callsLeft = ({1} - {2})".format(calls_left, calls_max, calls_made))
 
+    def callThrottle(self):
+        """ Keeps the plugin under the per-minute and per-day call limits of
+        the user's Weather Underground plan. Each API call waits here for a
+        token from the rate limiter (see wuRate) and is counted against the
+        daily quota for the API key. If no call can be made before the
+        current fetch job's deadline, or the daily quota is spent, a
+        wuRate.CallDeferred exception is raised and the caller keeps the data
+        it already has. This method is called from the fetch threads, so
+        waiting never stalls the plugin thread. """
+
+        try:
+            self.rateLimiter.acquire(self.pluginPrefs['apiKey'],
+                                     dt.datetime.now(pytz.timezone('US/Pacific-New')).date(),
+                                     timeout=self.dispatcher.timeout(60, minimum=0),
+                                     )
+        finally:
+            # Go update the call counter (and the limit flag.)
+            self.callCount()
+
     def callDay(self):
         """ Manages the day for the purposes of maintaining the call counter
         and the flag for the daily forecast email message. """
@@ -236,7 +452,6 @@ class Plugin(indigo.PluginBase):
         call_day           = self.pluginPrefs['dailyCallDay']
         call_limit_reached = self.pluginPrefs.get('dailyCallLimitReached', False)
         debug_level        = self.pluginPrefs.get('showDebugLevel', 1)
-        sleep_time         = self.pluginPrefs.get('downloadInterval', 15)
         todays_date        = dt.datetime.now(wu_time_zone).date()
         today_str          = u"{0}".format(todays_date)
         today_unstr        = dt.datetime.strptime(call_day, "%Y-%m-%d")
@@ -257,7 +472,7 @@ class Plugin(indigo.PluginBase):
 
             self.pluginPrefs['dailyCallDay'] = today_str
 
-        # Reset call counter and call day because it's a new day.
+        # Reset call counter and call day because it's a new day. (The rate limiter starts a new quota by itself.)
         if todays_date > today_unstr_conv:
             self.pluginPrefs['dailyCallCounter'] = 0
             self.pluginPrefs['dailyCallLimitReached'] = False
@@ -284,10 +499,13 @@ class Plugin(indigo.PluginBase):
             if debug_level >= 2:
                 self.debugLog(u"    Today is not a new day.")
 
+        # The quota belongs to the API key, so the flag follows the key in use.
+        call_limit_reached = self.rateLimiter.callsLeft(self.pluginPrefs['apiKey'], todays_date) == 0
+        self.pluginPrefs['dailyCallLimitReached'] = call_limit_reached
+
         if call_limit_reached:
             indigo.server.log(u"    Daily call limit reached. Taking the rest of the day "
                               u"off.", type="WUnderground Status")
-            self.sleep(sleep_time)
 
         else:
             if debug_level >= 2:
@@ -323,6 +541,22 @@ class Plugin(indigo.PluginBase):
         if not userCancelled:
             self.debug = show_debug
 
+            # Cached weather text is in the language it was downloaded in.
+            if valuesDict.get('language') != self.pluginPrefs.get('language'):
+                self.featureCache.clear()
+
+            try:
+                self.dispatcher.resize(int(valuesDict.get('maxDownloadThreads', 4)))
+                self.imageDispatcher.resize(int(valuesDict.get('maxImageThreads', 2)))
+            except ValueError:
+                pass
+
+            self.configureRateLimiter(valuesDict)
+
+            # Decimal places and date and time formats may have changed.
+            self.formatContexts  = {}
+            self.locationRecords = {}
+
             # Debug output can contain sensitive data.
             if debug_level >= 3:
                 self.debugLog(u"============ valuesDict ============")
@@ -368,6 +602,23 @@ class Plugin(indigo.PluginBase):
                 self.Fogbert.pluginErrorHandler(traceback.format_exc())
                 self.debugLog(u"Exception when trying to unkill all comms.")
 
+    def configureRateLimiter(self, prefs):
+        """ The configureRateLimiter() method sets the rate limiter to the
+        per-minute and per-day call limits in prefs (the plugin prefs, or the
+        values dict from the plugin config dialog.) """
+
+        try:
+            calls_per_minute = max(1, int(prefs.get('callsPerMinute', 10)))
+        except ValueError:
+            calls_per_minute = 10
+
+        try:
+            calls_per_day = int(prefs.get('callCounter', 500))
+        except ValueError:
+            calls_per_day = 500
+
+        self.rateLimiter.configure(calls_per_minute, calls_per_day)
+
     def debugToggle(self):
         """ Toggle debug on/off. """
 
@@ -393,6 +644,11 @@ class Plugin(indigo.PluginBase):
 
         self.debugLog(u"Starting Device: {0}".format(dev.name))
 
+        # Send every state on the first update (the device may have been edited or its states reset.)
+        self.publishedStates.pop(dev.id, None)
+        self.deviceProps.pop(dev.id, None)
+        self.formatContexts.pop(dev.id, None)
+
         dev.stateListOrDisplayStateIdChanged()  # Check to see if the device profile has changed.
 
         # For devices that display the temperature as their UI state, set them to a value we already have.
@@ -425,11 +681,27 @@ class Plugin(indigo.PluginBase):
             except AttributeError:
                 pass
 
+        # If we already hold data for the device's location (restored from the weather cache at startup), use them now
+        # rather than waiting for the first refresh cycle.
+        if dev.configured and dev.model not in ['Satellite Image Downloader', 'WUnderground Radar', 'WUnderground Satellite Image Downloader']:
+            if self.masterWeatherDict.get(dev.pluginProps.get('location', 'autoip')):
+                self.debugLog(u"Updating {0} from the weather cache.".format(dev.name))
+                try:
+                    self.parseDeviceData(dev)
+                except Exception:
+                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
+
     def deviceStopComm(self, dev):
         """ Stop communication with plugin devices. """
 
         self.debugLog(u"Stopping Device: {0}".format(dev.name))
 
+        # Image devices download again as soon as they are restarted (e.g. after an edit.)
+        self.imageLastRun.pop(dev.id, None)
+        self.publishedStates.pop(dev.id, None)
+        self.deviceProps.pop(dev.id, None)
+        self.formatContexts.pop(dev.id, None)
+
         try:
             dev.updateStateOnServer('onOffState', value=False, uiValue=u"Disabled")
         except Exception:
@@ -464,9 +736,12 @@ class Plugin(indigo.PluginBase):
                 logfile.write(u"Written at: {0}\n".format(dt.datetime.today().strftime('%Y-%m-%d %H:%M')).encode('utf-8'))
                 logfile.write(u"{0}{1}".format("=" * 72, '\n').encode('utf-8'))
 
-                for key in self.masterWeatherDict.keys():
+                # The refresh cycle may swap in a new dictionary while we write.
+                weather_dict = self.masterWeatherDict
+
+                for key in weather_dict.keys():
                     logfile.write(u"Location Specified: {0}\n".format(key).encode('utf-8'))
-                    logfile.write(u"{0}\n\n".format(self.masterWeatherDict[key]).encode('utf-8'))
+                    logfile.write(u"{0}\n\n".format(weather_dict[key]).encode('utf-8'))
 
             indigo.server.log(u"Weather data written to: {0}".format(file_name), type="WUnderground Status")
 
@@ -682,6 +957,19 @@ class Plugin(indigo.PluginBase):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             return -99.0
 
+    def formatContext(self, dev):
+        """ The formatContext() method returns the display settings (decimal
+        places, units, date and time formats) for a device. The context is
+        built the first time it's needed and kept until the plugin prefs are
+        saved or the device is restarted. """
+
+        try:
+            return self.formatContexts[dev.id]
+
+        except KeyError:
+            fmt = self.formatContexts[dev.id] = wuFormat.FormatContext(self, dev.pluginProps)
+            return fmt
+
     def getDeviceConfigUiValues(self, valuesDict, typeId, devId):
         """Called when a device configuration dialog is opened. """
 
@@ -718,17 +1006,12 @@ class Plugin(indigo.PluginBase):
         try:
             if destination.endswith((".gif", ".jpg", ".jpeg", ".png")):
 
-                # If requests doesn't work for some reason, revert to urllib.
-                try:
-                    r = requests.get(source, stream=True, timeout=10)
+                status_code, result = self.imageStore.download(source, destination, timeout=self.dispatcher.timeout(10))
 
-                    with open(destination, 'wb') as img:
-                        for chunk in r.iter_content(2000):
-                            img.write(chunk)
-
-                except NameError:
-                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                    urllib.urlretrieve(source, destination)
+                if result is None:
+                    self.errorLog(u"Error downloading image file: {0}".format(status_code))
+                    dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
+                    return False
 
                 dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
                 dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
@@ -736,7 +1019,7 @@ class Plugin(indigo.PluginBase):
                 if debug_level >= 2:
                     self.debugLog(u"Image downloader source: {0}".format(source))
                     self.debugLog(u"Image downloader destination: {0}".format(destination))
-                    self.debugLog(u"Satellite image downloaded successfully.")
+                    self.debugLog(u"Satellite image {0}.".format(result))
 
                 return
 
@@ -836,35 +1119,25 @@ class Plugin(indigo.PluginBase):
                 self.debugLog(u"URL: {0}".format(source))
             destination = "/Library/Application Support/Perceptive Automation/Indigo {0}/IndigoWebServer/images/controls/static/{1}.gif".format(indigo.server.version.split('.')[0],
                                                                                                                                                 dev.pluginProps['imagename'])
-            try:
-                r = requests.get(source, stream=True, timeout=10)
-                self.debugLog(u"Image request status code: {0}".format(r.status_code))
+            self.callThrottle()
+            status_code, result = self.imageStore.download(source, destination, timeout=self.dispatcher.timeout(10))
+            self.debugLog(u"Image request status code: {0}".format(status_code))
 
-                if r.status_code == 200:
-                    with open(destination, 'wb') as img:
-
-                        for chunk in r.iter_content(1024):
-                            img.write(chunk)
-
-                    if debug_level >= 2:
-                        self.debugLog(u"Radar image source: {0}".format(source))
-                        self.debugLog(u"Satellite image downloaded successfully.")
-
-                    dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
-                    dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
+            if result is not None:
+                if debug_level >= 2:
+                    self.debugLog(u"Radar image source: {0}".format(source))
+                    self.debugLog(u"Radar image {0}.".format(result))
 
-                else:
-                    self.errorLog(u"Error downloading image file: {0}".format(r.status_code))
-                    raise NameError
+                dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+                dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
 
-            # If requests doesn't work for some reason, revert to urllib.
-            except NameError:
-                self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                r = urllib.urlretrieve(source, destination)
-                self.debugLog(u"Image request status code: {0}".format(r.getcode()))
+            else:
+                self.errorLog(u"Error downloading image file: {0}".format(status_code))
+                dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
 
-            # Since this uses the API, go increment the call counter.
-            self.callCount()
+        # No call available. Keep the image we have and try again next cycle.
+        except wuRate.CallDeferred as error:
+            self.debugLog(u"Radar image for {0} deferred. {1}".format(dev.name, error.reason))
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
@@ -873,7 +1146,9 @@ class Plugin(indigo.PluginBase):
 
     def getWeatherData(self, dev):
         """ Grab the JSON for the device. A separate call must be made for each
-        weather device because the data are location specific. """
+        weather device because the data are location specific. Locations that
+        were already downloaded by the fetch stage (see downloadWeatherData())
+        are not downloaded again. """
 
         debug_level = self.pluginPrefs['showDebugLevel']
 
@@ -898,88 +1173,279 @@ class Plugin(indigo.PluginBase):
                     # We already have the data, so no need to get it again.
                     self.debugLog(u"  Location already in master weather dictionary.")
 
+                elif not self.circuitBreaker.allow(self.locationIndex.resolve(location)):
+                    # This location keeps failing. Leave it alone until its cool-down has passed.
+                    self.debugLog(u"  Skipping {0} (repeated failures.)".format(location))
+
                 else:
                     # We don't have this location's data yet. Go and get the data and add it to the masterWeatherDict.
-                    #
-                    # 03/30/15, modified by raneil. Improves the odds of dodging the "invalid literal for int() with base 16: ''")
-                    # [http://stackoverflow.com/questions/10158701/how-to-capture-output-of-curl-from-python-script]
-                    # switches to yesterday api instead of history_DATE api.
-                    url = (u"http://api.wunderground.com/api/{0}/geolookup/alerts_v11/almanac_v11/astronomy_v11/conditions_v11/forecast_v11/forecast10day_v11/hourly_v11/lang:{1}/"
-                           u"yesterday_v11/tide_v11/q/{2}.json?apiref=97986dc4c4b7e764".format(self.pluginPrefs['apiKey'], self.pluginPrefs['language'], location))
-
-                    # Debug output can contain sensitive data.
-                    if debug_level >= 3:
-                        self.debugLog(u"  URL prepared for API call: {0}".format(url))
-                    else:
-                        self.debugLog(u"Weather Underground URL suppressed. Set debug level to [High] to write it to the log.")
-                    self.debugLog(u"Getting weather data for location: {0}".format(location))
-
-                    # Start download timer.
-                    get_data_time = dt.datetime.now()
-
-                    # If requests doesn't work for some reason, try urllib2 instead.
-                    try:
-                        f = requests.get(url, timeout=10)
-                        # We convert the file to a json object below, so we don't use requests' built-in decoder.
-                        simplejson_string = f.text
+                    query = self.locationIndex.resolve(location)
+                    parsed_simplejson = self.getLocationData(query, self.locationFeatures().get(location, kFeatureOrder))
 
-                    except NameError:
-                        self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                        try:
-                            # Connect to Weather Underground and retrieve data.
-                            socket.setdefaulttimeout(30)
-                            f = urllib2.urlopen(url)
-                            simplejson_string = f.read()
-
-                        # ==============================================================
-                        # Communication error handling:
-                        # ==============================================================
-                        except (urllib2.HTTPError, urllib2.URLError, Exception):
-                            self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                            self.debugLog(u"Unable to reach Weather Underground. Sleeping until next scheduled poll.")
-
-                            for dev in indigo.devices.itervalues("self"):
-                                dev.updateStateOnServer("onOffState", value=False, uiValue=u" ")
-                            return
-
-                    # Report results of download timer.
-                    data_cycle_time = (dt.datetime.now() - get_data_time)
-                    data_cycle_time = (dt.datetime.min + data_cycle_time).time()
-
-                    if debug_level >= 1 and simplejson_string != "":
-                        self.debugLog(u"[{0} download: {1} seconds]".format(dev.name, data_cycle_time.strftime('%S.%f')))
-
-                    # Load the JSON data from the file.
-                    try:
-                        parsed_simplejson = simplejson.loads(simplejson_string, encoding="utf-8")
-                    except Exception:
-                        self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                        self.debugLog(u"Unable to decode data.")
-                        parsed_simplejson = {}
+                    if not parsed_simplejson:
+                        raise wuTransport.TransportError(u"No data for {0}.".format(location))
+
+                    self.circuitBreaker.success(query)
 
                     # Add location JSON to maser weather dictionary.
                     self.debugLog(u"Adding weather data for {0} to Master Weather Dictionary.".format(location))
                     self.masterWeatherDict[location] = parsed_simplejson
 
-                    # Go increment (or reset) the call counter.
-                    self.callCount()
+            except wuRate.CallDeferred as error:
+                self.debugLog(u"Download for {0} deferred. {1}".format(dev.name, error.reason))
 
             except Exception:
                 self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                self.debugLog(u"Unable to reach Weather Underground.")
+                self.debugLog(u"Unable to reach Weather Underground for location: {0}".format(location))
+                self.circuitBreaker.failure(self.locationIndex.resolve(location))
 
-                # Unable to fetch the JSON. Mark all devices as 'false'.
-                for dev in indigo.devices.itervalues("self"):
-                    if dev.enabled:
-                        dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
-
-                self.wuOnline = False
+                # Unable to fetch the JSON. Mark the devices for this location (only) as 'false'.
+                for location_dev in indigo.devices.itervalues("self"):
+                    if location_dev.enabled and location_dev.pluginProps.get('location', 'autoip') == location:
+                        location_dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
 
         # We could have come here from several different places. Return to whence we came to further process the weather data.
         self.wuOnline = True
         return self.masterWeatherDict
 
-    def itemListTemperatureFormat(self, val):
+    def getLocationData(self, location, features):
+        """ The getLocationData() method downloads and decodes the JSON for a
+        single weather location, requesting only the API features listed in
+        'features'. It does not touch the master weather dictionary or any
+        devices, so it is safe to call from the fetch stage worker threads.
+        Returns the decoded dict, or None if Weather Underground could not be
+        reached. """
+
+        debug_level = self.pluginPrefs['showDebugLevel']
+        url         = self.buildWeatherUrl(location, features)
+
+        # If the user wants only the data the devices use, keep the key paths for the requested features. With ijson
+        # installed, the response is read as a stream and nothing else is ever built.
+        if self.pluginPrefs.get('projectWeatherData', False):
+            path_tree = wuProject.buildTree(wuProject.featurePaths(features))
+        else:
+            path_tree = None
+
+        stream = path_tree is not None and wuProject.ijson is not None
+
+        # Debug output can contain sensitive data.
+        if debug_level >= 3:
+            self.debugLog(u"  URL prepared for API call: {0}".format(url))
+        else:
+            self.debugLog(u"Weather Underground URL suppressed. Set debug level to [High] to write it to the log.")
+        self.debugLog(u"Getting weather data for location: {0}".format(location))
+
+        # Each try is a call against the API key, so failed calls are retried here (through the call limits) rather
+        # than by the transport.
+        attempt = 0
+
+        while True:
+
+            # Wait for room under the call limits. Raises wuRate.CallDeferred if no call can be made.
+            self.callThrottle()
+
+            # Start download timer.
+            get_data_time = dt.datetime.now()
+
+            try:
+                f = self.transport.get(url, timeout=self.dispatcher.timeout(10), stream=stream, retries=0)
+
+                if f.status_code in wuTransport.kRetryStatus and attempt < self.transport.retries:
+                    f.close()
+                    attempt += 1
+                    self.debugLog(u"Weather Underground returned status {0} for {1}. Trying again.".format(f.status_code, location))
+                    time.sleep(self.transport.backoff(attempt))
+                    continue
+
+                if stream:
+                    # Let urllib3 undo the gzip compression as ijson reads.
+                    f.raw.decode_content = True
+                    json_bytes = None
+                else:
+                    # We decode the raw bytes below, so we don't use requests' built-in decoder (or its unicode conversion.)
+                    json_bytes = f.content
+
+                break
+
+            # ==============================================================
+            # Communication error handling:
+            # ==============================================================
+            except wuTransport.TransportError as error:
+
+                # Only requests that never reached the server are tried again (see wuTransport.RetrySafeError.)
+                if isinstance(error, wuTransport.RetrySafeError) and attempt < self.transport.retries:
+                    attempt += 1
+                    self.debugLog(u"Unable to reach Weather Underground for {0}. Trying again.".format(location))
+                    time.sleep(self.transport.backoff(attempt))
+                    continue
+
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                self.debugLog(u"Unable to reach Weather Underground. Sleeping until next scheduled poll.")
+                return None
+
+        # Report results of download timer.
+        data_cycle_time = (dt.datetime.now() - get_data_time)
+        data_cycle_time = (dt.datetime.min + data_cycle_time).time()
+
+        if debug_level >= 1 and json_bytes != "":
+            self.debugLog(u"[{0} download: {1} seconds]".format(location, data_cycle_time.strftime('%S.%f')))
+
+        # Load the JSON data from the file.
+        try:
+            if stream:
+                parsed_simplejson = wuProject.streamLoads(f.raw, path_tree)
+            elif path_tree is not None:
+                parsed_simplejson = wuProject.prune(self.decoder.loads(json_bytes), path_tree)
+            else:
+                parsed_simplejson = self.decoder.loads(json_bytes)
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.debugLog(u"Unable to decode data.")
+            parsed_simplejson = {}
+        finally:
+            f.close()
+
+        return parsed_simplejson
+
+    def downloadWeatherData(self):
+        """ The downloadWeatherData() method is the fetch stage of the refresh
+        cycle. It collects the unique set of locations used by enabled weather
+        devices and queues them to the fetch dispatcher. Returns a new weather
+        dictionary of {device location: data}, which the refresh cycle swaps
+        in as the master weather dictionary before devices are parsed. The
+        number of fetch threads is set in the plugin configuration dialog; the
+        call limits are enforced by callThrottle(). """
+
+        debug_level   = self.pluginPrefs['showDebugLevel']
+        features      = {}
+        results       = {}
+        raw_locations = {}
+        wanted        = {}
+        time_now      = time.time()
+        weather_dict  = {}
+        wu_day        = dt.datetime.now(pytz.timezone('US/Pacific-New')).date()
+
+        if debug_level >= 3:
+            self.debugLog(u"downloadWeatherData() method called.")
+
+        self.locationIndex.newDay(wu_day)
+
+        # Group device locations by the query that is downloaded for them (see wuLocation.)
+        for location, location_features in self.locationFeatures().iteritems():
+            query = self.locationIndex.resolve(location)
+            wanted.setdefault(query, set()).update(location_features)
+            raw_locations.setdefault(query, set()).add(location)
+
+        # Spread the calls left today over the rest of the WU day. When the budget is tight, locations are downloaded
+        # less often than every cycle (rounded to the nearest cycle.)
+        download_interval = int(self.pluginPrefs.get('downloadInterval', 900))
+        planned_interval  = self.planCallBudget(len(wanted))
+
+        if planned_interval > download_interval:
+            min_ttl = planned_interval - download_interval / 2
+        else:
+            min_ttl = 0
+
+        # Work out which features are out of date for each query. Queries where everything is still fresh are served
+        # from the cache without making a call.
+        for query, query_features in wanted.iteritems():
+            stale_features = self.featureCache.staleFeatures(query, query_features, time_now, wu_day, min_ttl)
+
+            # Device locations downloaded with the same query share one copy of the data (and its parsed values.)
+            if stale_features and not self.circuitBreaker.allow(query):
+                self.debugLog(u"Skipping {0} until {1} (repeated failures.) Using cached weather data.".format(query, time.strftime('%H:%M:%S', time.localtime(self.circuitBreaker.openUntil(query)))))
+                location_data = self.featureCache.merge(query)
+                for location in raw_locations[query]:
+                    weather_dict[location] = location_data
+
+            elif stale_features:
+                features[query] = stale_features
+            else:
+                self.debugLog(u"Using cached weather data for {0}.".format(query))
+                location_data = self.featureCache.merge(query)
+                for location in raw_locations[query]:
+                    weather_dict[location] = location_data
+
+        locations = features.keys()
+
+        if not locations:
+            return weather_dict
+
+        # Each download must finish before the next cycle is due.
+        deadline = int(self.pluginPrefs.get('downloadInterval', 900))
+
+        def fetch(location):
+            # If the call limits won't allow the download, hand back the reason so the cached data can be used.
+            try:
+                return self.getLocationData(location, features[location])
+            except wuRate.CallDeferred as error:
+                return error
+
+        # Start download timer.
+        get_data_time = dt.datetime.now()
+
+        jobs = dict((location, self.dispatcher.submit(fetch, (location,), timeout=deadline, name=location)) for location in locations)
+
+        for location, job in jobs.iteritems():
+            if not job.wait(grace=30):
+                self.debugLog(u"Download for {0} did not finish in time.".format(location))
+            elif job.expired:
+                self.debugLog(u"Download for {0} expired before it could start.".format(location))
+
+            results[location] = job.result
+
+        # Report results of download timer.
+        data_cycle_time = (dt.datetime.now() - get_data_time)
+        data_cycle_time = (dt.datetime.min + data_cycle_time).time()
+        self.debugLog(u"[{0} locations downloaded with {1} workers: {2} seconds]".format(len(results), self.dispatcher.workers, data_cycle_time.strftime('%S.%f')))
+
+        for location, location_data in results.iteritems():
+            if isinstance(location_data, wuRate.CallDeferred):
+                self.debugLog(u"Download for {0} deferred. {1} Using cached weather data.".format(location, location_data.reason))
+
+                # No call was made, so a trial granted by the circuit breaker is still to be made.
+                self.circuitBreaker.release(location)
+                location_data = self.featureCache.merge(location)
+
+            elif not location_data:
+                self.debugLog(u"Unable to reach Weather Underground for location: {0}".format(location))
+
+                if self.circuitBreaker.failure(location):
+                    indigo.server.log(u"Downloads for {0} keep failing. Skipping it until {1}.".format(location, time.strftime('%H:%M', time.localtime(self.circuitBreaker.openUntil(location)))),
+                                      type="WUnderground Status")
+
+                # Unable to fetch the JSON. Mark the devices for this location as 'false' (the parse stage leaves them
+                # that way), and keep the cached data for when the location can be reached again.
+                self.failedLocations.update(raw_locations[location])
+
+                for dev in indigo.devices.itervalues("self"):
+                    if dev.enabled and dev.pluginProps.get('location', 'autoip') in raw_locations[location]:
+                        dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
+
+                location_data = self.featureCache.merge(location)
+
+            else:
+                self.circuitBreaker.success(location)
+
+                if debug_level >= 2:
+                    self.debugLog(u"Downloaded {0} for {1}.".format(u", ".join(sorted(features[location])), location))
+
+                # Keep the fresh sections and combine them with the cached ones.
+                self.featureCache.store(location, features[location], location_data, time_now, wu_day)
+                location_data = self.featureCache.merge(location, location_data)
+
+                # Learn which other queries WU answers from the same place. They won't be downloaded again.
+                for alias in self.locationIndex.learn(location, location_data):
+                    self.debugLog(u"Location {0} is answered from the same place as {1}. Using one download for both.".format(alias, self.locationIndex.resolve(alias)))
+                    self.featureCache.clear(alias)
+
+            for raw_location in raw_locations[location]:
+                self.debugLog(u"Adding weather data for {0} to Master Weather Dictionary.".format(raw_location))
+                weather_dict[raw_location] = location_data
+
+        return weather_dict
+
+    def itemListTemperatureFormat(self, fmt, val):
         """ Adjusts the decimal precision of the temperature value for the
         Indigo Item List. Note: this method needs to return a string rather
         than a Unicode string (for now.) """
@@ -988,7 +1454,7 @@ class Plugin(indigo.PluginBase):
             self.debugLog(u"itemListTemperatureFormat(self, val={0})".format(val))
 
         try:
-            if self.pluginPrefs.get('itemListTempDecimal', 0) == 0:
+            if fmt.item_list_decimal == 0:
                 val = float(val)
                 return u"{0:0.0f}".format(val)
             else:
@@ -1012,6 +1478,54 @@ class Plugin(indigo.PluginBase):
 
         return [(dev.id, dev.name) for dev in indigo.devices.itervalues(filter='self')]
 
+    def loadWeatherCache(self):
+        """ The loadWeatherCache() method restores the feature cache saved by
+        a previous run of the plugin and rebuilds the master weather
+        dictionary from it, so that devices can be updated as soon as they are
+        started. """
+
+        try:
+            saved = self.featureCache.load(self.cacheFile)
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.errorLog(u"Unable to read the weather cache. Starting with an empty cache.")
+            self.featureCache.clear()
+            return
+
+        if saved is None:
+            self.debugLog(u"No weather cache found.")
+            return
+
+        cached_locations = self.featureCache.locationList()
+
+        for dev in indigo.devices.itervalues("self"):
+            location = dev.pluginProps.get('location', 'autoip')
+            query    = self.locationIndex.resolve(location)
+            if query in cached_locations:
+                self.masterWeatherDict[location] = self.featureCache.merge(query)
+
+        self.debugLog(u"Weather cache loaded ({0} locations saved {1}).".format(len(self.masterWeatherDict), time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(saved))))
+
+    def locationFeatures(self):
+        """ The locationFeatures() method works out which Weather Underground
+        API features are consumed at each location, based on the models of
+        the enabled devices there. Returns a dict of {location: set of
+        features}. """
+
+        features = {}
+
+        for dev in indigo.devices.itervalues("self"):
+            if dev.enabled and dev.configured and dev.model in kModelFeatures:
+                location = dev.pluginProps.get('location', 'autoip')
+                location_features = features.setdefault(location, set())
+                location_features.update(kModelFeatures[dev.model])
+
+                # The daily forecast email also reports almanac data.
+                if self.pluginPrefs.get('updaterEmailsEnabled', False) and u"{0}".format(dev.pluginProps.get('weatherSummaryEmail', False)).lower() == u"true":
+                    location_features.add('almanac')
+
+        return features
+
     def nestedLookup(self, obj, keys, default=u"Not available"):
         """The nestedLookup() method is used to extract the relevant data from
         the Weather Underground JSON return. The JSON is known to sometimes be
@@ -1037,60 +1551,21 @@ class Plugin(indigo.PluginBase):
 
     def parseAlmanacData(self, dev):
         """ The parseAlmanacData() method takes selected almanac data and
-        parses it to device states. """
+        parses it to device states (see wuStates.kAlmanac.) """
 
         if self.pluginPrefs['showDebugLevel'] >= 3:
             self.debugLog(u"parseAlmanacData(self, dev) method called.")
 
         try:
 
-            # Reload the date and time preferences in case they've changed.
-            self.date_format = self.Formatter.dateFormat()
-            self.time_format = self.Formatter.timeFormat()
-
-            location     = dev.pluginProps['location']
-            weather_data = self.masterWeatherDict[location]
-
-            airport_code              = self.nestedLookup(weather_data, keys=('almanac', 'airport_code'))
-            current_observation       = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-            current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-            station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
-
-            no_ui_format = {'tempHighRecordYear': self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'recordyear')),
-                            'tempLowRecordYear':  self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'recordyear'))
-                            }
-
-            ui_format_temp = {'tempHighNormalC': self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'normal', 'C')),
-                              'tempHighNormalF': self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'normal', 'F')),
-                              'tempHighRecordC': self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'record', 'C')),
-                              'tempHighRecordF': self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'record', 'F')),
-                              'tempLowNormalC':  self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'normal', 'C')),
-                              'tempLowNormalF':  self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'normal', 'F')),
-                              'tempLowRecordC':  self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'record', 'C')),
-                              'tempLowRecordF':  self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'record', 'F'))
-                              }
+            weather_data = self.masterWeatherDict[dev.pluginProps['location']]
+            station_id   = wuPath.path('current_observation', 'station_id')(weather_data)
 
-            dev.updateStateOnServer('airportCode', value=airport_code, uiValue=airport_code)
-            dev.updateStateOnServer('currentObservation', value=current_observation, uiValue=current_observation)
-            dev.updateStateOnServer('currentObservationEpoch', value=current_observation_epoch, uiValue=current_observation_epoch)
+            updates = self.parseStates('almanac', dev, weather_data)
+            updates.append(('onOffState', True, u" "))
 
-            # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
-            dev.updateStateOnServer('currentObservation24hr', value=current_observation_24hr, uiValue=current_observation_24hr)
-
-            for key, value in no_ui_format.iteritems():
-                value, ui_value = self.fixCorruptedData(state_name=key, val=value)  # fixCorruptedData() returns float, unicode string
-                dev.updateStateOnServer(key, value=int(value), uiValue=ui_value)
-
-            for key, value in ui_format_temp.iteritems():
-                value, ui_value = self.fixCorruptedData(state_name=key, val=value)
-                ui_value = self.uiFormatTemperature(dev=dev, state_name=key, val=ui_value)  # uiFormatTemperature() returns unicode string
-                dev.updateStateOnServer(key, value=value, uiValue=ui_value)
-
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
-            dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
+            self.updateAddress(dev, station_id)
+            self.publishStates(dev, updates)
             dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
 
         except (KeyError, ValueError):
@@ -1103,10 +1578,6 @@ class Plugin(indigo.PluginBase):
         """ The parseAlertsData() method takes weather alert data and parses
         it to device states. """
 
-        # Reload the date and time preferences in case they've changed.
-        self.date_format = self.Formatter.dateFormat()
-        self.time_format = self.Formatter.timeFormat()
-
         attribution = u""
 
         alerts_suppressed = dev.pluginProps.get('suppressWeatherAlerts', False)
@@ -1117,37 +1588,38 @@ class Plugin(indigo.PluginBase):
         debug_level      = self.pluginPrefs.get('showDebugLevel', 1)
         no_alert_logging = self.pluginPrefs.get('noAlertLogging', False)
 
-        alerts_data   = self.nestedLookup(weather_data, keys=('alerts',))
-        location_city = self.nestedLookup(weather_data, keys=('location', 'city'))
+        alerts_data   = wuPath.path('alerts')(weather_data)
+        location_city = wuPath.path('location', 'city')(weather_data)
 
-        current_observation       = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
+        current_observation       = wuPath.path('current_observation', 'observation_time')(weather_data)
+        current_observation_epoch = wuPath.path('current_observation', 'observation_epoch')(weather_data)
 
         if debug_level >= 3:
             self.debugLog(u"parseAlerts(self, dev) method called.")
 
         try:
 
-            dev.updateStateOnServer('currentObservation', value=current_observation, uiValue=current_observation)
-            dev.updateStateOnServer('currentObservationEpoch', value=current_observation_epoch, uiValue=current_observation_epoch)
+            # New state values by state id: {state id: (value, uiValue)}. They are sent together once all the alerts have been read.
+            alert_states = {}
+
+            alert_states['currentObservation']      = (current_observation, current_observation)
+            alert_states['currentObservationEpoch'] = (current_observation_epoch, current_observation_epoch)
 
             # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
-            dev.updateStateOnServer('currentObservation24hr', value=current_observation_24hr)
+            current_observation_24hr = time.strftime(self.formatContext(dev).date_time_format, time.localtime(int(current_observation_epoch)))
+            alert_states['currentObservation24hr'] = (current_observation_24hr, None)
 
             # Alerts: This segment iterates through all available alert information. It retains only the first five alerts. We set all alerts to an empty string each time, and then
             # repopulate (this clears out alerts that may have expired.) If there are no alerts, set alert status to false.
 
             # Reset alert states (1-5).
-            for alert_counter in range(1, 6):
-                dev.updateStateOnServer('alertDescription{0}'.format(alert_counter), value=u" ", uiValue=u" ")
-                dev.updateStateOnServer('alertExpires{0}'.format(alert_counter), value=u" ", uiValue=u" ")
-                dev.updateStateOnServer('alertMessage{0}'.format(alert_counter), value=u" ", uiValue=u" ")
-                dev.updateStateOnServer('alertType{0}'.format(alert_counter), value=u" ", uiValue=u" ")
+            for state_ids in wuStates.kAlertIds:
+                for state_id in state_ids:
+                    alert_states[state_id] = (u" ", u" ")
 
             # If there are no alerts (the list is empty):
             if not alerts_data:
-                dev.updateStateOnServer('alertStatus', value="false", uiValue=u"False")
+                alert_states['alertStatus'] = ("false", u"False")
 
                 if alert_logging and not no_alert_logging and not alerts_suppressed:
                     indigo.server.log(u"There are no severe weather alerts for the {0} location.".format(location_city), type="WUnderground Info")
@@ -1155,7 +1627,7 @@ class Plugin(indigo.PluginBase):
             # If there is at least one alert (the list is not empty):
             else:
                 alert_array = []
-                dev.updateStateOnServer('alertStatus', value='true', uiValue=u'True')
+                alert_states['alertStatus'] = ('true', u'True')
 
                 for item in alerts_data:
 
@@ -1194,17 +1666,16 @@ class Plugin(indigo.PluginBase):
                 if debug_level >= 2:
                     self.debugLog(u"{0}".format(alert_array))
 
-                alert_counter = 1
-                for alert in range(len(alert_array)):
-                    if alert_counter < 6:
-                        dev.updateStateOnServer(u"alertType{0}".format(alert_counter), value=u"{0}".format(alert_array[alert][0]))
-                        dev.updateStateOnServer(u"alertDescription{0}".format(alert_counter), value=u"{0}".format(alert_array[alert][1]))
-                        dev.updateStateOnServer(u"alertMessage{0}".format(alert_counter), value=u"{0}".format(alert_array[alert][2]))
-                        dev.updateStateOnServer(u"alertExpires{0}".format(alert_counter), value=u"{0}".format(alert_array[alert][3]))
-                        alert_counter += 1
+                # The first five alerts are written to states (alert_tuple and wuStates.kAlertIds are in the same order.)
+                for alert_tuple, state_ids in zip(alert_array, wuStates.kAlertIds):
+                    for state_id, val in zip(state_ids, alert_tuple):
+                        alert_states[state_id] = (u"{0}".format(val), None)
 
+                for alert_tuple in alert_array:
                     if alert_logging and not alerts_suppressed:
-                        indigo.server.log(u"{0}".format(alert_array[alert][2]), type="WUnderground Status")
+                        indigo.server.log(u"{0}".format(alert_tuple[2]), type="WUnderground Status")
+
+            self.publishStates(dev, [(key, value, ui_value) for key, (value, ui_value) in alert_states.iteritems()])
 
             if attribution != u"":
                 indigo.server.log(attribution, type="WUnderground Info")
@@ -1216,7 +1687,7 @@ class Plugin(indigo.PluginBase):
 
     def parseAstronomyData(self, dev):
         """ The parseAstronomyData() method takes astronomy data and parses it
-        to device states.
+        to device states (see wuStates.kAstronomy.)
 
         Age of Moon (Integer: 0 - 31, units: days)
         Current Time Hour (Integer: 0 - 23, units: hours)
@@ -1241,90 +1712,139 @@ class Plugin(indigo.PluginBase):
         if self.pluginPrefs['showDebugLevel'] >= 3:
             self.debugLog(u"parseAstronomyData(self, dev) method called.")
 
-        # Reload the date and time preferences in case they've changed.
-        self.date_format = self.Formatter.dateFormat()
-        self.time_format = self.Formatter.timeFormat()
+        try:
 
-        location = dev.pluginProps['location']
+            weather_data = self.masterWeatherDict[dev.pluginProps['location']]
+            station_id   = wuPath.path('current_observation', 'station_id')(weather_data)
 
-        weather_data = self.masterWeatherDict[location]
+            updates = self.parseStates('astronomy', dev, weather_data)
+            updates.append(('onOffState', True, u" "))
 
-        current_observation       = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        percent_illuminated       = self.nestedLookup(weather_data, keys=('moon_phase', 'percentIlluminated'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
-
-        astronomy_dict = {'ageOfMoon':              self.nestedLookup(weather_data, keys=('moon_phase', 'ageOfMoon')),
-                          'currentTimeHour':        self.nestedLookup(weather_data, keys=('moon_phase', 'current_time', 'hour')),
-                          'currentTimeMinute':      self.nestedLookup(weather_data, keys=('moon_phase', 'current_time', 'minute')),
-                          'hemisphere':             self.nestedLookup(weather_data, keys=('moon_phase', 'hemisphere')),
-                          'phaseOfMoon':            self.nestedLookup(weather_data, keys=('moon_phase', 'phaseofMoon')),
-                          'sunriseHourMoonphase':   self.nestedLookup(weather_data, keys=('moon_phase', 'sunrise', 'hour')),
-                          'sunriseHourSunphase':    self.nestedLookup(weather_data, keys=('sun_phase', 'sunrise', 'hour')),
-                          'sunriseMinuteMoonphase': self.nestedLookup(weather_data, keys=('moon_phase', 'sunrise', 'minute')),
-                          'sunriseMinuteSunphase':  self.nestedLookup(weather_data, keys=('sun_phase', 'sunrise', 'minute')),
-                          'sunsetHourMoonphase':    self.nestedLookup(weather_data, keys=('moon_phase', 'sunset', 'hour')),
-                          'sunsetHourSunphase':     self.nestedLookup(weather_data, keys=('sun_phase', 'sunset', 'hour')),
-                          'sunsetMinuteMoonphase':  self.nestedLookup(weather_data, keys=('moon_phase', 'sunset', 'minute')),
-                          'sunsetMinuteSunphase':   self.nestedLookup(weather_data, keys=('sun_phase', 'sunset', 'minute'))
-                          }
+            self.updateAddress(dev, station_id)
+            self.publishStates(dev, updates)
+            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
 
-        try:
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.errorLog(u"Problem parsing astronomy data.")
+            dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
+            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
 
-            dev.updateStateOnServer('currentObservation', value=current_observation, uiValue=current_observation)
-            dev.updateStateOnServer('currentObservationEpoch', value=current_observation_epoch, uiValue=current_observation_epoch)
+    def parseDeviceData(self, dev):
+        """ The parseDeviceData() method checks the weather data for the
+        device's location (location errors, estimated conditions and the age
+        of the observation) and, if the data are good, hands the device to the
+        parse method for its model. It is used by the refresh cycle and when a
+        device is started with data already in the master weather
+        dictionary. """
 
-            # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
-            dev.updateStateOnServer('currentObservation24hr', value=current_observation_24hr, uiValue=current_observation_24hr)
+        location = dev.pluginProps['location']
 
-            for key, value in astronomy_dict.iteritems():
-                dev.updateStateOnServer(key, value=value, uiValue=value)
+        # If we've successfully downloaded data from Weather Underground, let's unpack it and assign it to the relevant device.
+        try:
+            # If a site location query returns a site unknown (in other words 'querynotfound' result, notify the user).
+            response = self.masterWeatherDict[location]['response']['error']['type']
+            if response == 'querynotfound':
+                self.errorLog(u"Location query for {0} not found. Please ensure that device "
+                              u"location follows examples precisely.".format(dev.name))
+                dev.updateStateOnServer('onOffState', value=False, uiValue=u"Bad Loc")
+
+        except (KeyError, Exception) as error:
+            # Weather device types. There are multiples of these because the names of the device
+            # models evolved over time.
+            # If the error key is not present, that's good. Continue.
+            error = u"{0}".format(error)
+            if error == "'error'":
+                pass
+            else:
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
 
-            phase_of_moon = astronomy_dict['phaseOfMoon'].replace(' ', '_')
-            dev.updateStateOnServer('phaseOfMoonIcon', value=phase_of_moon, uiValue=phase_of_moon)
+            # Estimated Weather Data (integer: 1 if estimated weather)
+            ignore_estimated = False
+            try:
+                estimated = self.masterWeatherDict[location]['current_observation']['estimated']['estimated']
+                if estimated == 1:
+                    self.errorLog(u"These are estimated conditions. There may be other functioning weather stations nearby. ({0})".format(dev.name))
+                    dev.updateStateOnServer('estimated', value="true", uiValue=u"True")
+
+                # If the user wants to skip updates when weather data are estimated.
+                if self.pluginPrefs.get('ignoreEstimated', False):
+                    ignore_estimated = True
+
+            except KeyError as error:
+                error = u"{0}".format(error)
+                if error == "'estimated'":
+                    # The estimated key must not be present. Therefore, we assumed the conditions
+                    # are not estimated.
+                    dev.updateStateOnServer('estimated', value="false", uiValue=u"False")
+                    ignore_estimated = False
+                else:
+                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
 
-            # Percent illuminated is excluded from the astronomy dict for further processing.
-            percent_illuminated = self.floatEverything(state_name=u"Percent Illuminated", val=percent_illuminated)
-            dev.updateStateOnServer('percentIlluminated', value=percent_illuminated, uiValue=u"{0}".format(percent_illuminated))
+            except Exception:
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                ignore_estimated = False
 
-            # ========================= NEW =========================
-            # Sunrise and Sunset states
+            # Compare last data epoch to the one we just downloaded. Proceed if the data are newer.
+            # Note: WUnderground have been known to send data that are 5-6 months old. This flag helps ensure that known data are retained if the new data is not
+            # actually newer that what we already have.
+            try:
+                # New devices may not have an epoch value yet.
+                device_epoch = dev.states['currentObservationEpoch']
+                try:
+                    device_epoch = int(device_epoch)
+                except ValueError:
+                    device_epoch = 0
 
-            # Get today's date
-            year = dt.datetime.today().year
-            month = dt.datetime.today().month
-            day = dt.datetime.today().day
-            datetime_formatter = "{0} {1}".format(self.date_format, self.time_format)  # Get the latest format preferences
+                # If we don't know the age of the data, we don't update.
+                try:
+                    weather_data_epoch = int(self.masterWeatherDict[location]['current_observation']['observation_epoch'])
+                except ValueError:
+                    weather_data_epoch = 0
 
-            sunrise = dt.datetime(year, month, day, int(astronomy_dict['sunriseHourMoonphase']), int(astronomy_dict['sunriseMinuteMoonphase']))
-            sunset = dt.datetime(year, month, day, int(astronomy_dict['sunsetHourMoonphase']), int(astronomy_dict['sunsetMinuteMoonphase']))
+                good_time = device_epoch <= weather_data_epoch
+                if not good_time:
+                    indigo.server.log(u"Latest data are older than data we already have. Skipping {0} update.".format(dev.name), type="WUnderground Status")
+            except KeyError:
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                indigo.server.log(u"{0} cannot determine age of data. Skipping until next "
+                                  u"scheduled poll.".format(dev.name), type="WUnderground Status")
+                good_time = False
 
-            sunrise_string = dt.datetime.strftime(sunrise, datetime_formatter)
-            dev.updateStateOnServer('sunriseString', value=sunrise_string)
+            # If the weather dict is not empty, the data are newer than the data we already have,
+            # an the user doesn't want to ignore estimated weather conditions, let's update the
+            # devices.
+            if self.masterWeatherDict != {} and good_time and not ignore_estimated:
 
-            sunset_string = dt.datetime.strftime(sunset, datetime_formatter)
-            dev.updateStateOnServer('sunsetString', value=sunset_string)
+                # Almanac devices.
+                if dev.model in ['Almanac', 'WUnderground Almanac']:
+                    self.parseAlmanacData(dev)
 
-            sunrise_epoch = int(time.mktime(sunrise.timetuple()))
-            dev.updateStateOnServer('sunriseEpoch', value=sunrise_epoch)
+                # Astronomy devices.
+                elif dev.model in ['Astronomy', 'WUnderground Astronomy']:
+                    self.parseAstronomyData(dev)
 
-            sunset_epoch = int(time.mktime(sunset.timetuple()))
-            dev.updateStateOnServer('sunsetEpoch', value=sunset_epoch)
+                # Hourly Forecast devices.
+                elif dev.model in ['WUnderground Hourly Forecast', 'Hourly Forecast']:
+                    self.parseHourlyData(dev)
 
-            # ========================= NEW =========================
+                # Ten Day Forecast devices.
+                elif dev.model in ['Ten Day Forecast', 'WUnderground Ten Day Forecast']:
+                    self.parseTenDayData(dev)
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
-            dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+                # Tide devices.
+                elif dev.model in ['WUnderground Tides', 'Tides']:
+                    self.parseTidesData(dev)
 
-        except Exception:
-            self.Fogbert.pluginErrorHandler(traceback.format_exc())
-            self.errorLog(u"Problem parsing astronomy data.")
-            dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+                # Weather devices.
+                elif dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
+                    self.parseWeatherData(dev)
+                    self.parseAlertsData(dev)
+                    self.parseForecastData(dev)
+                    dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
+
+                    if self.pluginPrefs.get('updaterEmailsEnabled', False):
+                        self.emailForecast(dev)
 
     def parseForecastData(self, dev):
         """ The parseForecastData() method takes weather forecast data and
@@ -1341,10 +1861,13 @@ class Plugin(indigo.PluginBase):
 
         weather_data = self.masterWeatherDict[location]
 
-        forecast_data_text   = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))
-        forecast_data_simple = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday'))
+        forecast_data_text   = wuPath.path('forecast', 'txt_forecast', 'forecastday')(weather_data)
+        forecast_data_simple = wuPath.path('forecast', 'simpleforecast', 'forecastday')(weather_data)
 
         try:
+            # State updates are collected here and sent together (see publishStates().)
+            updates = []
+
             # Metric:
             if config_menu_units in ['M', 'MS']:
 
@@ -1352,59 +1875,59 @@ class Plugin(indigo.PluginBase):
                 for day in forecast_data_text:
 
                     if fore_counter <= 8:
-                        fore_text = self.nestedLookup(day, keys=('fcttext_metric',)).lstrip('\n')
-                        icon      = self.nestedLookup(day, keys=('icon',))
-                        title     = self.nestedLookup(day, keys=('title',))
+                        fore_text = wuPath.path('fcttext_metric')(day).lstrip('\n')
+                        icon      = wuPath.path('icon')(day)
+                        title     = wuPath.path('title')(day)
 
-                        dev.updateStateOnServer(u"foreText{0}".format(fore_counter), value=fore_text, uiValue=fore_text)
-                        dev.updateStateOnServer(u"icon{0}".format(fore_counter), value=icon, uiValue=icon)
-                        dev.updateStateOnServer(u"foreTitle{0}".format(fore_counter), value=title, uiValue=title)
+                        updates.append((u"foreText{0}".format(fore_counter), fore_text, fore_text))
+                        updates.append((u"icon{0}".format(fore_counter), icon, icon))
+                        updates.append((u"foreTitle{0}".format(fore_counter), title, title))
                         fore_counter += 1
 
                 fore_counter = 1
                 for day in forecast_data_simple:
 
                     if fore_counter <= 4:
-                        average_wind = self.nestedLookup(day, keys=('avewind', 'kph'))
-                        conditions   = self.nestedLookup(day, keys=('conditions',))
-                        fore_day     = self.nestedLookup(day, keys=('date', 'weekday'))
-                        fore_high    = self.nestedLookup(day, keys=('high', 'celsius'))
-                        fore_low     = self.nestedLookup(day, keys=('low', 'celsius'))
-                        icon         = self.nestedLookup(day, keys=('icon',))
-                        max_humidity = self.nestedLookup(day, keys=('maxhumidity',))
-                        pop          = self.nestedLookup(day, keys=('pop',))
+                        average_wind = wuPath.path('avewind', 'kph')(day)
+                        conditions   = wuPath.path('conditions')(day)
+                        fore_day     = wuPath.path('date', 'weekday')(day)
+                        fore_high    = wuPath.path('high', 'celsius')(day)
+                        fore_low     = wuPath.path('low', 'celsius')(day)
+                        icon         = wuPath.path('icon')(day)
+                        max_humidity = wuPath.path('maxhumidity')(day)
+                        pop          = wuPath.path('pop')(day)
 
                         # Wind in KPH or MPS?
                         value, ui_value = self.fixCorruptedData(state_name=u"foreWind{0}".format(fore_counter), val=average_wind)  # fixCorruptedData() returns float, unicode string
                         if config_menu_units == 'MS':
                             value = value / 3.6
                             ui_value = self.uiFormatWind(dev=dev, state_name=u"foreWind{0}".format(fore_counter), val=value)
-                            dev.updateStateOnServer(u"foreWind{0}".format(fore_counter), value=value, uiValue=ui_value)  # MPS
+                            updates.append((u"foreWind{0}".format(fore_counter), value, ui_value))  # MPS
 
                         else:
                             ui_value = self.uiFormatWind(dev=dev, state_name=u"foreWind{0}".format(fore_counter), val=ui_value)
-                            dev.updateStateOnServer(u"foreWind{0}".format(fore_counter), value=value, uiValue=ui_value)  # KPH
+                            updates.append((u"foreWind{0}".format(fore_counter), value, ui_value))  # KPH
 
-                        dev.updateStateOnServer(u"conditions{0}".format(fore_counter), value=conditions, uiValue=conditions)
-                        dev.updateStateOnServer(u"foreDay{0}".format(fore_counter), value=fore_day, uiValue=fore_day)
+                        updates.append((u"conditions{0}".format(fore_counter), conditions, conditions))
+                        updates.append((u"foreDay{0}".format(fore_counter), fore_day, fore_day))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreHigh{0}".format(fore_counter), val=fore_high)
                         ui_value = self.uiFormatTemperature(dev=dev, state_name=u"foreHigh{0}".format(fore_counter), val=ui_value)  # uiFormatTemperature() returns unicode string
-                        dev.updateStateOnServer(u"foreHigh{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreHigh{0}".format(fore_counter), value, ui_value))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreLow{0}".format(fore_counter), val=fore_low)
                         ui_value = self.uiFormatTemperature(dev=dev, state_name=u"foreLow{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreLow{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreLow{0}".format(fore_counter), value, ui_value))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreHum{0}".format(fore_counter), val=max_humidity)
                         ui_value = self.uiFormatPercentage(dev=dev, state_name=u"foreHum{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreHum{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreHum{0}".format(fore_counter), value, ui_value))
 
-                        dev.updateStateOnServer(u"foreIcon{0}".format(fore_counter), value=icon, uiValue=icon)
+                        updates.append((u"foreIcon{0}".format(fore_counter), icon, icon))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"forePop{0}".format(fore_counter), val=pop)
                         ui_value = self.uiFormatPercentage(dev=dev, state_name=u"forePop{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"forePop{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"forePop{0}".format(fore_counter), value, ui_value))
 
                         fore_counter += 1
 
@@ -1415,13 +1938,13 @@ class Plugin(indigo.PluginBase):
                 for day in forecast_data_text:
 
                     if fore_counter <= 8:
-                        fore_text = self.nestedLookup(day, keys=('fcttext_metric',)).lstrip('\n')
-                        icon      = self.nestedLookup(day, keys=('icon',))
-                        title     = self.nestedLookup(day, keys=('title',))
+                        fore_text = wuPath.path('fcttext_metric')(day).lstrip('\n')
+                        icon      = wuPath.path('icon')(day)
+                        title     = wuPath.path('title')(day)
 
-                        dev.updateStateOnServer(u"foreText{0}".format(fore_counter), value=fore_text, uiValue=fore_text)
-                        dev.updateStateOnServer(u"icon{0}".format(fore_counter), value=icon, uiValue=icon)
-                        dev.updateStateOnServer(u"foreTitle{0}".format(fore_counter), value=title, uiValue=title)
+                        updates.append((u"foreText{0}".format(fore_counter), fore_text, fore_text))
+                        updates.append((u"icon{0}".format(fore_counter), icon, icon))
+                        updates.append((u"foreTitle{0}".format(fore_counter), title, title))
                         fore_counter += 1
 
                 fore_counter = 1
@@ -1429,39 +1952,39 @@ class Plugin(indigo.PluginBase):
 
                     if fore_counter <= 4:
 
-                        average_wind = self.nestedLookup(day, keys=('avewind', 'mph'))
-                        conditions   = self.nestedLookup(day, keys=('conditions',))
-                        fore_day     = self.nestedLookup(day, keys=('date', 'weekday'))
-                        fore_high    = self.nestedLookup(day, keys=('high', 'celsius'))
-                        fore_low     = self.nestedLookup(day, keys=('low', 'celsius'))
-                        icon         = self.nestedLookup(day, keys=('icon',))
-                        max_humidity = self.nestedLookup(day, keys=('maxhumidity',))
-                        pop          = self.nestedLookup(day, keys=('pop',))
+                        average_wind = wuPath.path('avewind', 'mph')(day)
+                        conditions   = wuPath.path('conditions')(day)
+                        fore_day     = wuPath.path('date', 'weekday')(day)
+                        fore_high    = wuPath.path('high', 'celsius')(day)
+                        fore_low     = wuPath.path('low', 'celsius')(day)
+                        icon         = wuPath.path('icon')(day)
+                        max_humidity = wuPath.path('maxhumidity')(day)
+                        pop          = wuPath.path('pop')(day)
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreWind{0}".format(fore_counter), val=average_wind)
                         ui_value = self.uiFormatWind(dev=dev, state_name=u"foreWind{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreWind{0}".format(fore_counter), value=value, uiValue=u"{0}".format(ui_value, wind_units))
+                        updates.append((u"foreWind{0}".format(fore_counter), value, u"{0}".format(ui_value, wind_units)))
 
-                        dev.updateStateOnServer(u"conditions{0}".format(fore_counter), value=conditions, uiValue=conditions)
-                        dev.updateStateOnServer(u"foreDay{0}".format(fore_counter), value=fore_day, uiValue=fore_day)
+                        updates.append((u"conditions{0}".format(fore_counter), conditions, conditions))
+                        updates.append((u"foreDay{0}".format(fore_counter), fore_day, fore_day))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreHigh{0}".format(fore_counter), val=fore_high)
                         ui_value = self.uiFormatTemperature(dev=dev, state_name=u"foreHigh{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreHigh{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreHigh{0}".format(fore_counter), value, ui_value))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreLow{0}".format(fore_counter), val=fore_low)
                         ui_value = self.uiFormatTemperature(dev=dev, state_name=u"foreLow{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreLow{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreLow{0}".format(fore_counter), value, ui_value))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreHum{0}".format(fore_counter), val=max_humidity)
                         ui_value = self.uiFormatPercentage(dev=dev, state_name=u"foreHum{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreHum{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreHum{0}".format(fore_counter), value, ui_value))
 
-                        dev.updateStateOnServer(u"foreIcon{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreIcon{0}".format(fore_counter), value, ui_value))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"forePop{0}".format(fore_counter), val=pop)
                         ui_value = self.uiFormatPercentage(dev=dev, state_name=u"forePop{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"forePop{0}".format(fore_counter), value=icon, uiValue=icon)
+                        updates.append((u"forePop{0}".format(fore_counter), icon, icon))
 
                         fore_counter += 1
 
@@ -1472,55 +1995,57 @@ class Plugin(indigo.PluginBase):
                 for day in forecast_data_text:
 
                     if fore_counter <= 8:
-                        fore_text = self.nestedLookup(day, keys=('fcttext',)).lstrip('\n')
-                        icon      = self.nestedLookup(day, keys=('icon',))
-                        title     = self.nestedLookup(day, keys=('title',))
+                        fore_text = wuPath.path('fcttext')(day).lstrip('\n')
+                        icon      = wuPath.path('icon')(day)
+                        title     = wuPath.path('title')(day)
 
-                        dev.updateStateOnServer(u"foreText{0}".format(fore_counter), value=fore_text, uiValue=fore_text)
-                        dev.updateStateOnServer(u"icon{0}".format(fore_counter), value=icon, uiValue=icon)
-                        dev.updateStateOnServer(u"foreTitle{0}".format(fore_counter), value=title, uiValue=title)
+                        updates.append((u"foreText{0}".format(fore_counter), fore_text, fore_text))
+                        updates.append((u"icon{0}".format(fore_counter), icon, icon))
+                        updates.append((u"foreTitle{0}".format(fore_counter), title, title))
                         fore_counter += 1
 
                 fore_counter = 1
                 for day in forecast_data_simple:
 
                     if fore_counter <= 4:
-                        average_wind = self.nestedLookup(day, keys=('avewind', 'mph'))
-                        conditions   = self.nestedLookup(day, keys=('conditions',))
-                        fore_day     = self.nestedLookup(day, keys=('date', 'weekday'))
-                        fore_high    = self.nestedLookup(day, keys=('high', 'fahrenheit'))
-                        fore_low     = self.nestedLookup(day, keys=('low', 'fahrenheit'))
-                        icon         = self.nestedLookup(day, keys=('icon',))
-                        max_humidity = self.nestedLookup(day, keys=('maxhumidity',))
-                        pop          = self.nestedLookup(day, keys=('pop',))
+                        average_wind = wuPath.path('avewind', 'mph')(day)
+                        conditions   = wuPath.path('conditions')(day)
+                        fore_day     = wuPath.path('date', 'weekday')(day)
+                        fore_high    = wuPath.path('high', 'fahrenheit')(day)
+                        fore_low     = wuPath.path('low', 'fahrenheit')(day)
+                        icon         = wuPath.path('icon')(day)
+                        max_humidity = wuPath.path('maxhumidity')(day)
+                        pop          = wuPath.path('pop')(day)
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreWind{0}".format(fore_counter), val=average_wind)
                         ui_value = self.uiFormatWind(dev=dev, state_name=u"foreWind{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreWind{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreWind{0}".format(fore_counter), value, ui_value))
 
-                        dev.updateStateOnServer(u"conditions{0}".format(fore_counter), value=conditions, uiValue=conditions)
-                        dev.updateStateOnServer(u"foreDay{0}".format(fore_counter), value=fore_day, uiValue=fore_day)
+                        updates.append((u"conditions{0}".format(fore_counter), conditions, conditions))
+                        updates.append((u"foreDay{0}".format(fore_counter), fore_day, fore_day))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreHigh{0}".format(fore_counter), val=fore_high)
                         ui_value = self.uiFormatTemperature(dev=dev, state_name=u"foreHigh{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreHigh{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreHigh{0}".format(fore_counter), value, ui_value))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreLow{0}".format(fore_counter), val=fore_low)
                         ui_value = self.uiFormatTemperature(dev=dev, state_name=u"foreLow{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreLow{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreLow{0}".format(fore_counter), value, ui_value))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"foreHum{0}".format(fore_counter), val=max_humidity)
                         ui_value = self.uiFormatPercentage(dev=dev, state_name=u"foreHum{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"foreHum{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"foreHum{0}".format(fore_counter), value, ui_value))
 
-                        dev.updateStateOnServer(u"foreIcon{0}".format(fore_counter), value=icon, uiValue=icon)
+                        updates.append((u"foreIcon{0}".format(fore_counter), icon, icon))
 
                         value, ui_value = self.fixCorruptedData(state_name=u"forePop{0}".format(fore_counter), val=pop)
                         ui_value = self.uiFormatPercentage(dev=dev, state_name=u"forePop{0}".format(fore_counter), val=ui_value)
-                        dev.updateStateOnServer(u"forePop{0}".format(fore_counter), value=value, uiValue=ui_value)
+                        updates.append((u"forePop{0}".format(fore_counter), value, ui_value))
 
                         fore_counter += 1
 
+            self.publishStates(dev, updates)
+
         except (KeyError, Exception):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.errorLog(u"Problem parsing weather forecast data.")
@@ -1553,165 +2078,37 @@ class Plugin(indigo.PluginBase):
             elif 5 < difference:
                 diff_text = u"much warmer"
 
-            dev.updateStateOnServer('foreTextShort', value=diff_text, uiValue=diff_text)
-
             if diff_text != u"unknown":
-                dev.updateStateOnServer('foreTextLong', value=u"Today is forecast to be {0} than yesterday.".format(diff_text))
+                diff_long = u"Today is forecast to be {0} than yesterday.".format(diff_text)
 
             else:
-                dev.updateStateOnServer('foreTextLong', value=u"Unable to compare today's forecast with yesterday's high temperature.")
+                diff_long = u"Unable to compare today's forecast with yesterday's high temperature."
+
+            self.publishStates(dev, [('foreTextShort', diff_text, diff_text), ('foreTextLong', diff_long, None)])
 
         except (KeyError, Exception):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.errorLog(u"Problem comparing forecast and history data.")
 
-            for state in ['foreTextShort', 'foreTextLong']:
-                dev.updateStateOnServer(state, value=u"Unknown", uiValue=u"Unknown")
+            self.publishStates(dev, [(state, u"Unknown", u"Unknown") for state in ['foreTextShort', 'foreTextLong']])
 
     def parseHourlyData(self, dev):
         """ The parseHourlyData() method takes hourly weather forecast data
-        and parses it to device states. """
-
-        config_menu_units = dev.pluginProps.get('configMenuUnits', '')
-        location          = dev.pluginProps['location']
-
-        weather_data  = self.masterWeatherDict[location]
-        forecast_data = self.nestedLookup(weather_data, keys=('hourly_forecast',))
-
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
+        and parses it to device states (see wuStates.kHourly.) """
 
         if self.pluginPrefs['showDebugLevel'] >= 3:
             self.debugLog(u"parseHourlyData(self, dev) method called.")
 
         try:
 
-            dev.updateStateOnServer('currentObservation', value=current_observation_time, uiValue=current_observation_time)
-            dev.updateStateOnServer('currentObservationEpoch', value=current_observation_epoch, uiValue=current_observation_epoch)
-
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
-            dev.updateStateOnServer('currentObservation24hr', value=u"{0}".format(current_observation_24hr))
-
-            fore_counter = 1
-            for observation in forecast_data:
-
-                if fore_counter <= 24:
-
-                    civil_time          = self.nestedLookup(observation, keys=('FCTTIME', 'civil'))
-                    condition           = self.nestedLookup(observation, keys=('condition',))
-                    day                 = self.nestedLookup(observation, keys=('FCTTIME', 'mday_padded'))
-                    fore_humidity       = self.nestedLookup(observation, keys=('humidity',))
-                    fore_pop            = self.nestedLookup(observation, keys=('pop',))
-                    fore_qpf_metric     = self.nestedLookup(observation, keys=('qpf', 'metric'))
-                    fore_qpf_standard   = self.nestedLookup(observation, keys=('qpf', 'english'))
-                    fore_snow_metric    = self.nestedLookup(observation, keys=('snow', 'metric'))
-                    fore_snow_standard  = self.nestedLookup(observation, keys=('snow', 'english'))
-                    fore_temp_metric    = self.nestedLookup(observation, keys=('temp', 'metric'))
-                    fore_temp_standard  = self.nestedLookup(observation, keys=('temp', 'english'))
-                    hour                = self.nestedLookup(observation, keys=('FCTTIME', 'hour_padded'))
-                    icon                = self.nestedLookup(observation, keys=('icon',))
-                    minute              = self.nestedLookup(observation, keys=('FCTTIME', 'min'))
-                    month               = self.nestedLookup(observation, keys=('FCTTIME', 'mon_padded'))
-                    wind_degrees        = self.nestedLookup(observation, keys=('wdir', 'degrees'))
-                    wind_dir            = self.nestedLookup(observation, keys=('wdir', 'dir'))
-                    wind_speed_metric   = self.nestedLookup(observation, keys=('wspd', 'metric'))
-                    wind_speed_standard = self.nestedLookup(observation, keys=('wspd', 'english'))
-                    year                = self.nestedLookup(observation, keys=('FCTTIME', 'year'))
-
-                    wind_speed_mps = u"{0}".format(float(wind_speed_metric) * 0.277778)
-
-                    # Add leading zero to counter value for device state names 1-9.
-                    if fore_counter < 10:
-                        fore_counter_text = u"0{0}".format(fore_counter)
-                    else:
-                        fore_counter_text = fore_counter
-
-                    # Values that are set regardless of unit setting:
-                    dev.updateStateOnServer(u"h{0}_cond".format(fore_counter_text), value=condition, uiValue=condition)
-                    dev.updateStateOnServer(u"h{0}_icon".format(fore_counter_text), value=icon, uiValue=icon)
-                    dev.updateStateOnServer(u"h{0}_proper_icon".format(fore_counter_text), value=icon, uiValue=icon)
-                    dev.updateStateOnServer(u"h{0}_time".format(fore_counter_text), value=civil_time, uiValue=civil_time)
-                    dev.updateStateOnServer(u"h{0}_windDirLong".format(fore_counter_text), value=self.verboseWindNames(u"h{0}_windDirLong".format(fore_counter_text), wind_dir))
-                    dev.updateStateOnServer(u"h{0}_windDegrees".format(fore_counter_text), value=int(wind_degrees), uiValue=str(int(wind_degrees)))
-
-                    time_long = u"{0}-{1}-{2} {3}:{4}".format(year, month, day, hour, minute)
-                    dev.updateStateOnServer(u"h{0}_timeLong".format(fore_counter_text), value=time_long, uiValue=time_long)
-
-                    value, ui_value = self.fixCorruptedData(state_name=u"h{0}_humidity".format(fore_counter_text), val=fore_humidity)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name=u"h{0}_humidity".format(fore_counter_text), val=ui_value)
-                    dev.updateStateOnServer(u"h{0}_humidity".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    value, ui_value = self.fixCorruptedData(state_name=u"h{0}_precip".format(fore_counter_text), val=fore_pop)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name=u"h{0}_precip".format(fore_counter_text), val=ui_value)
-                    dev.updateStateOnServer(u"h{0}_precip".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    # Metric temperature (°C)
-                    if config_menu_units in ("M", "MS", "I"):
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_temp".format(fore_counter_text), val=fore_temp_metric)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name=u"h{0}_temp".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_temp".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    # Standard temperature (°F):
-                    if config_menu_units == "S":
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_temp".format(fore_counter_text), val=fore_temp_standard)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name=u"h{0}_temp".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_temp".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    # KPH Wind:
-                    if config_menu_units == "M":
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_windSpeed".format(fore_counter_text), val=wind_speed_metric)
-                        ui_value = self.uiFormatWind(dev=dev, state_name=u"h{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_windSpeed".format(fore_counter_text), value=value, uiValue=ui_value)
-                        dev.updateStateOnServer(u"h{0}_windSpeedIcon".format(fore_counter_text), value=u"{0}".format(wind_speed_metric).replace('.', ''))
-
-                    # MPS Wind:
-                    if config_menu_units == "MS":
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_windSpeed".format(fore_counter_text), val=wind_speed_mps)
-                        ui_value = self.uiFormatWind(dev=dev, state_name=u"h{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_windSpeed".format(fore_counter_text), value=value, uiValue=ui_value)
-                        dev.updateStateOnServer(u"h{0}_windSpeedIcon".format(fore_counter_text), value=u"{0}".format(wind_speed_mps).replace('.', ''))
-
-                    # Metric QPF and Snow:
-                    if config_menu_units in ("M", "MS"):
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_qpf".format(fore_counter_text), val=fore_qpf_metric)
-                        ui_value = self.uiFormatRain(dev=dev, state_name=u"h{0}_qpf".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_qpf".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_snow".format(fore_counter_text), val=fore_snow_metric)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name=u"h{0}_snow".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_snow".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    # Standard QPF, Snow and Wind:
-                    if config_menu_units == ("I", "S"):
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_qpf".format(fore_counter_text), val=fore_qpf_standard)
-                        ui_value = self.uiFormatRain(dev=dev, state_name=u"h{0}_qpf".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_qpf".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_snow".format(fore_counter_text), val=fore_snow_standard)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name=u"h{0}_snow".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_snow".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"h{0}_windSpeed".format(fore_counter_text), val=wind_speed_standard)
-                        ui_value = self.uiFormatWind(dev=dev, state_name=u"h{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"h{0}_windSpeed".format(fore_counter_text), value=value, uiValue=ui_value)
-                        dev.updateStateOnServer(u"h{0}_windSpeedIcon".format(fore_counter_text), value=u"{0}".format(wind_speed_standard).replace('.', ''))
-
-                    if dev.pluginProps.get('configWindDirUnits', '') == "DIR":
-                        dev.updateStateOnServer(u"h{0}_windDir".format(fore_counter_text), value=wind_dir, uiValue=wind_dir)
-
-                    else:
-                        dev.updateStateOnServer(u"h{0}_windDir".format(fore_counter_text), value=wind_degrees, uiValue=wind_degrees)
-
-                    fore_counter += 1
-
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
-            dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
+            weather_data = self.masterWeatherDict[dev.pluginProps['location']]
+            station_id   = wuPath.path('current_observation', 'station_id')(weather_data)
+
+            updates = self.parseStates('hourly', dev, weather_data)
+            updates.append(('onOffState', True, u" "))
+
+            self.updateAddress(dev, station_id)
+            self.publishStates(dev, updates)
             dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
 
         except Exception:
@@ -1720,193 +2117,42 @@ class Plugin(indigo.PluginBase):
             dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
             dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
 
-    def parseTenDayData(self, dev):
-        """ The parseTenDayData() method takes 10 day forecast data and
-        parses it to device states. """
-
-        if self.pluginPrefs['showDebugLevel'] >= 3:
-            self.debugLog(u"parseTenDayData(self, dev) method called.")
-
-        # Reload the date and time preferences in case they've changed.
-        self.date_format = self.Formatter.dateFormat()
-        self.time_format = self.Formatter.timeFormat()
+    def parseStates(self, name, dev, weather_data):
+        """ The parseStates() method returns the state updates for a device
+        from the state table name (see wuStates): a list of (state id, value,
+        uiValue) tuples. Nothing is sent to the server here, so a device whose
+        data can't be parsed isn't left half updated. """
 
-        config_menu_units = dev.pluginProps.get('configMenuUnits', '')
-        location          = dev.pluginProps['location']
-        wind_speed_units  = dev.pluginProps.get('configWindSpdUnits', '')
+        context = wuStates.Context(self, dev)
+        updates = []
 
-        weather_data = self.masterWeatherDict[location]
-        forecast_day = self.masterWeatherDict[location].get('forecast', {}).get('simpleforecast', {}).get('forecastday', {})
+        # Values that don't depend on the device's props are converted once for all the devices using this data.
+        record = self.locationRecords.get(id(weather_data))
+        if record is None or record.data is not weather_data:
+            record = self.locationRecords[id(weather_data)] = wuStates.LocationRecord(weather_data)
 
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
+        for table in self.stateTable(name, dev):
+            updates.extend(table.evaluate(context, weather_data, record))
 
-        try:
+        return updates
 
-            dev.updateStateOnServer('currentObservation', value=current_observation_time, uiValue=current_observation_time)
-            dev.updateStateOnServer('currentObservationEpoch', value=current_observation_epoch, uiValue=current_observation_epoch)
-
-            # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(float(current_observation_epoch)))
-            dev.updateStateOnServer('currentObservation24hr', value=current_observation_24hr)
-
-            fore_counter = 1
-
-            for observation in forecast_day:
-
-                conditions         = self.nestedLookup(observation, keys=('conditions',))
-                forecast_day       = self.nestedLookup(observation, keys=('date', 'epoch'))
-                fore_pop           = self.nestedLookup(observation, keys=('pop',))
-                fore_qpf_metric    = self.nestedLookup(observation, keys=('qpf_allday', 'mm'))
-                fore_qpf_standard  = self.nestedLookup(observation, keys=('qpf_allday', 'in'))
-                fore_snow_metric   = self.nestedLookup(observation, keys=('snow_allday', 'cm'))
-                fore_snow_standard = self.nestedLookup(observation, keys=('snow_allday', 'in'))
-                high_temp_metric   = self.nestedLookup(observation, keys=('high', 'celsius'))
-                high_temp_standard = self.nestedLookup(observation, keys=('high', 'fahrenheit'))
-                icon               = self.nestedLookup(observation, keys=('icon',))
-                low_temp_metric    = self.nestedLookup(observation, keys=('low', 'celsius'))
-                low_temp_standard  = self.nestedLookup(observation, keys=('low', 'fahrenheit'))
-                max_humidity       = self.nestedLookup(observation, keys=('maxhumidity',))
-                weekday            = self.nestedLookup(observation, keys=('date', 'weekday'))
-                wind_avg_degrees   = self.nestedLookup(observation, keys=('avewind', 'degrees'))
-                wind_avg_dir       = self.nestedLookup(observation, keys=('avewind', 'dir'))
-                wind_avg_metric    = self.nestedLookup(observation, keys=('avewind', 'kph'))
-                wind_avg_standard  = self.nestedLookup(observation, keys=('avewind', 'mph'))
-                wind_max_degrees   = self.nestedLookup(observation, keys=('maxwind', 'degrees'))
-                wind_max_dir       = self.nestedLookup(observation, keys=('maxwind', 'dir'))
-                wind_max_metric    = self.nestedLookup(observation, keys=('maxwind', 'kph'))
-                wind_max_standard  = self.nestedLookup(observation, keys=('maxwind', 'mph'))
-
-                if fore_counter <= 10:
-
-                    # Add leading zero to counter value for device state names 1-9.
-                    if fore_counter < 10:
-                        fore_counter_text = "0{0}".format(fore_counter)
-                    else:
-                        fore_counter_text = fore_counter
-
-                    dev.updateStateOnServer(u"d{0}_conditions".format(fore_counter_text), value=conditions, uiValue=conditions)
-                    dev.updateStateOnServer(u"d{0}_day".format(fore_counter_text), value=weekday, uiValue=weekday)
-
-                    # Forecast day
-                    forecast_day = time.strftime(self.date_format, time.localtime(float(forecast_day)))
-                    dev.updateStateOnServer(u"d{0}_date".format(fore_counter_text), value=forecast_day, uiValue=forecast_day)
-
-                    # Pop
-                    value, ui_value = self.fixCorruptedData(state_name=u"d{0}_pop".format(fore_counter_text), val=fore_pop)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name=u"d{0}_pop".format(fore_counter_text), val=ui_value)
-                    dev.updateStateOnServer(u"d{0}_pop".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    # Forecast humidity (all day).
-                    value, ui_value = self.fixCorruptedData(state_name=u"d{0}_humidity".format(fore_counter_text), val=max_humidity)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name=u"d{0}_humidity".format(fore_counter_text), val=ui_value)
-                    dev.updateStateOnServer(u"d{0}_humidity".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    # Forecast icon (all day).
-                    dev.updateStateOnServer(u"d{0}_icon".format(fore_counter_text), value=u"{0}".format(icon))
-
-                    # Wind. This can be impacted by whether the user wants average wind or max wind.
-                    # Three states are affected by this setting: _windDegrees, _windDir, and _windDirLong.
-                    if wind_speed_units == "AVG":
-                        wind_degrees = wind_avg_degrees
-                        wind_dir = wind_avg_dir
-                    else:
-                        wind_degrees = wind_max_degrees
-                        wind_dir = wind_max_dir
-
-                    value, ui_value = self.fixCorruptedData(state_name=u"d{0}_windDegrees".format(fore_counter_text), val=wind_degrees)
-                    dev.updateStateOnServer(u"d{0}_windDegrees".format(fore_counter_text), value=int(value), uiValue=str(int(value)))
-
-                    dev.updateStateOnServer(u"d{0}_windDir".format(fore_counter_text), value=wind_dir, uiValue=wind_dir)
-
-                    wind_long_name = self.verboseWindNames(state_name=u"d{0}_windDirLong".format(fore_counter_text), val=wind_dir)
-                    dev.updateStateOnServer(u"d{0}_windDirLong".format(fore_counter_text), value=wind_long_name, uiValue=wind_long_name)
-
-                    if config_menu_units in ["I", "M", "MS"]:
-
-                        # High Temperature (Metric)
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_high".format(fore_counter_text), val=high_temp_metric)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name=u"d{0}_high".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_high".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        # Low Temperature (Metric)
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_low".format(fore_counter_text), val=low_temp_metric)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name=u"d{0}_low".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_low".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                    # User preference is Metric.
-                    if config_menu_units in ["M", "MS"]:
-
-                        # QPF Amount
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_qpf".format(fore_counter_text), val=fore_qpf_metric)
-                        ui_value = self.uiFormatRain(dev=dev, state_name=u"d{0}_qpf".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_qpf".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        # Snow Value
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_snow".format(fore_counter_text), val=fore_snow_metric)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name=u"d{0}_snow".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_snow".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        # Wind speed
-                        if wind_speed_units == "AVG":
-                            wind_value = wind_avg_metric
-                        else:
-                            wind_value = wind_max_metric
-
-                        if config_menu_units == 'MS':
-                            wind_value *= 0.277778
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_windSpeed".format(fore_counter_text), val=wind_value)
-                        ui_value = self.uiFormatWind(dev=dev, state_name=u"d{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_windSpeed".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        dev.updateStateOnServer(u"d{0}_windSpeedIcon".format(fore_counter_text), value=unicode(wind_value).replace('.', ''))
-
-                    # User preference is Mixed.
-                    if config_menu_units in ["I", "S"]:
-
-                        # QPF Amount
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_qpf".format(fore_counter_text), val=fore_qpf_standard)
-                        ui_value = self.uiFormatRain(dev=dev, state_name=u"d{0}_qpf".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_qpf".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        # Snow Value
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_snow".format(fore_counter_text), val=fore_snow_standard)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name=u"d{0}_snow".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_snow".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        # Wind speed
-                        if wind_speed_units == "AVG":
-                            wind_value = wind_avg_standard
-                        else:
-                            wind_value = wind_max_standard
-
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_windSpeed".format(fore_counter_text), val=wind_value)
-                        ui_value = self.uiFormatWind(dev=dev, state_name=u"d{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_windSpeed".format(fore_counter_text), value=value, uiValue=ui_value)
-
-                        dev.updateStateOnServer(u"d{0}_windSpeedIcon".format(fore_counter_text), value=unicode(wind_value).replace('.', ''))
+    def parseTenDayData(self, dev):
+        """ The parseTenDayData() method takes 10 day forecast data and
+        parses it to device states (see wuStates.kTenDay.) """
 
-                    # User preference is Standard.
-                    if config_menu_units == "S":
+        if self.pluginPrefs['showDebugLevel'] >= 3:
+            self.debugLog(u"parseTenDayData(self, dev) method called.")
 
-                        # High Temperature (Standard)
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_high".format(fore_counter_text), val=high_temp_standard)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name=u"d{0}_high".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_high".format(fore_counter_text), value=value, uiValue=ui_value)
+        try:
 
-                        # Low Temperature Standard
-                        value, ui_value = self.fixCorruptedData(state_name=u"d{0}_low".format(fore_counter_text), val=low_temp_standard)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name=u"d{0}_low".format(fore_counter_text), val=ui_value)
-                        dev.updateStateOnServer(u"d{0}_low".format(fore_counter_text), value=value, uiValue=ui_value)
+            weather_data = self.masterWeatherDict[dev.pluginProps['location']]
+            station_id   = wuPath.path('current_observation', 'station_id')(weather_data)
 
-                    fore_counter += 1
+            updates = self.parseStates('tenDay', dev, weather_data)
+            updates.append(('onOffState', True, u" "))
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
-            dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
+            self.updateAddress(dev, station_id)
+            self.publishStates(dev, updates)
             dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
 
         except Exception:
@@ -1917,79 +2163,21 @@ class Plugin(indigo.PluginBase):
 
     def parseTidesData(self, dev):
         """ The parseTidesData() method takes tide data and parses it to
-        device states. """
+        device states (see wuStates.kTides.) """
 
         if self.pluginPrefs['showDebugLevel'] >= 3:
             self.debugLog(u"parseTidesData(self, dev) method called.")
 
-        # Reload the date and time preferences in case they've changed.
-        self.date_format = self.Formatter.dateFormat()
-        self.time_format = self.Formatter.timeFormat()
-
-        location = dev.pluginProps['location']
-
-        weather_data = self.masterWeatherDict[location]
-
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
-        tide_min_height           = self.nestedLookup(weather_data, keys=('tide', 'tideSummaryStats', 'minheight'))
-        tide_max_height           = self.nestedLookup(weather_data, keys=('tide', 'tideSummaryStats', 'maxheight'))
-        tide_site                 = self.nestedLookup(weather_data, keys=('tide', 'tideInfo', 'tideSite'))
-        tide_summary              = self.nestedLookup(weather_data, keys=('tide', 'tideSummary'))
-
         try:
 
-            dev.updateStateOnServer('currentObservationEpoch', value=current_observation_epoch, uiValue=current_observation_epoch)
-            dev.updateStateOnServer('currentObservation', value=current_observation_time, uiValue=current_observation_time)
-
-            # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(float(current_observation_epoch)))
-            dev.updateStateOnServer('currentObservation24hr', value=current_observation_24hr)
-
-            # Tide location information. This is only appropriate for some locations.
-            if tide_site in [u"", u" "]:
-                dev.updateStateOnServer('tideSite', value=u"No tide info.")
-
-            else:
-                dev.updateStateOnServer('tideSite', value=tide_site, uiValue=tide_site)
+            weather_data = self.masterWeatherDict[dev.pluginProps['location']]
+            station_id   = wuPath.path('current_observation', 'station_id')(weather_data)
 
-            # Minimum and maximum tide levels.
-            if tide_min_height == 99:
-                dev.updateStateOnServer('minHeight', value=tide_min_height, uiValue=u"--")
+            updates = self.parseStates('tides', dev, weather_data)
+            updates.append(('onOffState', True, u" "))
 
-            else:
-                dev.updateStateOnServer('minHeight', value=tide_min_height, uiValue=tide_min_height)
-
-            if tide_max_height == -99:
-                dev.updateStateOnServer('maxHeight', value=tide_max_height, uiValue=u"--")
-
-            else:
-                dev.updateStateOnServer('maxHeight', value=tide_max_height)
-
-            # Observations
-            tide_counter = 1
-            if len(tide_summary):
-
-                for observation in tide_summary:
-
-                    if tide_counter < 32:
-
-                        pretty      = self.nestedLookup(observation, keys=('date', 'pretty'))
-                        tide_height = self.nestedLookup(observation, keys=('data', 'height'))
-                        tide_type   = self.nestedLookup(observation, keys=('data', 'type'))
-
-                        dev.updateStateOnServer(u"p{0}_height".format(tide_counter), value=tide_height, uiValue=tide_height)
-                        dev.updateStateOnServer(u"p{0}_pretty".format(tide_counter), value=pretty, uiValue=pretty)
-                        dev.updateStateOnServer(u"p{0}_type".format(tide_counter), value=tide_type, uiValue=tide_type)
-
-                        tide_counter += 1
-
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
-
-            dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
+            self.updateAddress(dev, station_id)
+            self.publishStates(dev, updates)
             dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
 
         except Exception:
@@ -2004,361 +2192,127 @@ class Plugin(indigo.PluginBase):
 
     def parseWeatherData(self, dev):
         """ The parseWeatherData() method takes weather data and parses it to
-        Weather Device states. """
+        Weather Device states (see wuStates.kWeather.) """
 
         if self.pluginPrefs['showDebugLevel'] >= 3:
             self.debugLog(u"parseWeatherData(self, dev) method called.")
 
-        # Reload the date and time preferences in case they've changed.
-        self.date_format = self.Formatter.dateFormat()
-        self.time_format = self.Formatter.timeFormat()
-
         try:
 
-            config_itemlist_ui_units = dev.pluginProps.get('itemListUiUnits', '')
-            config_menu_units        = dev.pluginProps.get('configMenuUnits', '')
-            config_distance_units    = dev.pluginProps.get('distanceUnits', '')
-            location                 = dev.pluginProps['location']
-            pressure_units           = dev.pluginProps.get('pressureUnits', '')
-
-            weather_data = self.masterWeatherDict[location]
-            history_data = self.nestedLookup(weather_data, keys=('history', 'dailysummary'))
-
-            current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-            current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-            current_temp_c            = self.nestedLookup(weather_data, keys=('current_observation', 'temp_c',))
-            current_temp_f            = self.nestedLookup(weather_data, keys=('current_observation', 'temp_f',))
-            current_weather           = self.nestedLookup(weather_data, keys=('current_observation', 'weather',))
-            dew_point_c               = self.nestedLookup(weather_data, keys=('current_observation', 'dewpoint_c',))
-            dew_point_f               = self.nestedLookup(weather_data, keys=('current_observation', 'dewpoint_f',))
-            feels_like_c              = self.nestedLookup(weather_data, keys=('current_observation', 'feelslike_c',))
-            feels_like_f              = self.nestedLookup(weather_data, keys=('current_observation', 'feelslike_f',))
-            heat_index_c              = self.nestedLookup(weather_data, keys=('current_observation', 'heat_index_c',))
-            heat_index_f              = self.nestedLookup(weather_data, keys=('current_observation', 'heat_index_f',))
-            icon                      = self.nestedLookup(weather_data, keys=('current_observation', 'icon',))
-            location_city             = self.nestedLookup(weather_data, keys=('location', 'city',))
-            nearby_stations           = self.nestedLookup(weather_data, keys=('location', 'nearby_weather_stations', 'pws', 'station'))
-            precip_1hr_m              = self.nestedLookup(weather_data, keys=('current_observation', 'precip_1hr_metric',))
-            precip_1hr_in             = self.nestedLookup(weather_data, keys=('current_observation', 'precip_1hr_in',))
-            precip_today_m            = self.nestedLookup(weather_data, keys=('current_observation', 'precip_today_metric',))
-            precip_today_in           = self.nestedLookup(weather_data, keys=('current_observation', 'precip_today_in',))
-            pressure_mb               = self.nestedLookup(weather_data, keys=('current_observation', 'pressure_mb',))
-            pressure_in               = self.nestedLookup(weather_data, keys=('current_observation', 'pressure_in',))
-            pressure_trend            = self.nestedLookup(weather_data, keys=('current_observation', 'pressure_trend',))
-            relative_humidity         = self.nestedLookup(weather_data, keys=('current_observation', 'relative_humidity',))
-            solar_radiation           = self.nestedLookup(weather_data, keys=('current_observation', 'solarradiation',))
-            station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id',))
-            uv_index                  = self.nestedLookup(weather_data, keys=('current_observation', 'UV',))
-            visibility_km             = self.nestedLookup(weather_data, keys=('current_observation', 'visibility_km',))
-            visibility_mi             = self.nestedLookup(weather_data, keys=('current_observation', 'visibility_mi',))
-            wind_chill_c              = self.nestedLookup(weather_data, keys=('current_observation', 'windchill_c',))
-            wind_chill_f              = self.nestedLookup(weather_data, keys=('current_observation', 'windchill_f',))
-            wind_degrees              = self.nestedLookup(weather_data, keys=('current_observation', 'wind_degrees',))
-            wind_dir                  = self.nestedLookup(weather_data, keys=('current_observation', 'wind_dir',))
-            wind_gust_kph             = self.nestedLookup(weather_data, keys=('current_observation', 'wind_gust_kph',))
-            wind_gust_mph             = self.nestedLookup(weather_data, keys=('current_observation', 'wind_gust_mph',))
-            wind_speed_kph            = self.nestedLookup(weather_data, keys=('current_observation', 'wind_kph',))
-            wind_speed_mph            = self.nestedLookup(weather_data, keys=('current_observation', 'wind_mph',))
-
-            temp_c, temp_c_ui = self.fixCorruptedData(state_name=u'temp_c', val=current_temp_c)
-            temp_c_ui = self.uiFormatTemperature(dev=dev, state_name=u"tempC (M, MS, I)", val=temp_c_ui)
-
-            temp_f, temp_f_ui = self.fixCorruptedData(state_name=u'temp_f', val=current_temp_f)
-            temp_f_ui = self.uiFormatTemperature(dev=dev, state_name=u"tempF (S)", val=temp_f_ui)
-
-            if config_menu_units in ['M', 'MS', 'I']:
-                dev.updateStateOnServer('temp', value=temp_c, uiValue=temp_c_ui)
-                icon_value = u"{0}".format(str(round(temp_c, 0)).replace('.', ''))
-                dev.updateStateOnServer('tempIcon', value=icon_value)
+            weather_data = self.masterWeatherDict[dev.pluginProps['location']]
+            station_id   = wuPath.path('current_observation', 'station_id')(weather_data)
 
-            else:
-                dev.updateStateOnServer('temp', value=temp_f, uiValue=temp_f_ui)
-                icon_value = u"{0}".format(str(round(temp_f, 0)).replace('.', ''))
-                dev.updateStateOnServer('tempIcon', value=icon_value)
-
-            # Set the display of temperature in the Indigo Item List display, and set the value of onOffState to true since we were able to get the data.
-            # This only affects what is displayed in the Indigo UI.
-            if config_itemlist_ui_units == "M":  # Displays °C
-                display_value = u"{0} \N{DEGREE SIGN}C".format(self.itemListTemperatureFormat(val=temp_c))
-
-            elif config_itemlist_ui_units == "S":  # Displays °F
-                display_value = u"{0} \N{DEGREE SIGN}F".format(self.itemListTemperatureFormat(val=temp_f))
-
-            elif config_itemlist_ui_units == "SM":  # Displays °F (°C)
-                display_value = u"{0} \N{DEGREE SIGN}F ({1} \N{DEGREE SIGN}C)".format(self.itemListTemperatureFormat(val=temp_f), self.itemListTemperatureFormat(val=temp_c))
-
-            elif config_itemlist_ui_units == "MS":  # Displays °C (°F)
-                display_value = u"{0} \N{DEGREE SIGN}C ({1} \N{DEGREE SIGN}F)".format(self.itemListTemperatureFormat(val=temp_c), self.itemListTemperatureFormat(val=temp_f))
-
-            elif config_itemlist_ui_units == "MN":  # Displays C no units
-                display_value = self.itemListTemperatureFormat(temp_c)
-
-            else:  # Displays F no units
-                display_value = self.itemListTemperatureFormat(temp_f)
+            # The table sets onOffState to the temperature shown in the Indigo device list.
+            updates = self.parseStates('weather', dev, weather_data)
 
-            dev.updateStateOnServer('onOffState', value=True, uiValue=display_value)
-            dev.updateStateOnServer('locationCity', value=location_city, uiValue=location_city)
-            dev.updateStateOnServer('stationID', value=station_id, uiValue=station_id)
-
-            # Neighborhood for this weather location (string: "Neighborhood Name")
-            neighborhood = u"Location not found."
-            for key in nearby_stations:
-                if key['id'] == unicode(station_id):
-                    # neighborhood = u"{0}".format(key['neighborhood'].encode('UTF-8'))
-                    neighborhood = key['neighborhood']
-                    break
-
-            dev.updateStateOnServer('neighborhood', value=neighborhood, uiValue=neighborhood)
-
-            # Functional icon name:
-            # Weather Underground's icon value does not account for day and night icon names (although the iconURL value does). This segment produces a functional icon name to allow
-            # for the proper display of daytime and nighttime condition icons. It also provides a separate value for icon names that do not change for day/night. Note that this
-            # segment of code is dependent on the Indigo read-only variable 'isDayLight'.
-
-            # Icon Name (string: "clear", "cloudy"...) Moving to the v11 version of the plugin may make the icon name adjustments unnecessary.
-            dev.updateStateOnServer('properIconNameAllDay', value=icon, uiValue=icon)
-            dev.updateStateOnServer('properIconName', value=icon, uiValue=icon)
-
-            # Current Observation Time (string: "Last Updated on MONTH DD, HH:MM AM/PM TZ")
-            dev.updateStateOnServer('currentObservation', value=current_observation_time, uiValue=current_observation_time)
-
-            # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(float(current_observation_epoch)))
-            dev.updateStateOnServer('currentObservation24hr', value=current_observation_24hr)
+            self.updateAddress(dev, station_id)
+            self.publishStates(dev, updates)
 
-            # Current Observation Time Epoch (string)
-            dev.updateStateOnServer('currentObservationEpoch', value=current_observation_epoch, uiValue=current_observation_epoch)
-
-            # Current Weather (string: "Clear", "Cloudy"...)
-            dev.updateStateOnServer('currentWeather', value=current_weather, uiValue=current_weather)
-
-            # Barometric pressure trend (string: "+", "0", "-")
-            pressure_trend = self.fixPressureSymbol(state_name=u"Pressure Trend", val=pressure_trend)
-            dev.updateStateOnServer('pressureTrend', value=pressure_trend, uiValue=pressure_trend)
-
-            # Solar Radiation (string: "0" or greater. Not always provided as a value that can float (sometimes = "").
-            # Some sites don't report it.)
-            s_rad, s_rad_ui = self.fixCorruptedData(state_name=u"Solar Radiation", val=solar_radiation)
-            dev.updateStateOnServer('solarradiation', value=s_rad, uiValue=s_rad_ui)
-
-            # Ultraviolet light (string: 0 or greater. Not always provided as a value that can float (sometimes = "").
-            # Some sites don't report it.)
-            uv, uv_ui = self.fixCorruptedData(state_name=u"Solar Radiation", val=uv_index)
-            dev.updateStateOnServer('uv', value=uv, uiValue=uv_ui)
+            dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
 
-            # Short Wind direction in alpha (string: N, NNE, NE, ENE...)
-            dev.updateStateOnServer('windDIR', value=wind_dir, uiValue=wind_dir)
+        except IndexError:
+            self.errorLog(u"Note: List index out of range. This is likely normal.")
 
-            # Long Wind direction in alpha (string: North, North Northeast, Northeast, East Northeast...)
-            wind_dir_long = self.verboseWindNames(state_name=u"windDIRlong", val=wind_dir)
-            dev.updateStateOnServer('windDIRlong', value=wind_dir_long, uiValue=wind_dir_long)
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.errorLog(u"Problem parsing weather device data.")
+            dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
+            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
 
-            # Wind direction (integer: 0 - 359 -- units: degrees)
-            wind_degrees, wind_degrees_ui = self.fixCorruptedData(state_name=u"windDegrees", val=wind_degrees)
-            dev.updateStateOnServer('windDegrees', value=int(wind_degrees), uiValue=str(int(wind_degrees)))
+    def planCallBudget(self, locations):
+        """ The planCallBudget() method works out how often each location can
+        be downloaded so that the calls left today (for the current API key)
+        last until midnight in the WU time zone (US/Pacific.) Calls used by
+        radar devices (one per image refresh interval, see refreshImages())
+        are set aside first. The plan is written to the plugin prefs (shown in
+        the plugin config dialog) and the interval, in seconds, is returned. """
 
-            # Relative Humidity (string: "80%")
-            relative_humidity, relative_humidity_ui = self.fixCorruptedData(state_name=u"relativeHumidity", val=relative_humidity.strip('%'))
-            relative_humidity_ui = self.uiFormatPercentage(dev=dev, state_name=u"relativeHumidity", val=relative_humidity_ui)
-            dev.updateStateOnServer('relativeHumidity', value=relative_humidity, uiValue=relative_humidity_ui)
+        wu_time_zone      = pytz.timezone('US/Pacific-New')
+        download_interval = int(self.pluginPrefs.get('downloadInterval', 900))
+        time_now          = dt.datetime.now(wu_time_zone)
+        midnight          = wu_time_zone.localize(dt.datetime.combine(time_now.date() + dt.timedelta(days=1), dt.time(0)))
+        seconds_left      = max(0, (midnight - time_now).total_seconds())
+        calls_left        = self.rateLimiter.callsLeft(self.pluginPrefs['apiKey'], time_now.date())
 
-            # Wind Gust (string: "19.3" -- units: kph)
-            wind_gust_kph, wind_gust_kph_ui = self.fixCorruptedData(state_name=u"windGust (KPH)", val=wind_gust_kph)
-            wind_gust_mph, wind_gust_mph_ui = self.fixCorruptedData(state_name=u"windGust (MPH)", val=wind_gust_mph)
-            wind_gust_mps, wind_gust_mps_ui = self.fixCorruptedData(state_name=u"windGust (MPS)", val=int(wind_gust_kph * 0.277778))
+        radar_calls = 0
 
-            # Wind Gust (string: "19.3" -- units: kph)
-            wind_speed_kph, wind_speed_kph_ui = self.fixCorruptedData(state_name=u"windGust (KPH)", val=wind_speed_kph)
-            wind_speed_mph, wind_speed_mph_ui = self.fixCorruptedData(state_name=u"windGust (MPH)", val=wind_speed_mph)
-            wind_speed_mps, wind_speed_mps_ui = self.fixCorruptedData(state_name=u"windGust (MPS)", val=int(wind_speed_kph * 0.277778))
+        for dev in indigo.devices.itervalues("self"):
+            if not dev.enabled or dev.model not in ['WUnderground Radar']:
+                continue
 
-            # History (yesterday's weather).  This code needs its own try/except block because not all possible
-            # weather locations support history.
             try:
-                # history = self.masterWeatherDict[location]['history']['dailysummary'][0]
-
-                history_max_temp_m  = self.nestedLookup(history_data, keys=('maxtempm',))
-                history_max_temp_i  = self.nestedLookup(history_data, keys=('maxtempi',))
-                history_min_temp_m  = self.nestedLookup(history_data, keys=('mintempm',))
-                history_min_temp_i  = self.nestedLookup(history_data, keys=('mintempi',))
-                history_precip_m    = self.nestedLookup(history_data, keys=('precipm',))
-                history_precip_i    = self.nestedLookup(history_data, keys=('precipi',))
-                history_pretty_date = self.nestedLookup(history_data, keys=('date', 'pretty'))
-
-                dev.updateStateOnServer('historyDate', value=history_pretty_date)
-
-                if config_menu_units in ['M', 'MS', 'I']:
-
-                    history_high, history_high_ui = self.fixCorruptedData(state_name=u"historyHigh (M)", val=history_max_temp_m)
-                    history_high_ui = self.uiFormatTemperature(dev=dev, state_name=u"historyHigh (M)", val=history_high_ui)
-                    dev.updateStateOnServer('historyHigh', value=history_high, uiValue=history_high_ui)
-
-                    history_low, history_low_ui = self.fixCorruptedData(state_name=u"historyLow (M)", val=history_min_temp_m)
-                    history_low_ui = self.uiFormatTemperature(dev=dev, state_name=u"historyLow (M)", val=history_low_ui)
-                    dev.updateStateOnServer('historyLow', value=history_low, uiValue=history_low_ui)
-
-                if config_menu_units in ['M', 'MS']:
+                image_interval = int(dev.pluginProps.get('imageRefreshInterval', 0))
+            except ValueError:
+                image_interval = 0
 
-                    history_pop, history_pop_ui = self.fixCorruptedData(state_name=u"historyPop (M)", val=history_precip_m)
-                    history_pop_ui = self.uiFormatRain(dev=dev, state_name=u"historyPop (M)", val=history_pop_ui)
-                    dev.updateStateOnServer('historyPop', value=history_pop, uiValue=history_pop_ui)
+            radar_calls += int(seconds_left // max(download_interval, image_interval))
 
-                if config_menu_units in ['I', 'S']:
+        interval = wuRate.planInterval(max(0, calls_left - radar_calls), locations, seconds_left, download_interval)
 
-                    history_pop, history_pop_ui = self.fixCorruptedData(state_name=u"historyPop (I)", val=history_precip_i)
-                    history_pop_ui = self.uiFormatRain(dev=dev, state_name=u"historyPop (I)", val=history_pop_ui)
-                    dev.updateStateOnServer('historyPop', value=history_pop, uiValue=history_pop_ui)
+        self.pluginPrefs['budgetCallsLeft'] = calls_left
+        self.pluginPrefs['budgetInterval']  = int(round(interval / 60.0))
+        self.pluginPrefs['budgetLocations'] = locations
 
-                if config_menu_units in ['S']:
-                    history_high, history_high_ui = self.fixCorruptedData(state_name=u"historyHigh (S)", val=history_max_temp_i)
-                    history_high_ui = self.uiFormatTemperature(dev=dev, state_name=u"historyHigh (S)", val=history_high_ui)
-                    dev.updateStateOnServer('historyHigh', value=history_high, uiValue=history_high_ui)
+        if self.pluginPrefs['showDebugLevel'] >= 2:
+            self.debugLog(u"Call budget: {0} calls left, {1} locations, {2:.0f} minutes left in the WU day. Downloading each "
+                          u"location every {3:.0f} minutes.".format(calls_left, locations, seconds_left / 60, interval / 60))
 
-                    history_low, history_low_ui = self.fixCorruptedData(state_name=u"historyLow (S)", val=history_min_temp_i)
-                    history_low_ui = self.uiFormatTemperature(dev=dev, state_name=u"historyLow (S)", val=history_low_ui)
-                    dev.updateStateOnServer('historyLow', value=history_low, uiValue=history_low_ui)
+        return interval
 
-            except IndexError:
-                self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                self.debugLog(u"History data not supported for this location. [{0}]".format(dev.name))
+    def publishStates(self, dev, updates):
+        """ The publishStates() method sends a device's state updates (from
+        parseStates()) to the server. States whose value and uiValue are the
+        same as the last ones sent are skipped. Servers that support it
+        (Indigo 7 and later) get the rest in one updateStatesOnServer() call.
+        Older servers get one updateStateOnServer() call per state. """
 
-            # Metric (M), Mixed SI (MS), Mixed (I):
-            if config_menu_units in ['M', 'MS', 'I']:
+        published = self.publishedStates.setdefault(dev.id, {})
+        changed   = []
 
-                # Dew Point (integer: -20 -- units: Centigrade)
-                dewpoint, dewpoint_ui = self.fixCorruptedData(state_name=u"dewpointC (M, MS)", val=dew_point_c)
-                dewpoint_ui = self.uiFormatTemperature(dev=dev, state_name=u"dewpointC (M, MS)", val=dewpoint_ui)
-                dev.updateStateOnServer('dewpoint', value=dewpoint, uiValue=dewpoint_ui)
+        for update in updates:
+            state_id, value, ui_value = update
 
-                # Feels Like (string: "-20" -- units: Centigrade)
-                feelslike, feelslike_ui = self.fixCorruptedData(state_name=u"feelsLikeC (M, MS)", val=feels_like_c)
-                feelslike_ui = self.uiFormatTemperature(dev=dev, state_name=u"feelsLikeC (M, MS)", val=feelslike_ui)
-                dev.updateStateOnServer('feelslike', value=feelslike, uiValue=feelslike_ui)
+            if state_id not in kStatusStates and published.get(state_id) == (type(value), value, ui_value):
+                self.stateSkips += 1
+            else:
+                changed.append(update)
 
-                # Heat Index (string: "20", "NA" -- units: Centigrade)
-                heat_index, heat_index_ui = self.fixCorruptedData(state_name=u"heatIndexC (M, MS)", val=heat_index_c)
-                heat_index_ui = self.uiFormatTemperature(dev=dev, state_name=u"heatIndexC (M, MS)", val=heat_index_ui)
-                dev.updateStateOnServer('heatIndex', value=heat_index, uiValue=heat_index_ui)
+        updates = changed
 
-                # Wind Chill (string: "17" -- units: Centigrade)
-                windchill, windchill_ui = self.fixCorruptedData(state_name=u"windChillC (M, MS)", val=wind_chill_c)
-                windchill_ui = self.uiFormatTemperature(dev=dev, state_name=u"windChillC (M, MS)", val=windchill_ui)
-                dev.updateStateOnServer('windchill', value=windchill, uiValue=windchill_ui)
+        if not updates:
+            return
 
-                # Visibility (string: "16.1" -- units: km)
-                visibility, visibility_ui = self.fixCorruptedData(state_name=u"visibility (M, MS)", val=visibility_km)
-                dev.updateStateOnServer('visibility', value=visibility, uiValue=u"{0}{1}".format(int(round(visibility)), config_distance_units))
+        if hasattr(dev, 'updateStatesOnServer'):
+            key_value_list = []
 
-                # Barometric Pressure (string: "1039" -- units: mb)
-                pressure, pressure_ui = self.fixCorruptedData(state_name=u"pressureMB (M, MS)", val=pressure_mb)
-                dev.updateStateOnServer('pressure', value=pressure, uiValue=u"{0}{1}".format(pressure_ui, pressure_units))
-                dev.updateStateOnServer('pressureIcon', value=u"{0}".format(int(round(pressure, 0))))
+            for state_id, value, ui_value in updates:
+                if ui_value is None:
+                    key_value_list.append({'key': state_id, 'value': value})
+                else:
+                    key_value_list.append({'key': state_id, 'value': value, 'uiValue': ui_value})
 
-            # Metric (M), Mixed SI (MS):
-            if config_menu_units in ['M', 'MS']:
+            dev.updateStatesOnServer(key_value_list)
+            self.stateCalls += 1
 
-                # Precipitation Today (string: "0", "2" -- units: mm)
-                precip_today, precip_today_ui = self.fixCorruptedData(state_name=u"precipMM (M, MS)", val=precip_today_m)
-                precip_today_ui = self.uiFormatRain(dev=dev, state_name=u"precipToday (M, MS)", val=precip_today_ui)
-                dev.updateStateOnServer('precip_today', value=precip_today, uiValue=precip_today_ui)
-
-                # Precipitation Last Hour (string: "0", "2" -- units: mm)
-                precip_1hr, precip_1hr_ui = self.fixCorruptedData(state_name=u"precipOneHourMM (M, MS)", val=precip_1hr_m)
-                precip_1hr_ui = self.uiFormatRain(dev=dev, state_name=u"precipOneHour (M, MS)", val=precip_1hr_ui)
-                dev.updateStateOnServer('precip_1hr', value=precip_1hr, uiValue=precip_1hr_ui)
-
-                # Report winds in KPH or MPS depending on user prefs. 1 KPH = 0.277778 MPS
-
-                if config_menu_units == 'M':
-
-                    dev.updateStateOnServer('windGust', value=wind_gust_kph, uiValue=self.uiFormatWind(dev=dev, state_name=u"windGust", val=wind_gust_kph_ui))
-                    dev.updateStateOnServer('windSpeed', value=wind_speed_kph, uiValue=self.uiFormatWind(dev=dev, state_name=u"windSpeed", val=wind_speed_kph_ui))
-                    dev.updateStateOnServer('windGustIcon', value=unicode(round(wind_gust_kph, 1)).replace('.', ''))
-                    dev.updateStateOnServer('windSpeedIcon', value=unicode(round(wind_speed_kph, 1)).replace('.', ''))
-                    dev.updateStateOnServer('windString', value=u"From the {0} at {1} KPH Gusting to {2} KPH".format(wind_dir, wind_speed_kph, wind_gust_kph))
-                    dev.updateStateOnServer('windShortString', value=u"{0} at {1}".format(wind_dir, wind_speed_kph))
-                    dev.updateStateOnServer('windStringMetric', value=u"From the {0} at {1} KPH Gusting to {2} KPH".format(wind_dir, wind_speed_kph, wind_gust_kph))
-
-                if config_menu_units == 'MS':
-
-                    dev.updateStateOnServer('windGust', value=wind_gust_mps, uiValue=self.uiFormatWind(dev=dev, state_name=u"windGust", val=wind_gust_mps_ui))
-                    dev.updateStateOnServer('windSpeed', value=wind_speed_mps, uiValue=self.uiFormatWind(dev=dev, state_name=u"windSpeed", val=wind_speed_mps_ui))
-                    dev.updateStateOnServer('windGustIcon', value=unicode(round(wind_gust_mps, 1)).replace('.', ''))
-                    dev.updateStateOnServer('windSpeedIcon', value=unicode(round(wind_speed_mps, 1)).replace('.', ''))
-                    dev.updateStateOnServer('windString', value=u"From the {0} at {1} MPS Gusting to {2} MPS".format(wind_dir, wind_speed_mps, wind_gust_mps))
-                    dev.updateStateOnServer('windShortString', value=u"{0} at {1}".format(wind_dir, wind_speed_mps))
-                    dev.updateStateOnServer('windStringMetric', value=u"From the {0} at {1} KPH Gusting to {2} KPH".format(wind_dir, wind_speed_mps, wind_gust_mps))
-
-            # Mixed (I), Standard (S):
-            if config_menu_units in ['I', 'S']:
-
-                # Precipitation Today (string: "0", "0.5" -- units: inches)
-                precip_today, precip_today_ui = self.fixCorruptedData(state_name=u"precipToday (I)", val=precip_today_in)
-                precip_today_ui = self.uiFormatRain(dev=dev, state_name=u"precipToday (I)", val=precip_today_ui)
-                dev.updateStateOnServer('precip_today', value=precip_today, uiValue=precip_today_ui)
-
-                # Precipitation Last Hour (string: "0", "0.5" -- units: inches)
-                precip_1hr, precip_1hr_ui = self.fixCorruptedData(state_name=u"precipOneHour (I)", val=precip_1hr_in)
-                precip_1hr_ui = self.uiFormatRain(dev=dev, state_name=u"precipOneHour (I)", val=precip_1hr_ui)
-                dev.updateStateOnServer('precip_1hr', value=precip_1hr, uiValue=precip_1hr_ui)
-
-                dev.updateStateOnServer('windGust', value=wind_gust_mph, uiValue=self.uiFormatWind(dev=dev, state_name=u"windGust", val=wind_gust_mph_ui))
-                dev.updateStateOnServer('windSpeed', value=wind_speed_mph, uiValue=self.uiFormatWind(dev=dev, state_name=u"windSpeed", val=wind_speed_mph_ui))
-                dev.updateStateOnServer('windGustIcon', value=unicode(round(wind_gust_mph, 1)).replace('.', ''))
-                dev.updateStateOnServer('windSpeedIcon', value=unicode(round(wind_speed_mph, 1)).replace('.', ''))
-                dev.updateStateOnServer('windString', value=u"From the {0} at {1} MPH Gusting to {2} MPH".format(wind_dir, wind_speed_mph, wind_gust_mph))
-                dev.updateStateOnServer('windShortString', value=u"{0} at {1}".format(wind_dir, wind_speed_kph))
-                dev.updateStateOnServer('windStringMetric', value=u" ")
-
-            # Standard (S):
-            if config_menu_units in ['S']:
-                # Dew Point (integer: -20 -- units: Fahrenheit)
-                dewpoint, dewpoint_ui = self.fixCorruptedData(state_name=u"dewpointF (S)", val=dew_point_f)
-                dewpoint_ui = self.uiFormatTemperature(dev=dev, state_name=u"dewpointF (S)", val=dewpoint_ui)
-                dev.updateStateOnServer('dewpoint', value=dewpoint, uiValue=dewpoint_ui)
-
-                # Feels Like (string: "-20" -- units: Fahrenheit)
-                feelslike, feelslike_ui = self.fixCorruptedData(state_name=u"feelsLikeF (S)", val=feels_like_f)
-                feelslike_ui = self.uiFormatTemperature(dev=dev, state_name=u"feelsLikeF (S)", val=feelslike_ui)
-                dev.updateStateOnServer('feelslike', value=feelslike, uiValue=feelslike_ui)
-
-                # Heat Index (string: "20", "NA" -- units: Fahrenheit)
-                heat_index, heat_index_ui = self.fixCorruptedData(state_name=u"heatIndexF (S)", val=heat_index_f)
-                heat_index_ui = self.uiFormatTemperature(dev=dev, state_name=u"heatIndexF (S)", val=heat_index_ui)
-                dev.updateStateOnServer('heatIndex', value=heat_index, uiValue=heat_index_ui)
-
-                # Wind Chill (string: "17" -- units: Fahrenheit)
-                windchill, windchill_ui = self.fixCorruptedData(state_name=u"windChillF (S)", val=wind_chill_f)
-                windchill_ui = self.uiFormatTemperature(dev=dev, state_name=u"windChillF (S)", val=windchill_ui)
-                dev.updateStateOnServer('windchill', value=windchill, uiValue=windchill_ui)
-
-                # Barometric Pressure (string: "30.25" -- units: inches of mercury)
-                pressure, pressure_ui = self.fixCorruptedData(state_name=u"pressure (S)", val=pressure_in)
-                dev.updateStateOnServer('pressure', value=pressure, uiValue=u"{0}{1}".format(pressure_ui, pressure_units))
-                dev.updateStateOnServer('pressureIcon', value=pressure_ui.replace('.', ''))
-
-                # Visibility (string: "16.1" -- units: miles)
-                visibility, visibility_ui = self.fixCorruptedData(state_name=u"visibility (S)", val=visibility_mi)
-                dev.updateStateOnServer('visibility', value=visibility, uiValue=u"{0}{1}".format(int(round(visibility)), config_distance_units))
-
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
+        else:
+            for state_id, value, ui_value in updates:
+                if ui_value is None:
+                    dev.updateStateOnServer(state_id, value=value)
+                else:
+                    dev.updateStateOnServer(state_id, value=value, uiValue=ui_value)
 
-            dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
+            self.stateCalls += len(updates)
 
-        except IndexError:
-            self.errorLog(u"Note: List index out of range. This is likely normal.")
+        self.stateUpdates += len(updates)
 
-        except Exception:
-            self.Fogbert.pluginErrorHandler(traceback.format_exc())
-            self.errorLog(u"Problem parsing weather device data.")
-            dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+        for state_id, value, ui_value in updates:
+            published[state_id] = (type(value), value, ui_value)
 
-    def refreshWeatherData(self):
-        """ This method refreshes weather data for all devices based on a
-        WUnderground general cycle, Action Item or Plugin Menu call. """
+    def refreshCycle(self):
+        """ The refreshCycle() method runs one refresh of weather data for all
+        devices: the fetch stage, then the parse stage. It is only ever run
+        by refreshWeatherData(), which makes sure that one cycle runs at a
+        time. """
 
         api_key = self.pluginPrefs['apiKey']
         daily_call_limit_reached = self.pluginPrefs.get('dailyCallLimitReached', False)
@@ -2366,7 +2320,7 @@ class Plugin(indigo.PluginBase):
         self.wuOnline = True
 
         if self.pluginPrefs['showDebugLevel'] >= 3:
-            self.debugLog(u"refreshWeatherData() method called.")
+            self.debugLog(u"refreshCycle() method called.")
 
         # Check to see if the daily call limit has been reached.
         try:
@@ -2377,7 +2331,28 @@ class Plugin(indigo.PluginBase):
             elif not daily_call_limit_reached:
                 self.callDay()
 
-                self.masterWeatherDict = {}
+                weather_dict = {}
+                self.failedLocations = set()
+
+                # Fetch stage. Queue the images that are due, then download each unique location before the devices
+                # are parsed. The new data replace the master weather dictionary in one step, so other threads never
+                # see it half built.
+                if api_key not in ["", "API Key"]:
+                    self.refreshImages()
+                    weather_dict = self.downloadWeatherData()
+                    self.saveWeatherCache()
+
+                with self.refreshLock:
+                    self.masterWeatherDict = weather_dict
+                    self.refreshFetched    = True
+
+                # Parsed values from the last cycle belong to the old data.
+                self.locationRecords = {}
+                self.stateUpdates    = 0
+                self.stateCalls      = 0
+                self.stateSkips      = 0
+                self.propsWrites     = 0
+                self.propsSkips      = 0
 
                 for dev in indigo.devices.itervalues("self"):
 
@@ -2403,130 +2378,32 @@ class Plugin(indigo.PluginBase):
                         self.debugLog(u"{0}: device communication is disabled. Skipping.".format(dev.name))
                         dev.updateStateOnServer('onOffState', value=False, uiValue=u"{0}".format("Disabled"))
 
+                    # Image devices are updated by the image stage (see refreshImages().)
+                    elif dev.model in ['Satellite Image Downloader', 'WUnderground Radar', 'WUnderground Satellite Image Downloader']:
+                        continue
+
+                    # The download for this device's location failed, and it has been marked "No comm" (see
+                    # downloadWeatherData().)
+                    elif dev.pluginProps.get('location', 'autoip') in self.failedLocations:
+                        self.debugLog(u"{0}: unable to download weather data. Skipping.".format(dev.name))
+
                     elif dev.enabled:
                         self.debugLog(u"Parse weather data for device: {0}".format(dev.name))
                         # Get weather data from Weather Underground
                         dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
 
-                        if dev.model not in ['Satellite Image Downloader', 'WUnderground Radar', 'WUnderground Satellite Image Downloader']:
-
-                            location = dev.pluginProps['location']
-
-                            self.getWeatherData(dev)
-
-                            # If we've successfully downloaded data from Weather Underground, let's unpack it and assign it to the relevant device.
-                            try:
-                                # If a site location query returns a site unknown (in other words 'querynotfound' result, notify the user).
-                                response = self.masterWeatherDict[location]['response']['error']['type']
-                                if response == 'querynotfound':
-                                    self.errorLog(u"Location query for {0} not found. Please ensure that device "
-                                                  u"location follows examples precisely.".format(dev.name))
-                                    dev.updateStateOnServer('onOffState', value=False, uiValue=u"Bad Loc")
-
-                            except (KeyError, Exception) as error:
-                                # Weather device types. There are multiples of these because the names of the device
-                                # models evolved over time.
-                                # If the error key is not present, that's good. Continue.
-                                error = u"{0}".format(error)
-                                if error == "'error'":
-                                    pass
-                                else:
-                                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
-
-                                # Estimated Weather Data (integer: 1 if estimated weather)
-                                ignore_estimated = False
-                                try:
-                                    estimated = self.masterWeatherDict[location]['current_observation']['estimated']['estimated']
-                                    if estimated == 1:
-                                        self.errorLog(u"These are estimated conditions. There may be other functioning weather stations nearby. ({0})".format(dev.name))
-                                        dev.updateStateOnServer('estimated', value="true", uiValue=u"True")
-
-                                    # If the user wants to skip updates when weather data are estimated.
-                                    if self.pluginPrefs.get('ignoreEstimated', False):
-                                        ignore_estimated = True
-
-                                except KeyError as error:
-                                    error = u"{0}".format(error)
-                                    if error == "'estimated'":
-                                        # The estimated key must not be present. Therefore, we assumed the conditions
-                                        # are not estimated.
-                                        dev.updateStateOnServer('estimated', value="false", uiValue=u"False")
-                                        ignore_estimated = False
-                                    else:
-                                        self.Fogbert.pluginErrorHandler(traceback.format_exc())
-
-                                except Exception:
-                                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                                    ignore_estimated = False
-
-                                # Compare last data epoch to the one we just downloaded. Proceed if the data are newer.
-                                # Note: WUnderground have been known to send data that are 5-6 months old. This flag helps ensure that known data are retained if the new data is not
-                                # actually newer that what we already have.
-                                try:
-                                    # New devices may not have an epoch value yet.
-                                    device_epoch = dev.states['currentObservationEpoch']
-                                    try:
-                                        device_epoch = int(device_epoch)
-                                    except ValueError:
-                                        device_epoch = 0
-
-                                    # If we don't know the age of the data, we don't update.
-                                    try:
-                                        weather_data_epoch = int(self.masterWeatherDict[location]['current_observation']['observation_epoch'])
-                                    except ValueError:
-                                        weather_data_epoch = 0
-
-                                    good_time = device_epoch <= weather_data_epoch
-                                    if not good_time:
-                                        indigo.server.log(u"Latest data are older than data we already have. Skipping {0} update.".format(dev.name), type="WUnderground Status")
-                                except KeyError:
-                                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                                    indigo.server.log(u"{0} cannot determine age of data. Skipping until next "
-                                                      u"scheduled poll.".format(dev.name), type="WUnderground Status")
-                                    good_time = False
-
-                                # If the weather dict is not empty, the data are newer than the data we already have,
-                                # an the user doesn't want to ignore estimated weather conditions, let's update the
-                                # devices.
-                                if self.masterWeatherDict != {} and good_time and not ignore_estimated:
-
-                                    # Almanac devices.
-                                    if dev.model in ['Almanac', 'WUnderground Almanac']:
-                                        self.parseAlmanacData(dev)
-
-                                    # Astronomy devices.
-                                    elif dev.model in ['Astronomy', 'WUnderground Astronomy']:
-                                        self.parseAstronomyData(dev)
-
-                                    # Hourly Forecast devices.
-                                    elif dev.model in ['WUnderground Hourly Forecast', 'Hourly Forecast']:
-                                        self.parseHourlyData(dev)
-
-                                    # Ten Day Forecast devices.
-                                    elif dev.model in ['Ten Day Forecast', 'WUnderground Ten Day Forecast']:
-                                        self.parseTenDayData(dev)
-
-                                    # Tide devices.
-                                    elif dev.model in ['WUnderground Tides', 'Tides']:
-                                        self.parseTidesData(dev)
-
-                                    # Weather devices.
-                                    elif dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
-                                        self.parseWeatherData(dev)
-                                        self.parseAlertsData(dev)
-                                        self.parseForecastData(dev)
-                                        dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
-
-                                        if self.pluginPrefs.get('updaterEmailsEnabled', False):
-                                            self.emailForecast(dev)
-
-                        # Image Downloader devices.
-                        elif dev.model in ['Satellite Image Downloader', 'WUnderground Satellite Image Downloader']:
-                            self.getSatelliteImage(dev)
-
-                        # WUnderground Radar devices.
-                        elif dev.model in ['WUnderground Radar']:
-                            self.getWUradar(dev)
+                        location = dev.pluginProps['location']
+
+                        self.getWeatherData(dev)
+
+                        self.parseDeviceData(dev)
+
+            if self.pluginPrefs['showDebugLevel'] >= 2 and self.locationRecords:
+                converted = sum(record.misses for record in self.locationRecords.values())
+                shared    = sum(record.hits for record in self.locationRecords.values())
+                self.debugLog(u"[{0} values converted for {1} weather data sets, {2} more shared between devices.]".format(converted, len(self.locationRecords), shared))
+                self.debugLog(u"[{0} state updates sent in {1} server calls. {2} unchanged states skipped.]".format(self.stateUpdates, self.stateCalls, self.stateSkips))
+                self.debugLog(u"[{0} device props written. {1} unchanged props not written.]".format(self.propsWrites, self.propsSkips))
 
             self.debugLog(u"Locations Polled: {0}{1}Weather Underground cycle complete.".format(self.masterWeatherDict.keys(), pad_log))
 
@@ -2534,6 +2411,89 @@ class Plugin(indigo.PluginBase):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.errorLog(u"Problem parsing Weather data.")
 
+    def refreshImages(self):
+        """ The refreshImages() method queues the radar and satellite image
+        devices that are due to the image dispatcher. Each image device has its
+        own refresh interval (by default, every refresh.) The weather devices
+        don't wait for the images. An image that is still downloading from an
+        earlier refresh is not queued again. """
+
+        download_interval = int(self.pluginPrefs.get('downloadInterval', 900))
+        time_now          = time.time()
+
+        if self.pluginPrefs['showDebugLevel'] >= 3:
+            self.debugLog(u"refreshImages() method called.")
+
+        for dev in indigo.devices.itervalues("self"):
+
+            if not dev.configured or not dev.enabled:
+                continue
+
+            if dev.model in ['Satellite Image Downloader', 'WUnderground Satellite Image Downloader']:
+                image_method = self.getSatelliteImage
+
+            elif dev.model in ['WUnderground Radar']:
+                image_method = self.getWUradar
+
+            else:
+                continue
+
+            job = self.imageJobs.get(dev.id)
+            if job is not None and not job.done():
+                self.debugLog(u"{0}: the last image download hasn't finished. Skipping.".format(dev.name))
+                continue
+
+            try:
+                image_interval = int(dev.pluginProps.get('imageRefreshInterval', 0))
+            except ValueError:
+                image_interval = 0
+
+            # Allow half a refresh of slack so that an image isn't pushed back a whole refresh by timing jitter.
+            if time_now - self.imageLastRun.get(dev.id, 0) < image_interval - download_interval / 2:
+                continue
+
+            self.imageLastRun[dev.id] = time_now
+            self.imageJobs[dev.id]    = self.imageDispatcher.submit(image_method, (dev,), timeout=max(download_interval, image_interval), name=dev.name)
+
+    def refreshWeatherData(self):
+        """ This method refreshes weather data for all devices based on a
+        WUnderground general cycle, Action Item or Plugin Menu call. Only one
+        refresh runs at a time. A request made while a refresh is still
+        downloading is served by that refresh. A request made after it has
+        started updating devices queues one follow-up refresh (further
+        requests join the same follow-up) which the running thread performs
+        when it is done. """
+
+        with self.refreshLock:
+            if self.refreshRunning:
+                if not self.refreshFetched:
+                    self.debugLog(u"A refresh is already downloading. The request will be served by it.")
+                elif not self.refreshPending:
+                    self.debugLog(u"A refresh is already running. Another will follow it.")
+                    self.refreshPending = True
+                else:
+                    self.debugLog(u"A refresh is already running and another is queued.")
+                return
+
+            self.refreshRunning = True
+
+        try:
+            while True:
+                with self.refreshLock:
+                    self.refreshFetched = False
+                    self.refreshPending = False
+
+                self.refreshCycle()
+
+                with self.refreshLock:
+                    if not self.refreshPending:
+                        break
+
+        finally:
+            with self.refreshLock:
+                self.refreshRunning = False
+                self.refreshPending = False
+
     def runConcurrentThread(self):
         """ Main plugin thread. """
 
@@ -2546,6 +2506,18 @@ class Plugin(indigo.PluginBase):
         self.sleep(5)
 
         try:
+            self.dispatcher.start()
+            self.imageDispatcher.start()
+
+            # After a restart, devices have been updated from the weather cache. Hold the first refresh until the
+            # cached conditions are as old as a normal cycle would allow.
+            last_fetch = self.featureCache.oldestFetch('conditions')
+            if last_fetch is not None:
+                cache_age = time.time() - last_fetch
+                if 0 <= cache_age < download_interval:
+                    self.debugLog(u"Weather cache is current. First refresh in {0:.0f} seconds.".format(download_interval - cache_age))
+                    self.sleep(download_interval - cache_age)
+
             while True:
                 start_time = dt.datetime.now()
 
@@ -2563,11 +2535,25 @@ class Plugin(indigo.PluginBase):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.debugLog(u"Stopping WUnderground Plugin thread.")
 
+    def saveWeatherCache(self):
+        """ The saveWeatherCache() method writes the feature cache to disk. """
+
+        try:
+            self.featureCache.save(self.cacheFile)
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.errorLog(u"Unable to save the weather cache.")
+
     def shutdown(self):
         """ Plugin shutdown routines. """
 
         self.debugLog(u"Plugin shutdown() method called.")
 
+        self.dispatcher.stop()
+        self.imageDispatcher.stop()
+        self.saveWeatherCache()
+        self.transport.close()
+
     def startup(self):
         """ Plugin startup routines. """
 
@@ -2576,6 +2562,28 @@ class Plugin(indigo.PluginBase):
         # Audit sever version
         self.Fogbert.audit_server_version(min_ver=6)
 
+        # Restore the weather data saved when the plugin last stopped.
+        self.loadWeatherCache()
+
+    def stateTable(self, name, dev):
+        """ The stateTable() method returns the state table name compiled for
+        the device's configuration. Devices with the same unit settings share
+        the compiled tables, which are only built once. """
+
+        key = (name,) + tuple(dev.pluginProps.get(prop, '') for prop in wuStates.kConfigProps)
+
+        try:
+            return self.stateTables[key]
+
+        except KeyError:
+            tables = [table.compile(self, dev.pluginProps) for table in wuStates.kStateTables[name]]
+            self.stateTables[key] = tables
+
+            if self.pluginPrefs['showDebugLevel'] >= 3:
+                self.debugLog(u"Compiled the {0} state table for {1}.".format(name, key[1:]))
+
+            return tables
+
     def triggerFireOfflineDevice(self):
         """ The triggerFireOfflineDevice method will examine the time of the
         last weather location update and, if the update exceeds the time delta
@@ -2663,35 +2671,47 @@ class Plugin(indigo.PluginBase):
         """ Adjusts the decimal precision of percentage values for display in
         control pages, etc. """
 
-        humidity_decimal = int(self.pluginPrefs.get('uiHumidityDecimal', 1))
-        percentage_units = dev.pluginProps.get('percentageUnits', '')
+        fmt = self.formatContext(dev)
 
         try:
-            return u"{0:0.{1}f}{2}".format(float(val), int(humidity_decimal), percentage_units)
+            return u"{0:0.{1}f}{2}".format(float(val), fmt.humidity_decimal, fmt.percentage_units)
 
         except ValueError as error:
             self.debugLog(u"Error formatting uiPercentage: {0}".format(error))
-            return u"{0}{1}".format(val, percentage_units)
+            return u"{0}{1}".format(val, fmt.percentage_units)
+
+    def uiFormatPercentageColumn(self, dev, state_names, values):
+        """ The uiFormatPercentageColumn() method is uiFormatPercentage() for a
+        column of values (all hours or days of a forecast.) """
+
+        fmt = self.formatContext(dev)
+
+        def fallback(val, error):
+            self.debugLog(u"Error formatting uiPercentage: {0}".format(error))
+            return u"{0}{1}".format(val, fmt.percentage_units)
+
+        return wuColumns.formatDecimals(values, fmt.humidity_decimal, fmt.percentage_units, fallback)
 
     def uiFormatRain(self, dev, state_name, val):
         """ Adjusts the decimal precision of rain values for display in control
         pages, etc. """
 
-        try:
-            rain_units = dev.pluginProps.get('rainUnits', '')
-        except KeyError:
-            rain_units = dev.pluginProps.get('rainAmountUnits', '')
-
         if val in ["NA", "N/A", "--", ""]:
             return val
 
         try:
-            return u"{0}{1}".format(val, rain_units)
+            return u"{0}{1}".format(val, self.formatContext(dev).rain_units)
 
         except ValueError as error:
             self.debugLog(u"Error formatting uiRain: {0}".format(error))
             return u"{0}".format(val)
 
+    def uiFormatRainColumn(self, dev, state_names, values):
+        """ The uiFormatRainColumn() method is uiFormatRain() for a column of
+        values (all hours or days of a forecast.) """
+
+        return wuColumns.formatUnits(values, self.formatContext(dev).rain_units)
+
     def uiFormatSnow(self, dev, state_name, val):
         """ Adjusts the decimal precision of snow values for display in control
         pages, etc. """
@@ -2700,40 +2720,90 @@ class Plugin(indigo.PluginBase):
             return val
 
         try:
-            return u"{0}{1}".format(val, dev.pluginProps.get('snowAmountUnits', ''))
+            return u"{0}{1}".format(val, self.formatContext(dev).snow_units)
 
         except ValueError as error:
             self.debugLog(u"Error formatting uiSnow: {0}".format(error))
             return u"{0}".format(val)
 
+    def uiFormatSnowColumn(self, dev, state_names, values):
+        """ The uiFormatSnowColumn() method is uiFormatSnow() for a column of
+        values (all hours or days of a forecast.) """
+
+        return wuColumns.formatUnits(values, self.formatContext(dev).snow_units)
+
     def uiFormatTemperature(self, dev, state_name, val):
         """ Adjusts the decimal precision of certain temperature values and
         appends the desired units string for display in control pages, etc. """
 
-        temp_decimal = int(self.pluginPrefs.get('uiTempDecimal', 1))
-        temperature_units = dev.pluginProps.get('temperatureUnits', '')
+        fmt = self.formatContext(dev)
 
         try:
-            return u"{0:0.{1}f}{2}".format(float(val), int(temp_decimal), temperature_units)
+            return u"{0:0.{1}f}{2}".format(float(val), fmt.temp_decimal, fmt.temperature_units)
 
         except ValueError as error:
             self.debugLog(u"Can not format uiTemperature. This is likely normal.".format(error))
             return u"--"
 
+    def uiFormatTemperatureColumn(self, dev, state_names, values):
+        """ The uiFormatTemperatureColumn() method is uiFormatTemperature() for
+        a column of values (all hours or days of a forecast.) """
+
+        fmt = self.formatContext(dev)
+
+        def fallback(val, error):
+            self.debugLog(u"Can not format uiTemperature. This is likely normal.")
+            return u"--"
+
+        return wuColumns.formatDecimals(values, fmt.temp_decimal, fmt.temperature_units, fallback)
+
     def uiFormatWind(self, dev, state_name, val):
         """ Adjusts the decimal precision of certain wind values for display
         in control pages, etc. """
 
-        wind_decimal = self.pluginPrefs.get('uiWindDecimal', 1)
-        wind_units   = dev.pluginProps.get('windUnits', '')
+        fmt = self.formatContext(dev)
 
         try:
-            return u"{0:0.{1}f}{2}".format(float(val), int(wind_decimal), wind_units)
+            return u"{0:0.{1}f}{2}".format(float(val), fmt.wind_decimal, fmt.wind_units)
 
         except ValueError as error:
             self.debugLog(u"Error formatting uiTemperature: {0}".format(error))
             return u"{0}".format(val)
 
+    def uiFormatWindColumn(self, dev, state_names, values):
+        """ The uiFormatWindColumn() method is uiFormatWind() for a column of
+        values (all hours or days of a forecast.) """
+
+        fmt = self.formatContext(dev)
+
+        def fallback(val, error):
+            self.debugLog(u"Error formatting uiTemperature: {0}".format(error))
+            return u"{0}".format(val)
+
+        return wuColumns.formatDecimals(values, fmt.wind_decimal, fmt.wind_units, fallback)
+
+    def updateAddress(self, dev, station_id):
+        """ The updateAddress() method sets the device address (shown in the
+        Address column of the Indigo device list) to the weather station ID.
+        The device props are kept for each device after they are first read,
+        and are only written back to the server when the station ID changes.
+        """
+
+        props = self.deviceProps.get(dev.id)
+
+        if props is None:
+            props = self.deviceProps[dev.id] = dev.pluginProps
+
+        if props.get('address') == station_id:
+            self.propsSkips += 1
+            return
+
+        self.debugLog(u"{0}: station ID is now {1}.".format(dev.name, station_id))
+
+        props['address'] = station_id
+        dev.replacePluginPropsOnServer(props)
+        self.propsWrites += 1
+
     def validateDeviceConfigUi(self, valuesDict, typeID, devId):
         """ Validate select device config menu settings. """
 
@@ -2937,6 +3007,7 @@ class Plugin(indigo.PluginBase):
 
         api_key_config      = valuesDict['apiKey']
         call_counter_config = valuesDict['callCounter']
+        calls_per_minute    = valuesDict.get('callsPerMinute', '10')
         error_msg_dict      = indigo.Dict()
         update_email        = valuesDict['updaterEmail']
         update_wanted       = valuesDict['updaterEmailsEnabled']
@@ -2968,6 +3039,12 @@ class Plugin(indigo.PluginBase):
                 error_msg_dict['showAlertText'] = u"The call counter that you have entered is invalid.\n\nReason: Call counters must be positive integers."
                 return False, valuesDict, error_msg_dict
 
+            # Test per-minute call limit config setting.
+            elif not calls_per_minute.isdigit() or int(calls_per_minute) < 1:
+                error_msg_dict['callsPerMinute'] = u"The per minute limit must be a positive integer."
+                error_msg_dict['showAlertText'] = u"The per minute limit that you have entered is invalid.\n\nReason: Per minute limits must be positive integers."
+                return False, valuesDict, error_msg_dict
+
             # Test plugin update notification settings.
             elif update_wanted and update_email == "":
                 error_msg_dict['updaterEmail'] = u"If you want to be notified of updates, you must supply an email address."
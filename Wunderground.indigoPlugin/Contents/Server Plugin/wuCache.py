@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuCache.py
+Author: DaveL17
+
+The FeatureCache class holds the most recent Weather Underground data for
+each location, broken down by API feature. Each feature has its own time to
+live, so data that change slowly (almanac, astronomy, yesterday...) are
+downloaded once per Weather Underground day while current conditions are
+downloaded every cycle. Fresh and cached sections are merged into a single
+dict shaped exactly like a full API response, which is what the parse methods
+expect.
+
+The cache can be written to disk (gzip compressed JSON, replaced atomically)
+so that a restarted plugin can populate its devices straight away instead of
+waiting for (and paying for) a full set of downloads.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Cache"
+__version__ = "0.1.00"
+
+# Top level sections of the API response that are produced by each feature.
+kFeatureSections = {
+    'geolookup':     ('location',),
+    'alerts':        ('alerts',),
+    'almanac':       ('almanac',),
+    'astronomy':     ('moon_phase', 'sun_phase'),
+    'conditions':    ('current_observation',),
+    'forecast':      ('forecast',),
+    'forecast10day': ('forecast',),
+    'hourly':        ('hourly_forecast',),
+    'yesterday':     ('history',),
+    'tide':          ('tide',),
+}
+
+# Time to live (in seconds) for each feature. A value of zero means the feature
+# is downloaded every cycle. A value of None means the feature is kept until
+# the Weather Underground day (US/Pacific) changes.
+kFeatureTTL = {
+    'geolookup':     None,
+    'alerts':        0,
+    'almanac':       None,
+    'astronomy':     None,
+    'conditions':    0,
+    'forecast':      3600,
+    'forecast10day': 3600,
+    'hourly':        1800,
+    'yesterday':     None,
+    'tide':          None,
+}
+
+# Features whose data also satisfy another feature.
+kFeatureSupersedes = {
+    'forecast10day': 'forecast',
+}
+
+
+class FeatureCache(object):
+    """
+    Per-location, per-feature cache of Weather Underground data.
+
+    The cache is a dict of {location: {feature: (fetch time, WU day,
+    {section: data})}}. The WU day is kept as a 'YYYY-MM-DD' string.
+    """
+
+    # Bump when the layout of the saved file changes. Files with a different
+    # version are ignored.
+    file_version = 1
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locations = {}
+
+    def clear(self, location=None):
+        """ Forget everything (or everything for one location.) """
+
+        with self.lock:
+            if location is None:
+                self.locations.clear()
+            else:
+                self.locations.pop(location, None)
+
+    def isFresh(self, location, feature, time_now, wu_day, min_ttl=0):
+        """ Return True if the cached copy of feature is still good. Features
+        with a time to live in seconds are kept for at least min_ttl seconds
+        (see the call budget planner.) """
+
+        with self.lock:
+            entry = self.locations.get(location, {}).get(feature)
+
+        if entry is None:
+            return False
+
+        fetch_time, fetch_day, sections = entry
+        ttl = kFeatureTTL.get(feature, 0)
+
+        if ttl is None:
+            return fetch_day == u"{0}".format(wu_day)
+        else:
+            return time_now - fetch_time < max(ttl, min_ttl)
+
+    def staleFeatures(self, location, features, time_now, wu_day, min_ttl=0):
+        """ Return the subset of features that must be downloaded. """
+
+        stale = set()
+
+        for feature in features:
+            if self.isFresh(location, feature, time_now, wu_day, min_ttl):
+                continue
+
+            superseded_by = [parent for parent, child in kFeatureSupersedes.items() if child == feature]
+            if any(self.isFresh(location, parent, time_now, wu_day, min_ttl) for parent in superseded_by):
+                continue
+
+            stale.add(feature)
+
+        return stale
+
+    def store(self, location, features, data, time_now, wu_day):
+        """ Save the sections of a freshly downloaded response. Responses
+        reporting an error are not cached. """
+
+        if not isinstance(data, dict) or 'error' in data.get('response', {}):
+            return
+
+        with self.lock:
+            location_cache = self.locations.setdefault(location, {})
+
+            for feature in features:
+                sections = dict((section, data[section]) for section in kFeatureSections.get(feature, ()) if section in data)
+                location_cache[feature] = (time_now, u"{0}".format(wu_day), sections)
+
+            location_cache['response'] = (time_now, u"{0}".format(wu_day), {'response': data.get('response', {})})
+
+    def merge(self, location, data=None):
+        """ Return a response dict built from the cached sections for location,
+        overlaid with the sections of data (the fresh download, if any.) """
+
+        merged = {}
+
+        with self.lock:
+            # Apply superseding features last so that, for example, the ten day forecast wins over the four day.
+            for feature, (fetch_time, fetch_day, sections) in sorted(self.locations.get(location, {}).items(), key=lambda item: item[0] in kFeatureSupersedes):
+                merged.update(sections)
+
+        if data:
+            merged.update(data)
+
+        return merged
+
+    def locationList(self):
+        """ Return the locations held in the cache. """
+
+        with self.lock:
+            return self.locations.keys()
+
+    def oldestFetch(self, feature='conditions'):
+        """ Return the time of the oldest fetch of feature across all
+        locations, or None if the feature is not cached anywhere. """
+
+        with self.lock:
+            fetch_times = [features[feature][0] for features in self.locations.values() if feature in features]
+
+        if fetch_times:
+            return min(fetch_times)
+        else:
+            return None
+
+    def save(self, file_path):
+        """ Write the cache to file_path as gzip compressed JSON. The file is
+        written to a temporary file in the same folder and renamed into place
+        so a crash can never leave a half written cache behind. """
+
+        with self.lock:
+            payload = json.dumps({'version': self.file_version, 'saved': time.time(), 'locations': self.locations}, separators=(',', ':'))
+
+        folder = os.path.dirname(file_path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        file_descriptor, temp_path = tempfile.mkstemp(prefix='.wuCache', dir=folder)
+
+        try:
+            with os.fdopen(file_descriptor, 'wb') as outfile:
+                with gzip.GzipFile(fileobj=outfile, mode='wb') as gzip_file:
+                    gzip_file.write(payload)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+
+            os.rename(temp_path, file_path)
+
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def load(self, file_path):
+        """ Replace the cache with the contents of file_path. Returns the time
+        the file was saved, or None if there was no usable file. """
+
+        if not os.path.isfile(file_path):
+            return None
+
+        with gzip.open(file_path, 'rb') as infile:
+            payload = json.loads(infile.read())
+
+        if payload.get('version') != self.file_version:
+            return None
+
+        locations = {}
+        for location, features in payload.get('locations', {}).items():
+            locations[location] = dict((feature, tuple(entry)) for feature, entry in features.items())
+
+        with self.lock:
+            self.locations = locations
+
+        return payload.get('saved')
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuColumns.py
+Author: DaveL17
+
+Column transforms for the hourly (24 hours) and ten day (10 days) forecast
+devices. Those devices set the same states for every record, so rather than
+converting one value at a time, each field is pulled out of all the records at
+once (a column) and converted in one step:
+  - fix() applies the fixCorruptedData() rules to a column.
+  - scale() applies a unit conversion (KPH to MPS) to a column.
+  - formatDecimals() and formatUnits() apply the uiFormat*() rules to a
+    column, with the format string worked out once.
+
+If NumPy is installed, numeric columns are converted, scaled and checked as
+arrays. Otherwise the same work is done in pure Python. Both give the same
+results as the one value at a time methods (values are handed back as Python
+floats, so they are written and compared exactly as before.)
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Columns"
+__version__ = "0.1.00"
+
+kCorrupted   = -55.728  # -99 F = -55.728 C. No logical value less than -55.7 should be possible.
+kScalarTypes = (float, int, long, str, unicode)
+
+
+def scale(values, factor):
+    """ Return a column of values multiplied by factor. Values that won't
+    float ("--", None...) come back as None, which fix() treats as corrupted
+    data, so one bad value doesn't stop the rest of the column. """
+
+    # Values that aren't scalars (None, lists...) can't float, but NumPy would make some of them into NaN.
+    if numpy is not None and values and all(type(val) in kScalarTypes for val in values):
+        try:
+            return (numpy.array(values, dtype=float) * factor).tolist()
+        except (ValueError, TypeError):
+            pass
+
+    results = []
+
+    for val in values:
+        try:
+            results.append(float(val) * factor)
+        except (ValueError, TypeError):
+            results.append(None)
+
+    return results
+
+
+def fix(state_ids, values, log=None):
+    """
+    Apply the fixCorruptedData() rules to a column. Returns a list of
+    (value, uiValue) tuples: (float, str) for good values, and (-99.0, u"--")
+    for values that won't float or are out of range.
+
+    state_ids -- the state id for each value (used in the log.)
+    log       -- function called with a message for each value fixed.
+    """
+
+    column = None
+
+    # Values that aren't scalars (None, lists...) can't float, but NumPy would make some of them into NaN.
+    if numpy is not None and values and all(type(val) in kScalarTypes for val in values):
+        try:
+            array = numpy.array(values, dtype=float)
+        except (ValueError, TypeError):
+            pass
+        else:
+            column = zip(array.tolist(), (array < kCorrupted).tolist())
+
+    if column is None:
+        column = []
+        for val in values:
+            try:
+                val = float(val)
+                column.append((val, val < kCorrupted))
+            except (ValueError, TypeError):
+                column.append((None, True))
+
+    results = []
+
+    for state_id, (val, corrupted) in zip(state_ids, column):
+        if not corrupted:
+            results.append((val, str(val)))
+            continue
+
+        if log is not None:
+            if val is None:
+                log(u"Fixed corrupted data. Returning: {0}, {1}".format(-99.0, u"--"))
+            else:
+                log(u"Fixed corrupted data {0}: {1}. Returning: {2}, {3}".format(state_id, val, -99.0, u"--"))
+
+        results.append((-99.0, u"--"))
+
+    return results
+
+
+def formatDecimals(values, decimals, units, fallback):
+    """
+    Format a column of numbers with decimals places and units appended (the
+    uiFormatPercentage(), uiFormatTemperature() and uiFormatWind() rules.)
+
+    fallback -- function called as fallback(val, error) for a value that won't
+                float. Returns the text to use.
+    """
+
+    template = u"{{0:0.{0}f}}{1}".format(int(decimals), units.replace(u"{", u"{{").replace(u"}", u"}}"))
+    results  = []
+
+    for val in values:
+        try:
+            results.append(template.format(float(val)))
+        except ValueError as error:
+            results.append(fallback(val, error))
+
+    return results
+
+
+def formatUnits(values, units):
+    """ Append units to a column of values (the uiFormatRain() and
+    uiFormatSnow() rules.) Values that aren't available are left as is. """
+
+    return [val if val in ["NA", "N/A", "--", ""] else u"{0}{1}".format(val, units) for val in values]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuDecode.py
+Author: DaveL17
+
+The Decoder class turns the raw bytes of a Weather Underground response into
+Python objects using the fastest JSON library that is installed. Backends are
+tried in order (orjson, ujson, simplejson with its C speedups, the standard
+library json module, pure Python simplejson) and the first that imports is
+used. If the chosen backend can't decode a document, the document is decoded
+again with the standard library before the error is reported, so an optional
+library can never make things worse than they were.
+
+Decoding straight from the response bytes saves converting the whole payload
+to a unicode string first (which the JSON library would then scan again.)
+"""
+
+import json
+import time
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Decoder"
+__version__ = "0.1.00"
+
+
+def _orjsonBackend():
+    import orjson  # Python 3 only. Listed so the chain carries forward.
+    return orjson.loads
+
+
+def _ujsonBackend():
+    import ujson
+    return ujson.loads
+
+
+def _simplejsonSpeedupsBackend():
+    import simplejson
+    import simplejson.scanner
+    if simplejson.scanner.c_make_scanner is None:
+        raise ImportError(u"simplejson C speedups are not available.")
+    return simplejson.loads
+
+
+def _jsonBackend():
+    return json.loads
+
+
+def _simplejsonBackend():
+    import simplejson
+    return simplejson.loads
+
+
+# Backends in order of preference.
+kBackends = (
+    ('orjson', _orjsonBackend),
+    ('ujson', _ujsonBackend),
+    ('simplejson (C)', _simplejsonSpeedupsBackend),
+    ('json', _jsonBackend),
+    ('simplejson', _simplejsonBackend),
+)
+
+
+def availableBackends():
+    """ Return a list of (name, loads) for every backend that imports. """
+
+    backends = []
+
+    for name, loader in kBackends:
+        try:
+            backends.append((name, loader()))
+        except Exception:
+            continue
+
+    return backends
+
+
+class Decoder(object):
+    """
+    JSON decoder using the fastest available backend.
+
+    name  -- name of the active backend.
+    loads -- decode a str (bytes) or unicode JSON document.
+    """
+
+    def __init__(self):
+        self.name, self._loads = availableBackends()[0]
+
+    def loads(self, data):
+        """ Decode data with the active backend, falling back to the standard
+        library if the active backend fails. """
+
+        try:
+            return self._loads(data)
+        except Exception:
+            if self._loads is json.loads:
+                raise
+            return json.loads(data)
+
+
+def benchmark(documents, repeat=5):
+    """
+    Time every available backend against each document.
+
+    documents -- dict of {label: JSON bytes}.
+    repeat    -- decode each document this many times and keep the fastest.
+
+    Returns a list of (backend name, {label: seconds}) in order of preference.
+    A backend that fails to decode a document reports None for it.
+    """
+
+    results = []
+
+    for name, loads in availableBackends():
+        timings = {}
+
+        for label, data in documents.items():
+            best = None
+            try:
+                for _ in range(repeat):
+                    start = time.time()
+                    loads(data)
+                    elapsed = time.time() - start
+                    if best is None or elapsed < best:
+                        best = elapsed
+            except Exception:
+                best = None
+
+            timings[label] = best
+
+        results.append((name, timings))
+
+    return results
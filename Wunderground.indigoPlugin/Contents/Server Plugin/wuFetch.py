@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuFetch.py
+Author: DaveL17
+
+The Dispatcher class runs the plugin's downloads (weather locations, radar
+and satellite images) on a fixed pool of long-lived worker threads. Work is
+queued as jobs, each with a deadline. A job whose deadline passes while it is
+still queued is dropped, and a running job can ask how much time it has left
+so that its requests never outlive it. The pool is started once (from
+runConcurrentThread) rather than creating threads on every refresh cycle, so
+any number of locations and images can be queued without adding threads.
+The plugin runs two pools (weather locations, and images) so that a slow image
+host can't hold up a weather download.
+
+The CircuitBreaker class keeps track of failures by location. A location
+that keeps failing is skipped for a cool-down period (which grows while the
+failures continue) so that it can't hold up the locations that are working.
+"""
+
+import Queue
+import threading
+import time
+import traceback
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Fetch Dispatcher"
+__version__ = "0.1.00"
+
+# The job run by the current worker thread (shared by all dispatchers, so that timeout() works from any pool.)
+_current = threading.local()
+
+
+class Job(object):
+    """
+    A unit of work queued with the dispatcher.
+
+    result  -- return value of the job function.
+    error   -- exception raised by the job function (if any.)
+    expired -- True if the deadline passed before the job could start.
+    """
+
+    def __init__(self, func, args, deadline, name):
+        self.func     = func
+        self.args     = args
+        self.deadline = deadline
+        self.name     = name
+        self.result   = None
+        self.error    = None
+        self.expired  = False
+        self.finished = threading.Event()
+
+    def done(self):
+        """ Return True if the job has finished (or expired.) """
+
+        return self.finished.is_set()
+
+    def wait(self, grace=0):
+        """ Wait for the job until its deadline (plus grace seconds.) Returns
+        True if the job finished. """
+
+        self.finished.wait(max(0, self.deadline - time.time()) + grace)
+        return self.finished.is_set()
+
+
+class Dispatcher(object):
+    """
+    Fixed pool of worker threads that run download jobs.
+
+    plugin  -- the plugin instance (used for error reporting.)
+    workers -- number of worker threads.
+    name    -- name of the pool (used to name its threads.)
+    """
+
+    def __init__(self, plugin, workers=4, name=u"fetch"):
+        self.plugin  = plugin
+        self.lock    = threading.Lock()
+        self.queue   = Queue.Queue()
+        self.threads = []
+        self.workers = max(1, int(workers))
+        self.name    = name
+
+    def start(self):
+        """ Start (or top up) the worker threads. Safe to call repeatedly. """
+
+        with self.lock:
+            self.threads = [thread for thread in self.threads if thread.is_alive()]
+
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self.worker, name=u"WUnderground {0} {1}".format(self.name, len(self.threads)))
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+
+    def resize(self, workers):
+        """ Change the number of worker threads. Surplus workers exit after
+        their current job. """
+
+        workers = max(1, int(workers))
+
+        with self.lock:
+            surplus = len(self.threads) - workers
+            self.workers = workers
+
+        for _ in range(max(0, surplus)):
+            self.queue.put(None)
+
+        self.start()
+
+    def stop(self):
+        """ Ask every worker to exit once the queued work is done. """
+
+        with self.lock:
+            count = len(self.threads)
+            self.workers = 0
+
+        for _ in range(count):
+            self.queue.put(None)
+
+    def submit(self, func, args=(), timeout=60, name=u""):
+        """ Queue func(*args) to be run within timeout seconds and return its
+        Job. """
+
+        job = Job(func, args, time.time() + timeout, name)
+
+        if self.workers < 1:
+            self.workers = 1
+        self.start()
+
+        self.queue.put(job)
+        return job
+
+    def timeout(self, default=10, minimum=1):
+        """ Return the timeout to use for a request made by the current job:
+        the default, or less if the job's deadline is nearer. Outside of a job
+        the default is returned. """
+
+        job = getattr(_current, 'job', None)
+
+        if job is None:
+            return default
+
+        return max(minimum, min(default, job.deadline - time.time()))
+
+    def worker(self):
+        """ Worker thread. Runs jobs until it is handed None. """
+
+        while True:
+            job = self.queue.get()
+
+            if job is None:
+                with self.lock:
+                    current = threading.current_thread()
+                    self.threads = [thread for thread in self.threads if thread is not current]
+                return
+
+            if time.time() > job.deadline:
+                job.expired = True
+                job.finished.set()
+                continue
+
+            _current.job = job
+
+            try:
+                job.result = job.func(*job.args)
+            except Exception as error:
+                job.error = error
+                self.plugin.Fogbert.pluginErrorHandler(traceback.format_exc())
+            finally:
+                _current.job = None
+                job.finished.set()
+
+
+class CircuitBreaker(object):
+    """
+    Per-key circuit breaker.
+
+    threshold -- consecutive failures before the circuit opens.
+    cooldown  -- seconds the circuit stays open the first time. Each failure
+                 of the trial request that follows doubles it, up to
+                 max_cooldown.
+    """
+
+    def __init__(self, threshold=3, cooldown=300, max_cooldown=3600):
+        self.lock         = threading.Lock()
+        self.threshold    = threshold
+        self.cooldown     = cooldown
+        self.max_cooldown = max_cooldown
+        self.circuits     = {}  # {key: [consecutive failures, open until, current cool-down]}
+        self.trials       = {}  # {key: open until before the trial was granted}
+
+    def allow(self, key):
+        """ Return True if a request for key may be made. Once the cool-down
+        has passed, one trial request is allowed: the circuit stays open for
+        another cool-down while the trial is made, so other callers are held
+        back until success() or failure() reports the result. """
+
+        with self.lock:
+            failures, open_until, cooldown = self.circuits.get(key, [0, 0, self.cooldown])
+
+            if not open_until:
+                return True
+
+            time_now = time.time()
+
+            if time_now < open_until:
+                return False
+
+            # Grant the trial.
+            self.trials[key]   = open_until
+            self.circuits[key] = [failures, time_now + cooldown, cooldown]
+            return True
+
+    def release(self, key):
+        """ Give back a trial that was granted but never made (the call was
+        deferred by the call limits), so the next caller may make it. """
+
+        with self.lock:
+            if key in self.trials and key in self.circuits:
+                self.circuits[key][1] = self.trials[key]
+
+            self.trials.pop(key, None)
+
+    def openUntil(self, key):
+        """ Return the time the circuit for key closes (0 if it is closed.) """
+
+        with self.lock:
+            return self.circuits.get(key, [0, 0, self.cooldown])[1]
+
+    def success(self, key):
+        """ Record a good response for key. """
+
+        with self.lock:
+            self.circuits.pop(key, None)
+            self.trials.pop(key, None)
+
+    def failure(self, key):
+        """ Record a failure for key. Returns True if this failure opened the
+        circuit. """
+
+        with self.lock:
+            failures, open_until, cooldown = self.circuits.get(key, [0, 0, self.cooldown])
+            failures += 1
+            self.trials.pop(key, None)
+
+            if failures < self.threshold:
+                self.circuits[key] = [failures, 0, cooldown]
+                return False
+
+            # A failed trial after a cool-down doubles the next one.
+            if open_until:
+                cooldown = min(self.max_cooldown, cooldown * 2)
+
+            self.circuits[key] = [failures, time.time() + cooldown, cooldown]
+            return True
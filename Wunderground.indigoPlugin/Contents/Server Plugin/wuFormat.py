@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuFormat.py
+Author: DaveL17
+
+The FormatContext class holds the display settings for one device: the
+decimal places (plugin prefs), the units appended to uiValues (device props)
+and the date and time format specifiers. The uiFormat*() methods and the state
+conversions read the context rather than the prefs and props, which would
+otherwise be read again for every value of every device.
+
+The plugin keeps a context for each device (see plugin.formatContext().) A
+context is only built again when the plugin prefs are saved
+(closedPrefsConfigUi()) or the device is restarted after its config has been
+changed (deviceStartComm().)
+"""
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Format Context"
+__version__ = "0.1.00"
+
+
+class FormatContext(object):
+    """
+    Display settings for one device.
+
+    plugin -- the plugin instance (for the prefs and the DLFramework date and
+              time formats.)
+    props  -- the device's pluginProps.
+    """
+
+    def __init__(self, plugin, props):
+        prefs = plugin.pluginPrefs
+
+        # Date and time format specifiers.
+        self.date_format      = plugin.Formatter.dateFormat()
+        self.time_format      = plugin.Formatter.timeFormat()
+        self.date_time_format = "{0} {1}".format(self.date_format, self.time_format)
+
+        # Decimal places.
+        self.humidity_decimal  = int(prefs.get('uiHumidityDecimal', 1))
+        self.item_list_decimal = prefs.get('itemListTempDecimal', 0)
+        self.temp_decimal      = int(prefs.get('uiTempDecimal', 1))
+        self.wind_decimal      = int(prefs.get('uiWindDecimal', 1))
+
+        # Units.
+        self.distance_units    = props.get('distanceUnits', '')
+        self.item_list_units   = props.get('itemListUiUnits', '')
+        self.percentage_units  = props.get('percentageUnits', '')
+        self.pressure_units    = props.get('pressureUnits', '')
+        self.rain_units        = props.get('rainUnits', '')
+        self.snow_units        = props.get('snowAmountUnits', '')
+        self.temperature_units = props.get('temperatureUnits', '')
+        self.wind_units        = props.get('windUnits', '')
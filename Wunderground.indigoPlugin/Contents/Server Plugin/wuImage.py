@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuImage.py
+Author: DaveL17
+
+The ImageStore class downloads radar and satellite images for the image
+devices. Most of the time the remote image hasn't changed since the last
+cycle, so:
+  - the ETag and Last-Modified headers of each download are remembered and
+    sent back with the next request for the same image. A 304 (not modified)
+    response has no body, so nothing is downloaded or written.
+  - servers that don't support conditional requests still send the whole
+    image, but it is only written if its SHA-1 differs from the file already
+    in place.
+
+Images are often written into the IndigoWebServer static folder, where a
+control page can read them at any time. Each image is written to a temporary
+file in the destination folder and renamed into place, so a reader sees
+either the old image or the new one and never a half written file.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Images"
+__version__ = "0.1.00"
+
+# Results of ImageStore.download()
+kNotModified = 'not modified'  # 304 response. Nothing downloaded.
+kUnchanged   = 'unchanged'     # Downloaded, but identical to the file in place.
+kWritten     = 'written'       # Downloaded and written.
+
+
+def fileHash(file_path):
+    """ Return the SHA-1 of a file (None if it can't be read.) """
+
+    digest = hashlib.sha1()
+
+    try:
+        with open(file_path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(65536), b''):
+                digest.update(chunk)
+    except (IOError, OSError):
+        return None
+
+    return digest.hexdigest()
+
+
+class ImageStore(object):
+    """
+    Conditional, deduplicated image downloads.
+
+    validators -- {destination: {'source': URL, 'etag': ETag header,
+                  'modified': Last-Modified header, 'sha1': hash of the file
+                  written}}
+    """
+
+    def __init__(self, transport):
+        self.transport  = transport
+        self.lock       = threading.Lock()
+        self.validators = {}
+
+    def clear(self):
+        """ Forget every image (the next downloads are unconditional.) """
+
+        with self.lock:
+            self.validators.clear()
+
+    def headers(self, source, destination):
+        """ Return the conditional request headers for an image. These are
+        only sent if the same source was saved to destination last time and
+        the file is still there. """
+
+        with self.lock:
+            known = dict(self.validators.get(destination, {}))
+
+        headers = {}
+
+        if known.get('source') != source or not os.path.isfile(destination):
+            return headers
+
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+
+        if known.get('modified'):
+            headers['If-Modified-Since'] = known['modified']
+
+        return headers
+
+    def download(self, source, destination, timeout=10, chunk_size=8192):
+        """
+        Download source and save it to destination. Returns (status code,
+        result) where result is kNotModified, kUnchanged or kWritten (None if
+        the server didn't return an image.)
+        """
+
+        response = self.transport.get(source, stream=True, timeout=timeout, headers=self.headers(source, destination))
+
+        try:
+            if response.status_code == 304:
+                return response.status_code, kNotModified
+
+            if response.status_code != 200:
+                return response.status_code, None
+
+            folder = os.path.dirname(destination) or u"."
+            digest = hashlib.sha1()
+
+            file_descriptor, temp_path = tempfile.mkstemp(prefix='.wuImage', dir=folder)
+
+            try:
+                with os.fdopen(file_descriptor, 'wb') as outfile:
+                    for chunk in response.iter_content(chunk_size):
+                        digest.update(chunk)
+                        outfile.write(chunk)
+
+                sha1 = digest.hexdigest()
+
+                with self.lock:
+                    last_sha1 = self.validators.get(destination, {}).get('sha1')
+
+                # After a restart we don't know what was written, so look at the file itself.
+                if last_sha1 is None:
+                    last_sha1 = fileHash(destination)
+
+                if sha1 == last_sha1 and os.path.isfile(destination):
+                    os.remove(temp_path)
+                    result = kUnchanged
+
+                else:
+                    # mkstemp() files are private to the owner. The web server needs to read this one.
+                    os.chmod(temp_path, 0o644)
+                    os.rename(temp_path, destination)
+                    result = kWritten
+
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            with self.lock:
+                self.validators[destination] = {'source': source,
+                                                'etag': response.headers.get('ETag'),
+                                                'modified': response.headers.get('Last-Modified'),
+                                                'sha1': sha1,
+                                                }
+
+            return response.status_code, result
+
+        finally:
+            response.close()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuLocation.py
+Author: DaveL17
+
+Device locations are free text, so the same place can be entered in several
+ways (" 60601", "60601", "zmw:60601.1.99999", "pws:KILCHICA52"...). Each
+spelling used to cost its own API call. The canonical() function tidies a
+location string (whitespace, case, a pasted '/q/' prefix) and the
+LocationIndex class learns which queries Weather Underground answers from
+the same place, so that each is downloaded once per cycle.
+
+Aliases are learned from each response:
+  - current_observation/station_id: two queries answered by the same weather
+    station share a download.
+  - location/l: the zmw query that Weather Underground resolved a zip code or
+    city to is an alias of that query (not used for 'pws:' queries, where the
+    zmw is only the nearest city.)
+
+Aliases are forgotten when the Weather Underground day changes, so a query
+that WU starts answering from a different station is picked up again.
+"""
+
+import re
+import threading
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Locations"
+__version__ = "0.1.00"
+
+
+def canonical(location):
+    """ Return the canonical form of a location query string. """
+
+    location = u"{0}".format(location).strip().lower()
+
+    # Some users paste the query straight from a WU URL.
+    if location.startswith(u"/q/"):
+        location = location[3:]
+
+    location = re.sub(r"\s*([,:/])\s*", r"\1", location)
+    location = re.sub(r"\s+", u" ", location)
+
+    return location or u"autoip"
+
+
+class LocationIndex(object):
+    """
+    Map location queries to the query used to download them.
+
+    aliases    -- {canonical query: query that is downloaded instead}
+    identities -- {station or zmw identity: query that is downloaded}
+    """
+
+    def __init__(self):
+        self.lock       = threading.Lock()
+        self.aliases    = {}
+        self.identities = {}
+        self.wu_day     = None
+
+    def clear(self):
+        """ Forget everything that has been learned. """
+
+        with self.lock:
+            self.aliases.clear()
+            self.identities.clear()
+
+    def newDay(self, wu_day):
+        """ Forget aliases when the Weather Underground day changes. """
+
+        wu_day = u"{0}".format(wu_day)
+
+        with self.lock:
+            if wu_day != self.wu_day:
+                self.aliases.clear()
+                self.identities.clear()
+                self.wu_day = wu_day
+
+    def resolve(self, location):
+        """ Return the query to download for a device location. """
+
+        query = canonical(location)
+
+        with self.lock:
+            # Follow chains of aliases (bounded, in case of a loop.)
+            for _ in range(4):
+                if query not in self.aliases:
+                    break
+                query = self.aliases[query]
+
+        return query
+
+    def learn(self, query, data):
+        """ Record the identities found in the response to query. Returns the
+        list of queries that became aliases (their downloads are no longer
+        needed.) """
+
+        if not isinstance(data, dict) or 'error' in data.get('response', {}):
+            return []
+
+        identities = []
+
+        station_id = data.get('current_observation', {}).get('station_id')
+        if station_id:
+            identities.append(u"station:{0}".format(station_id).lower())
+
+        zmw = None
+        if not query.startswith(u"pws:"):
+            zmw = canonical(data.get('location', {}).get('l', u""))
+            if zmw.startswith(u"zmw:"):
+                identities.append(zmw)
+            else:
+                zmw = None
+
+        new_aliases = []
+
+        with self.lock:
+            for identity in identities:
+                owner = self.identities.setdefault(identity, query)
+                if owner != query and query not in self.aliases:
+                    self.aliases[query] = owner
+                    new_aliases.append(query)
+
+            # A device using the zmw query directly can use this download.
+            if zmw is not None and zmw not in self.aliases:
+                target = self.aliases.get(query, query)
+                if target != zmw:
+                    self.aliases[zmw] = target
+
+        return new_aliases
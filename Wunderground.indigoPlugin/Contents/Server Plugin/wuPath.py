@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuPath.py
+Author: DaveL17
+
+Compiled key path lookups for Weather Underground data. The parse methods
+read hundreds of values per device with nestedLookup(), which wraps each level
+in a list and scans it with a generator on every call. Here each key path is
+compiled once into a getter function with the same rules:
+  - at each level the first element holding the key wins (a dict is treated
+    as a list of one.)
+  - if no element holds the key, the default is returned.
+
+Dicts (by far the most common case) are read directly. Any other container
+takes the general route, so the result is always the same as nestedLookup().
+Getters are cached by key path, so path() can be called inline.
+"""
+
+import threading
+import time
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Key Paths"
+__version__ = "0.1.00"
+
+kDefault = u"Not available"
+
+_compiled = {}
+_lock     = threading.Lock()
+
+
+def lookup(obj, keys, default=kDefault):
+    """ Return the value at keys in obj (the nestedLookup() rules.) """
+
+    current = obj
+
+    for key in keys:
+        current = current if isinstance(current, list) else [current]
+
+        for sub in current:
+            if key in sub:
+                current = sub[key]
+                break
+        else:
+            return default
+
+    return current
+
+
+def compilePath(keys):
+    """ Return a getter function for keys: getter(obj, default=kDefault). """
+
+    keys = tuple(keys)
+
+    if len(keys) == 1:
+        key0, = keys
+
+        def getter(obj, default=kDefault):
+            if type(obj) is dict:
+                return obj[key0] if key0 in obj else default
+            return lookup(obj, keys, default)
+
+    elif len(keys) == 2:
+        key0, key1 = keys
+
+        def getter(obj, default=kDefault):
+            if type(obj) is dict:
+                if key0 not in obj:
+                    return default
+                child = obj[key0]
+                if type(child) is dict:
+                    return child[key1] if key1 in child else default
+                return lookup(child, keys[1:], default)
+            return lookup(obj, keys, default)
+
+    else:
+        def getter(obj, default=kDefault):
+            current = obj
+            for index, key in enumerate(keys):
+                if type(current) is not dict:
+                    return lookup(current, keys[index:], default)
+                if key not in current:
+                    return default
+                current = current[key]
+            return current
+
+    getter.keys = keys
+    return getter
+
+
+def path(*keys):
+    """ Return the (cached) getter for a key path. """
+
+    try:
+        return _compiled[keys]
+    except KeyError:
+        with _lock:
+            return _compiled.setdefault(keys, compilePath(keys))
+
+
+def compiledPaths():
+    """ Return the key paths compiled so far. """
+
+    with _lock:
+        return list(_compiled)
+
+
+def benchmark(documents, paths, reference=lookup, repeat=5):
+    """
+    Time a reference lookup function against the compiled getters.
+
+    documents -- dict of {label: decoded weather data}.
+    paths     -- key paths to read from each document.
+    reference -- function called as reference(obj, keys).
+    repeat    -- read every path this many times and keep the fastest.
+
+    Returns {label: (reference seconds, compiled seconds)}.
+    """
+
+    getters = [path(*keys) for keys in paths]
+    results = {}
+
+    for label, data in documents.items():
+        best_reference = None
+        best_compiled  = None
+
+        for _ in range(repeat):
+            start = time.time()
+            for keys in paths:
+                reference(data, keys)
+            elapsed = time.time() - start
+            if best_reference is None or elapsed < best_reference:
+                best_reference = elapsed
+
+            start = time.time()
+            for getter in getters:
+                getter(data)
+            elapsed = time.time() - start
+            if best_compiled is None or elapsed < best_compiled:
+                best_compiled = elapsed
+
+        results[label] = (best_reference, best_compiled)
+
+    return results
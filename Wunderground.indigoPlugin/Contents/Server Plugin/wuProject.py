@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuProject.py
+Author: DaveL17
+
+Path projection of Weather Underground responses. The parse methods read a
+small part of each response (the key paths passed to nestedLookup()), so there
+is no need to hold the rest of it in the master weather dictionary.
+
+A projection is described by a set of key path tuples like
+('current_observation', 'temp_f'). Everything under the last key of a path is
+kept. As with nestedLookup(), lists are transparent: a path continues into
+every element of a list it meets.
+
+If the ijson library is installed, the response is read as a stream of JSON
+events and only the wanted values are ever built. Otherwise the response is
+decoded in full and pruned, which saves memory for the rest of the cycle but
+not during the decode.
+"""
+
+from decimal import Decimal
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Projection"
+__version__ = "0.1.00"
+
+# Try the compiled ijson backends first. The pure Python backend still streams, but is slower than a full decode.
+ijson = None
+ijson_backend = None
+
+for _name in ('yajl2_c', 'yajl2_cffi', 'yajl2', 'python'):
+    try:
+        ijson = __import__('ijson.backends.{0}'.format(_name), fromlist=['parse'])
+        ijson_backend = _name
+        break
+    except Exception:
+        continue
+
+# Key paths read by the parse methods, by API feature. The response section is always kept (error reporting.)
+kFeaturePaths = {
+    'geolookup':     (('location', 'city'),
+                      ('location', 'l'),  # The zmw query, used to learn location aliases (see wuLocation.)
+                      ('location', 'nearby_weather_stations', 'pws', 'station'),
+                      ),
+    'alerts':        (('alerts',),
+                      ),
+    'almanac':       (('almanac', 'airport_code'),
+                      ('almanac', 'temp_high'),
+                      ('almanac', 'temp_low'),
+                      ),
+    'astronomy':     (('moon_phase', 'ageOfMoon'),
+                      ('moon_phase', 'current_time'),
+                      ('moon_phase', 'hemisphere'),
+                      ('moon_phase', 'percentIlluminated'),
+                      ('moon_phase', 'phaseofMoon'),
+                      ('moon_phase', 'sunrise'),
+                      ('moon_phase', 'sunset'),
+                      ('sun_phase', 'sunrise'),
+                      ('sun_phase', 'sunset'),
+                      ),
+    'conditions':    tuple(('current_observation', key) for key in ('UV', 'dewpoint_c', 'dewpoint_f', 'estimated', 'feelslike_c', 'feelslike_f',
+                                                                    'heat_index_c', 'heat_index_f', 'icon', 'observation_epoch', 'observation_time',
+                                                                    'precip_1hr_in', 'precip_1hr_metric', 'precip_today_in', 'precip_today_metric',
+                                                                    'pressure_in', 'pressure_mb', 'pressure_trend', 'relative_humidity', 'solarradiation',
+                                                                    'station_id', 'temp_c', 'temp_f', 'visibility_km', 'visibility_mi', 'weather',
+                                                                    'wind_degrees', 'wind_dir', 'wind_gust_kph', 'wind_gust_mph', 'wind_kph', 'wind_mph',
+                                                                    'windchill_c', 'windchill_f')),
+    'forecast':      (('forecast', 'txt_forecast', 'forecastday'),
+                      ('forecast', 'simpleforecast', 'forecastday'),
+                      ),
+    'forecast10day': (('forecast', 'txt_forecast', 'forecastday'),
+                      ('forecast', 'simpleforecast', 'forecastday'),
+                      ),
+    'hourly':        (('hourly_forecast',),
+                      ),
+    'yesterday':     (('history', 'dailysummary'),
+                      ),
+    'tide':          (('tide', 'tideInfo'),
+                      ('tide', 'tideSummary'),
+                      ('tide', 'tideSummaryStats'),
+                      ),
+}
+
+
+def featurePaths(features):
+    """ Return the set of key paths needed for a collection of features. """
+
+    paths = set([('response',)])
+
+    for feature in features:
+        paths.update(kFeaturePaths.get(feature, ()))
+
+    return paths
+
+
+def buildTree(paths):
+    """ Turn a collection of key paths into a tree of nested dicts. A value of
+    True marks a kept subtree. """
+
+    tree = {}
+
+    for path in paths:
+        node = tree
+        for key in path[:-1]:
+            child = node.setdefault(key, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[path[-1]] = True
+
+    return tree
+
+
+def prune(obj, tree):
+    """ Return a copy of a decoded response holding only the paths in tree. """
+
+    if tree is True:
+        return obj
+
+    if isinstance(obj, list):
+        return [prune(item, tree) for item in obj]
+
+    if isinstance(obj, dict):
+        return dict((key, prune(obj[key], node)) for key, node in tree.iteritems() if key in obj)
+
+    return obj
+
+
+def streamLoads(fileobj, tree):
+    """ Read JSON from fileobj (a file or any object with a read() method)
+    and build only the paths in tree. Requires ijson. """
+
+    # Each stack entry is [container, tree node, current key].
+    stack  = []
+    result = None
+    skip   = 0
+
+    for prefix, event, value in ijson.parse(fileobj):
+
+        # Inside a branch we don't want. Just track its depth.
+        if skip:
+            if event in ('start_map', 'start_array'):
+                skip += 1
+            elif event in ('end_map', 'end_array'):
+                skip -= 1
+            continue
+
+        if event == 'map_key':
+            stack[-1][2] = value
+            continue
+
+        if event in ('end_map', 'end_array'):
+            stack.pop()
+            continue
+
+        # A value or the start of a container. Work out where it goes.
+        if not stack:
+            node = tree
+        else:
+            container, parent_node, key = stack[-1]
+            if parent_node is True or isinstance(container, list):
+                node = parent_node
+            else:
+                node = parent_node.get(key)
+
+        if node is None:
+            if event in ('start_map', 'start_array'):
+                skip = 1
+            continue
+
+        if event == 'start_map':
+            value = {}
+        elif event == 'start_array':
+            value = []
+        elif isinstance(value, Decimal):
+            value = float(value)
+
+        if not stack:
+            result = value
+        elif isinstance(stack[-1][0], list):
+            stack[-1][0].append(value)
+        else:
+            stack[-1][0][stack[-1][2]] = value
+
+        if event in ('start_map', 'start_array'):
+            stack.append([value, node, None])
+
+    return result
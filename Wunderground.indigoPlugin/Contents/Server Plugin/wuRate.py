@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuRate.py
+Author: DaveL17
+
+The RateLimiter class keeps the plugin inside the limits of the user's
+Weather Underground plan:
+  - calls per minute, with a token bucket that holds up to one minute's worth
+    of calls and refills at the per-minute rate.
+  - calls per day, with a quota for each API key that resets when the Weather
+    Underground day (US/Pacific) changes.
+
+A call is counted against the daily quota when its token is granted, so a
+burst of downloads can never run past the cap. Callers that can't get a call
+in time (or at all, once the quota is spent) get a CallDeferred exception and
+should keep the data they already have.
+
+The daily counts can be saved to (and restored from) a JSON string so that
+they survive a plugin restart.
+
+The planInterval() function spreads the calls left today evenly over the time
+left in the Weather Underground day.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Rate Limiter"
+__version__ = "0.1.00"
+
+
+class CallDeferred(Exception):
+    """ Raised when a call can't be made (daily quota spent, or no token
+    available before the deadline.) """
+
+    def __init__(self, reason):
+        Exception.__init__(self, reason)
+        self.reason = reason
+
+
+def planInterval(calls_left, locations, seconds_left, minimum):
+    """
+    Return the refresh interval (in seconds) for each location that spends
+    the calls left today evenly until the end of the Weather Underground day.
+
+    calls_left   -- calls left in today's quota.
+    locations    -- number of locations downloaded each refresh.
+    seconds_left -- seconds until the end of the WU day.
+    minimum      -- shortest interval wanted (the plugin's refresh interval.)
+    """
+
+    if locations < 1:
+        return minimum
+
+    refreshes = int(calls_left) // int(locations)
+
+    # Not enough calls left for even one more download of every location.
+    if refreshes < 1:
+        return max(minimum, seconds_left)
+
+    return max(minimum, float(seconds_left) / refreshes)
+
+
+def keyId(api_key):
+    """ Return a short id for an API key, so that the key itself is not
+    stored again. """
+
+    return hashlib.sha1(u"{0}".format(api_key).encode('utf-8')).hexdigest()[:12]
+
+
+class RateLimiter(object):
+    """
+    Per-minute token bucket and per-day quota, by API key.
+
+    per_minute -- calls allowed per minute.
+    per_day    -- calls allowed per Weather Underground day.
+    """
+
+    def __init__(self, per_minute=10, per_day=500):
+        self.lock       = threading.Lock()
+        self.per_minute = max(1, per_minute)
+        self.per_day    = max(0, per_day)
+        self.tokens     = float(self.per_minute)
+        self.updated    = time.time()
+        self.quotas     = {}  # {key id: [WU day, calls made]}
+
+    def configure(self, per_minute, per_day):
+        """ Change the limits (the plan can be changed in the plugin
+        configuration dialog.) """
+
+        with self.lock:
+            self.per_minute = max(1, per_minute)
+            self.per_day    = max(0, per_day)
+            self.tokens     = min(self.tokens, float(self.per_minute))
+
+    def callsMade(self, api_key, wu_day):
+        """ Return the number of calls counted today for api_key. """
+
+        with self.lock:
+            day, count = self.quotas.get(keyId(api_key), [None, 0])
+
+        return count if day == u"{0}".format(wu_day) else 0
+
+    def setCallsMade(self, api_key, wu_day, count):
+        """ Set the number of calls counted on wu_day for api_key (used to
+        carry over the count kept by earlier versions of the plugin.) """
+
+        try:
+            count = int(count)
+        except ValueError:
+            count = 0
+
+        with self.lock:
+            self.quotas[keyId(api_key)] = [u"{0}".format(wu_day), count]
+
+    def callsLeft(self, api_key, wu_day):
+        """ Return the number of calls left today for api_key. """
+
+        return max(0, self.per_day - self.callsMade(api_key, wu_day))
+
+    def acquire(self, api_key, wu_day, timeout=60):
+        """ Wait (up to timeout seconds) for a call to become available and
+        count it against today's quota. Raises CallDeferred if the call can't
+        be made. Uses time.sleep(), so it must only be called from worker
+        threads. """
+
+        key_id   = keyId(api_key)
+        wu_day   = u"{0}".format(wu_day)
+        deadline = time.time() + timeout
+
+        while True:
+            with self.lock:
+                day, count = self.quotas.get(key_id, [wu_day, 0])
+                if day != wu_day:
+                    day, count = wu_day, 0
+
+                if count >= self.per_day:
+                    raise CallDeferred(u"Daily call limit ({0}) reached.".format(self.per_day))
+
+                time_now     = time.time()
+                rate         = self.per_minute / 60.0
+                self.tokens  = min(float(self.per_minute), self.tokens + (time_now - self.updated) * rate)
+                self.updated = time_now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.quotas[key_id] = [day, count + 1]
+                    return count + 1
+
+                wait_time = (1 - self.tokens) / rate
+
+            if time_now + wait_time > deadline:
+                raise CallDeferred(u"Per-minute call limit ({0}) reached.".format(self.per_minute))
+
+            time.sleep(wait_time)
+
+    def dumps(self):
+        """ Return the daily counts as a JSON string. """
+
+        with self.lock:
+            return json.dumps(self.quotas)
+
+    def loads(self, state):
+        """ Restore the daily counts from a JSON string made by dumps(). """
+
+        try:
+            quotas = json.loads(state or u"{}")
+        except ValueError:
+            return
+
+        with self.lock:
+            self.quotas = dict((key, list(value)) for key, value in quotas.items() if isinstance(value, list) and len(value) == 2)
@@ -0,0 +1,883 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuStates.py
+Author: DaveL17
+
+Table driven device states. Each device model has a table of rows, and each
+row maps one Indigo state to:
+  - a source: a key path into the weather data (read with a compiled wuPath
+    getter), or a function of the record for values built from several keys.
+  - a conversion: how the value and uiValue are made from the source value
+    (fixCorruptedData(), int, a time string...) A uiValue of None means the
+    state is updated without one.
+  - a formatter: the name of the plugin's uiFormat*() method applied to the
+    uiValue (if any.)
+  - the unit settings it applies to (configMenuUnits and friends.)
+
+A table is compiled for a device configuration (only the rows that apply, with
+their getters and formatters resolved) and the compiled table is cached by the
+plugin, so parsing a device is a loop over its compiled rows. Tables for
+repeated records (hourly forecast, ten day forecast, tides) have their state
+ids for each slot (h01_temp ... h24_temp) built and interned once, when the
+module is imported, and are evaluated a column
+at a time: each field is read from all the records at once, and converted and
+formatted in one step where the conversion and formatter have a column version
+(see wuColumns.)
+
+Devices at the same location read the same weather data. The converted values
+are kept in a LocationRecord for the location's data, so each value is read and
+converted once per download, however many devices use it. Only the steps that
+depend on a device's own props (uiValue formatters, and the conversions marked
+perDevice) are run for each device.
+
+Adding a state is a matter of adding a row.
+"""
+
+import datetime as dt
+import time
+
+import wuColumns
+import wuPath
+
+__author__ = "DaveL17"
+__title__ = "WUnderground States"
+__version__ = "0.1.00"
+
+# Device props that decide which rows apply. Compiled tables are cached by these.
+kConfigProps = ('configMenuUnits', 'configWindDirUnits', 'configWindSpdUnits')
+
+
+def slotIds(state_id, slots, slot_id=u"{0}"):
+    """ Return a tuple of (interned) state ids for slots 1 to slots: state_id
+    with {0} replaced by the slot number in slot_id format. """
+
+    return tuple(intern(str(state_id.format(slot_id.format(slot)))) for slot in range(1, slots + 1))
+
+
+# Alert states (alertType1 ... alertExpires5), one tuple per alert in the order the plugin reads them: (type, description, message, expires)
+kAlertIds = zip(*[slotIds(state_id, 5) for state_id in (u"alertType{0}", u"alertDescription{0}", u"alertMessage{0}", u"alertExpires{0}")])
+
+
+class Context(object):
+    """
+    What a conversion needs to know about the device being parsed.
+
+    plugin -- the plugin instance.
+    dev    -- the Indigo device.
+    props  -- the device's pluginProps.
+    format -- the device's display settings (a wuFormat.FormatContext.)
+    """
+
+    def __init__(self, plugin, dev):
+        self.plugin = plugin
+        self.dev    = dev
+        self.props  = dev.pluginProps
+        self.format = plugin.formatContext(dev)
+
+
+# ================================ Conversions ================================
+# Each conversion is called as convert(ctx, state_id, val) and returns a
+# (value, uiValue) tuple. A uiValue of None means no uiValue is sent.
+
+def perDevice(convert):
+    """ Mark a conversion that reads the device's props or display settings.
+    Its results are not shared by the devices at a location. """
+
+    convert.perDevice = True
+    return convert
+
+
+def raw(ctx, state_id, val):
+    return val, val
+
+
+def value(ctx, state_id, val):
+    return val, None
+
+
+def text(ctx, state_id, val):
+    return u"{0}".format(val), None
+
+
+def constant(result):
+    """ Return a conversion that always sets result (value only.) """
+
+    def convert(ctx, state_id, val):
+        return result, None
+    return convert
+
+
+def formatted(template, ui=False):
+    """ Return a conversion that formats a tuple of source values into
+    template (also sent as the uiValue if ui is True.) """
+
+    def convert(ctx, state_id, val):
+        result = template.format(*val)
+        return result, result if ui else None
+    return convert
+
+
+def fix(ctx, state_id, val):
+    return ctx.plugin.fixCorruptedData(state_name=state_id, val=val)
+
+
+def fixInt(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return int(fixed), ui_value
+
+
+def fixIntText(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return int(fixed), str(int(fixed))
+
+
+def intText(ctx, state_id, val):
+    return int(val), str(int(val))
+
+
+def floatText(ctx, state_id, val):
+    fixed = ctx.plugin.floatEverything(state_name=state_id, val=val)
+    return fixed, u"{0}".format(fixed)
+
+
+def windName(ctx, state_id, val):
+    name = ctx.plugin.verboseWindNames(state_name=state_id, val=val)
+    return name, name
+
+
+def windNameValue(ctx, state_id, val):
+    return ctx.plugin.verboseWindNames(state_name=state_id, val=val), None
+
+
+def pressureSymbol(ctx, state_id, val):
+    symbol = ctx.plugin.fixPressureSymbol(state_name=state_id, val=val)
+    return symbol, symbol
+
+
+def underscore(ctx, state_id, val):
+    val = val.replace(' ', '_')
+    return val, val
+
+
+def _observationTime(ctx, epoch):
+    return time.strftime(ctx.format.date_time_format, time.localtime(float(epoch)))
+
+
+def observationTime(ctx, state_id, val):
+    observation = _observationTime(ctx, val)
+    return observation, observation
+
+
+def observationTimeValue(ctx, state_id, val):
+    return _observationTime(ctx, val), None
+
+
+def observationTimeText(ctx, state_id, val):
+    return u"{0}".format(_observationTime(ctx, val)), None
+
+
+def forecastDate(ctx, state_id, val):
+    forecast_day = time.strftime(ctx.format.date_format, time.localtime(float(val)))
+    return forecast_day, forecast_day
+
+
+def _clockTime(val):
+    hour, minute = val
+    today = dt.datetime.today()
+    return dt.datetime(today.year, today.month, today.day, int(hour), int(minute))
+
+
+def clockString(ctx, state_id, val):
+    return dt.datetime.strftime(_clockTime(val), ctx.format.date_time_format), None
+
+
+def clockEpoch(ctx, state_id, val):
+    return int(time.mktime(_clockTime(val).timetuple())), None
+
+
+def percentString(ctx, state_id, val):
+    return fix(ctx, state_id, val.strip('%'))
+
+
+@perDevice
+def visibility(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return fixed, u"{0}{1}".format(int(round(fixed)), ctx.format.distance_units)
+
+
+@perDevice
+def pressure(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return fixed, u"{0}{1}".format(ui_value, ctx.format.pressure_units)
+
+
+def pressureIconMetric(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return u"{0}".format(int(round(fixed, 0))), None
+
+
+def pressureIconStandard(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return ui_value.replace('.', ''), None
+
+
+def temperatureIcon(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return u"{0}".format(str(round(fixed, 0)).replace('.', '')), None
+
+
+def roundedIcon(ctx, state_id, val):
+    fixed, ui_value = fix(ctx, state_id, val)
+    return unicode(round(fixed, 1)).replace('.', ''), None
+
+
+def mps(ctx, state_id, val):
+    """ KPH (corrected) to whole meters per second (corrected.) """
+
+    fixed, ui_value = fix(ctx, state_id, val)
+    return fix(ctx, state_id, int(fixed * 0.277778))
+
+
+def mpsRoundedIcon(ctx, state_id, val):
+    fixed, ui_value = mps(ctx, state_id, val)
+    return unicode(round(fixed, 1)).replace('.', ''), None
+
+
+def iconText(ctx, state_id, val):
+    return u"{0}".format(val).replace('.', ''), None
+
+
+def hourlyMps(ctx, state_id, val):
+    return fix(ctx, state_id, u"{0}".format(float(val) * 0.277778))
+
+
+def hourlyMpsIcon(ctx, state_id, val):
+    return u"{0}".format(float(val) * 0.277778).replace('.', ''), None
+
+
+def speedIcon(ctx, state_id, val):
+    return unicode(val).replace('.', ''), None
+
+
+def dailyMps(ctx, state_id, val):
+    return fix(ctx, state_id, val * 0.277778)
+
+
+def dailyMpsIcon(ctx, state_id, val):
+    return unicode(val * 0.277778).replace('.', ''), None
+
+
+def tideSite(ctx, state_id, val):
+    if val in [u"", u" "]:
+        return u"No tide info.", None
+    return val, val
+
+
+def tideMinimum(ctx, state_id, val):
+    if val == 99:
+        return val, u"--"
+    return val, val
+
+
+def tideMaximum(ctx, state_id, val):
+    if val == -99:
+        return val, u"--"
+    return val, None
+
+
+@perDevice
+def itemListTemperature(ctx, state_id, val):
+    """ The temperature shown in the Indigo device list (onOffState.) """
+
+    plugin         = ctx.plugin
+    fmt            = ctx.format
+    temp_c, temp_f = [fix(ctx, state_id, temp)[0] for temp in val]
+    ui_units       = fmt.item_list_units
+
+    if ui_units == "M":  # Displays °C
+        display_value = u"{0} \N{DEGREE SIGN}C".format(plugin.itemListTemperatureFormat(fmt, val=temp_c))
+
+    elif ui_units == "S":  # Displays °F
+        display_value = u"{0} \N{DEGREE SIGN}F".format(plugin.itemListTemperatureFormat(fmt, val=temp_f))
+
+    elif ui_units == "SM":  # Displays °F (°C)
+        display_value = u"{0} \N{DEGREE SIGN}F ({1} \N{DEGREE SIGN}C)".format(plugin.itemListTemperatureFormat(fmt, val=temp_f), plugin.itemListTemperatureFormat(fmt, val=temp_c))
+
+    elif ui_units == "MS":  # Displays °C (°F)
+        display_value = u"{0} \N{DEGREE SIGN}C ({1} \N{DEGREE SIGN}F)".format(plugin.itemListTemperatureFormat(fmt, val=temp_c), plugin.itemListTemperatureFormat(fmt, val=temp_f))
+
+    elif ui_units == "MN":  # Displays C no units
+        display_value = plugin.itemListTemperatureFormat(fmt, temp_c)
+
+    else:  # Displays F no units
+        display_value = plugin.itemListTemperatureFormat(fmt, temp_f)
+
+    return True, display_value
+
+
+# ============================ Column conversions =============================
+# Column versions of the numeric conversions used by the tables of repeated
+# records. Each is called as column(ctx, state_ids, values) and returns a list
+# of (value, uiValue) tuples, the same as calling the conversion for each value.
+# Conversions without a column version are called for each value.
+
+def columnOf(convert):
+    """ Register the decorated function as the column version of convert. """
+
+    def register(column):
+        convert.column = column
+        return column
+    return register
+
+
+@columnOf(fix)
+def fixColumn(ctx, state_ids, values):
+    return wuColumns.fix(state_ids, values, log=ctx.plugin.debugLog)
+
+
+@columnOf(fixIntText)
+def fixIntTextColumn(ctx, state_ids, values):
+    return [(int(fixed), str(int(fixed))) for fixed, ui_value in fixColumn(ctx, state_ids, values)]
+
+
+@columnOf(hourlyMps)
+def hourlyMpsColumn(ctx, state_ids, values):
+    speeds = wuColumns.scale(values, 0.277778)
+    return fixColumn(ctx, state_ids, [val if val is None else u"{0}".format(val) for val in speeds])
+
+
+@columnOf(hourlyMpsIcon)
+def hourlyMpsIconColumn(ctx, state_ids, values):
+    speeds = wuColumns.scale(values, 0.277778)
+    return [(u"{0}".format(val if speed is None else speed).replace('.', ''), None) for val, speed in zip(values, speeds)]
+
+
+@columnOf(dailyMps)
+def dailyMpsColumn(ctx, state_ids, values):
+    return fixColumn(ctx, state_ids, wuColumns.scale(values, 0.277778))
+
+
+@columnOf(dailyMpsIcon)
+def dailyMpsIconColumn(ctx, state_ids, values):
+    speeds = wuColumns.scale(values, 0.277778)
+    return [(unicode(val if speed is None else speed).replace('.', ''), None) for val, speed in zip(values, speeds)]
+
+
+def columnFormatter(formatter):
+    """ Return a column version of a uiValue formatter that hasn't got one. """
+
+    def format_column(dev, state_names, values):
+        return [formatter(dev=dev, state_name=state_name, val=val) for state_name, val in zip(state_names, values)]
+    return format_column
+
+
+# ============================== Derived sources ==============================
+# Values built from more than one key. Each is called as source(ctx, record).
+
+def paths(*key_paths):
+    """ Return a source that reads several key paths into a tuple. """
+
+    getters = [wuPath.path(*keys) for keys in key_paths]
+
+    def source(ctx, record):
+        return tuple(getter(record) for getter in getters)
+    return source
+
+
+def _fixed(ctx, keys, record):
+    return ctx.plugin.fixCorruptedData(state_name=keys[-1], val=wuPath.path(*keys)(record))[0]
+
+
+def _fixedMps(ctx, keys, record):
+    return ctx.plugin.fixCorruptedData(state_name=keys[-1], val=int(_fixed(ctx, keys, record) * 0.277778))[0]
+
+
+def windKph(ctx, record):
+    return (wuPath.path('current_observation', 'wind_dir')(record),
+            _fixed(ctx, ('current_observation', 'wind_kph'), record),
+            _fixed(ctx, ('current_observation', 'wind_gust_kph'), record))
+
+
+def windMps(ctx, record):
+    return (wuPath.path('current_observation', 'wind_dir')(record),
+            _fixedMps(ctx, ('current_observation', 'wind_kph'), record),
+            _fixedMps(ctx, ('current_observation', 'wind_gust_kph'), record))
+
+
+def windMph(ctx, record):
+    return (wuPath.path('current_observation', 'wind_dir')(record),
+            _fixed(ctx, ('current_observation', 'wind_mph'), record),
+            _fixed(ctx, ('current_observation', 'wind_gust_mph'), record))
+
+
+def neighborhood(ctx, record):
+    """ Neighborhood for this weather location (string: "Neighborhood Name") """
+
+    station_id = wuPath.path('current_observation', 'station_id')(record)
+
+    for key in wuPath.path('location', 'nearby_weather_stations', 'pws', 'station')(record):
+        if key['id'] == unicode(station_id):
+            return key['neighborhood']
+
+    return u"Location not found."
+
+
+# ================================== Engine ===================================
+
+class Row(object):
+    """
+    One device state.
+
+    state_id -- Indigo state id. In a table of repeated records, {0} is
+                replaced by the slot number.
+    source   -- key path tuple, or a function called as source(ctx, record).
+    convert  -- conversion (see above.)
+    format   -- name of the plugin method used to format the uiValue.
+    units    -- configMenuUnits values the row applies to (None for all.)
+    when     -- {prop: values} the row needs.
+    unless   -- {prop: values} the row must not have.
+    """
+
+    def __init__(self, state_id, source, convert=raw, format=None, units=None, when=None, unless=None):
+        self.state_id = state_id
+        self.source   = source
+        self.convert  = convert
+        self.format   = format
+        self.when     = dict(when or {})
+        self.unless   = dict(unless or {})
+
+        if units is not None:
+            self.when['configMenuUnits'] = units
+
+    def applies(self, props):
+        """ Return True if the row applies to a device with these props. """
+
+        for prop, values in self.when.iteritems():
+            if props.get(prop, '') not in values:
+                return False
+
+        for prop, values in self.unless.iteritems():
+            if props.get(prop, '') in values:
+                return False
+
+        return True
+
+
+class Table(object):
+    """
+    A list of rows.
+
+    rows    -- the rows.
+    records -- key path of a list of records. If given, the rows are applied
+               to each record (up to slots of them.)
+    slots   -- number of records used.
+    slot_id -- format of the slot number in state ids.
+    """
+
+    def __init__(self, rows, records=None, slots=0, slot_id=u"{0}"):
+        self.rows      = rows
+        self.records   = records
+        self.slots     = slots
+        self.slot_id   = slot_id
+        self.state_ids = {}
+
+        if records is not None:
+            for row in rows:
+                self.state_ids[row.state_id] = slotIds(row.state_id, slots, slot_id)
+
+    def compile(self, plugin, props):
+        """ Return the CompiledTable for a device configuration. """
+
+        entries = []
+
+        for row in self.rows:
+            if not row.applies(props):
+                continue
+
+            if isinstance(row.source, tuple):
+                getter, derived = wuPath.path(*row.source), False
+            else:
+                getter, derived = row.source, True
+
+            formatter = getattr(plugin, row.format) if row.format else None
+            shared    = not getattr(row.convert, 'perDevice', False)
+
+            if self.records is None:
+                entries.append((row.state_id, getter, derived, row.convert, formatter, shared))
+                continue
+
+            # One state id per slot, and a column version of the formatter.
+            state_ids = self.state_ids[row.state_id]
+            if row.format:
+                formatter = getattr(plugin, row.format + 'Column', None) or columnFormatter(formatter)
+            entries.append((state_ids, getter, derived, row.convert, formatter, shared))
+
+        if self.records is None:
+            return CompiledTable(entries)
+
+        return CompiledTable(entries, wuPath.path(*self.records), self.slots)
+
+
+class CompiledTable(object):
+    """
+    A table compiled for one device configuration.
+
+    entries -- (state id, getter, derived, conversion, formatter, shared) for
+               each row. In a table of repeated records, the state id is a
+               tuple of state ids (one per slot) and the formatter formats
+               a column of uiValues.
+    records -- getter of the list of records (None for a single record.)
+    slots   -- number of records used.
+    """
+
+    def __init__(self, entries, records=None, slots=0):
+        self.entries = entries
+        self.records = records
+        self.slots   = slots
+
+    def evaluate(self, ctx, data, location_record=None):
+        """ Return a list of (state id, value, uiValue) for data. Converted
+        values are taken from (and added to) location_record, if given. """
+
+        if self.records is not None:
+            return self.evaluateColumns(ctx, data, location_record)
+
+        shared_values = location_record.values if location_record is not None else None
+        updates       = []
+        dev           = ctx.dev
+
+        for state_id, getter, derived, convert, formatter, shared in self.entries:
+
+            if shared and shared_values is not None:
+                key = (None, 0, getter, convert)
+
+                try:
+                    val, ui_value = shared_values[key]
+                    location_record.hits += 1
+
+                except KeyError:
+                    val = getter(ctx, data) if derived else getter(data)
+                    val, ui_value = shared_values[key] = convert(ctx, state_id, val)
+                    location_record.misses += 1
+
+            else:
+                val = getter(ctx, data) if derived else getter(data)
+                val, ui_value = convert(ctx, state_id, val)
+
+            if formatter is not None:
+                ui_value = formatter(dev=dev, state_name=state_id, val=ui_value)
+
+            updates.append((state_id, val, ui_value))
+
+        return updates
+
+    def evaluateColumns(self, ctx, data, location_record=None):
+        """ evaluate() for a table of repeated records, a column at a time. """
+
+        records = self.records(data, default=())
+        if not isinstance(records, list):
+            records = []
+
+        records = records[:self.slots]
+        count   = len(records)
+
+        shared_values = location_record.values if location_record is not None else None
+        updates       = []
+        dev           = ctx.dev
+
+        if not count:
+            return updates
+
+        for state_ids, getter, derived, convert, formatter, shared in self.entries:
+            state_ids = state_ids[:count]
+
+            if shared and shared_values is not None:
+                key = (self.records, None, getter, convert)
+
+                try:
+                    results = shared_values[key]
+                    location_record.hits += count
+
+                except KeyError:
+                    results = shared_values[key] = self.column(ctx, state_ids, getter, derived, convert, records)
+                    location_record.misses += count
+
+            else:
+                results = self.column(ctx, state_ids, getter, derived, convert, records)
+
+            values    = [result[0] for result in results]
+            ui_values = [result[1] for result in results]
+
+            if formatter is not None:
+                ui_values = formatter(dev=dev, state_names=state_ids, values=ui_values)
+
+            updates.extend(zip(state_ids, values, ui_values))
+
+        return updates
+
+    @staticmethod
+    def column(ctx, state_ids, getter, derived, convert, records):
+        """ Read one field from each record, and convert the column. """
+
+        if derived:
+            values = [getter(ctx, record) for record in records]
+        else:
+            values = [getter(record) for record in records]
+
+        column = getattr(convert, 'column', None)
+
+        if column is not None:
+            return column(ctx, state_ids, values)
+
+        return [convert(ctx, state_id, val) for state_id, val in zip(state_ids, values)]
+
+
+class LocationRecord(object):
+    """
+    Converted values for one location's weather data, shared by the devices at
+    the location. A record belongs to one download: when the location's data
+    are replaced, a new record is started.
+
+    data   -- the weather data the values were converted from.
+    values -- {(records, slot, source, conversion): (value, uiValue)}, or
+              {(records, None, source, conversion): [(value, uiValue), ...]}
+              for a column.
+    hits   -- values taken from the record.
+    misses -- values converted and added to the record.
+    """
+
+    def __init__(self, data):
+        self.data   = data
+        self.values = {}
+        self.hits   = 0
+        self.misses = 0
+
+
+# ================================== Tables ===================================
+
+kObservation = (
+    Row('currentObservation',      ('current_observation', 'observation_time')),
+    Row('currentObservationEpoch', ('current_observation', 'observation_epoch')),
+)
+
+kAlmanac = (
+    Table(kObservation + (
+        Row('airportCode',            ('almanac', 'airport_code')),
+        Row('currentObservation24hr', ('current_observation', 'observation_epoch'), observationTime),
+        Row('tempHighRecordYear',     ('almanac', 'temp_high', 'recordyear'), fixInt),
+        Row('tempLowRecordYear',      ('almanac', 'temp_low', 'recordyear'), fixInt),
+        Row('tempHighNormalC',        ('almanac', 'temp_high', 'normal', 'C'), fix, 'uiFormatTemperature'),
+        Row('tempHighNormalF',        ('almanac', 'temp_high', 'normal', 'F'), fix, 'uiFormatTemperature'),
+        Row('tempHighRecordC',        ('almanac', 'temp_high', 'record', 'C'), fix, 'uiFormatTemperature'),
+        Row('tempHighRecordF',        ('almanac', 'temp_high', 'record', 'F'), fix, 'uiFormatTemperature'),
+        Row('tempLowNormalC',         ('almanac', 'temp_low', 'normal', 'C'), fix, 'uiFormatTemperature'),
+        Row('tempLowNormalF',         ('almanac', 'temp_low', 'normal', 'F'), fix, 'uiFormatTemperature'),
+        Row('tempLowRecordC',         ('almanac', 'temp_low', 'record', 'C'), fix, 'uiFormatTemperature'),
+        Row('tempLowRecordF',         ('almanac', 'temp_low', 'record', 'F'), fix, 'uiFormatTemperature'),
+    )),
+)
+
+kAstronomy = (
+    Table(kObservation + (
+        Row('currentObservation24hr', ('current_observation', 'observation_epoch'), observationTime),
+        Row('ageOfMoon',              ('moon_phase', 'ageOfMoon')),
+        Row('currentTimeHour',        ('moon_phase', 'current_time', 'hour')),
+        Row('currentTimeMinute',      ('moon_phase', 'current_time', 'minute')),
+        Row('hemisphere',             ('moon_phase', 'hemisphere')),
+        Row('phaseOfMoon',            ('moon_phase', 'phaseofMoon')),
+        Row('phaseOfMoonIcon',        ('moon_phase', 'phaseofMoon'), underscore),
+        Row('percentIlluminated',     ('moon_phase', 'percentIlluminated'), floatText),
+        Row('sunriseHourMoonphase',   ('moon_phase', 'sunrise', 'hour')),
+        Row('sunriseHourSunphase',    ('sun_phase', 'sunrise', 'hour')),
+        Row('sunriseMinuteMoonphase', ('moon_phase', 'sunrise', 'minute')),
+        Row('sunriseMinuteSunphase',  ('sun_phase', 'sunrise', 'minute')),
+        Row('sunsetHourMoonphase',    ('moon_phase', 'sunset', 'hour')),
+        Row('sunsetHourSunphase',     ('sun_phase', 'sunset', 'hour')),
+        Row('sunsetMinuteMoonphase',  ('moon_phase', 'sunset', 'minute')),
+        Row('sunsetMinuteSunphase',   ('sun_phase', 'sunset', 'minute')),
+        Row('sunriseString',          paths(('moon_phase', 'sunrise', 'hour'), ('moon_phase', 'sunrise', 'minute')), clockString),
+        Row('sunsetString',           paths(('moon_phase', 'sunset', 'hour'), ('moon_phase', 'sunset', 'minute')), clockString),
+        Row('sunriseEpoch',           paths(('moon_phase', 'sunrise', 'hour'), ('moon_phase', 'sunrise', 'minute')), clockEpoch),
+        Row('sunsetEpoch',            paths(('moon_phase', 'sunset', 'hour'), ('moon_phase', 'sunset', 'minute')), clockEpoch),
+    )),
+)
+
+kHourly = (
+    Table(kObservation + (
+        Row('currentObservation24hr', ('current_observation', 'observation_epoch'), observationTimeText),
+    )),
+    Table((
+        Row(u"h{0}_cond",          ('condition',)),
+        Row(u"h{0}_icon",          ('icon',)),
+        Row(u"h{0}_proper_icon",   ('icon',)),
+        Row(u"h{0}_time",          ('FCTTIME', 'civil')),
+        Row(u"h{0}_windDirLong",   ('wdir', 'dir'), windNameValue),
+        Row(u"h{0}_windDegrees",   ('wdir', 'degrees'), intText),
+        Row(u"h{0}_timeLong",      paths(('FCTTIME', 'year'), ('FCTTIME', 'mon_padded'), ('FCTTIME', 'mday_padded'), ('FCTTIME', 'hour_padded'), ('FCTTIME', 'min')),
+            formatted(u"{0}-{1}-{2} {3}:{4}", ui=True)),
+        Row(u"h{0}_humidity",      ('humidity',), fix, 'uiFormatPercentage'),
+        Row(u"h{0}_precip",        ('pop',), fix, 'uiFormatPercentage'),
+        Row(u"h{0}_temp",          ('temp', 'metric'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row(u"h{0}_temp",          ('temp', 'english'), fix, 'uiFormatTemperature', units=('S',)),
+        Row(u"h{0}_windSpeed",     ('wspd', 'metric'), fix, 'uiFormatWind', units=('M',)),
+        Row(u"h{0}_windSpeedIcon", ('wspd', 'metric'), iconText, units=('M',)),
+        Row(u"h{0}_windSpeed",     ('wspd', 'metric'), hourlyMps, 'uiFormatWind', units=('MS',)),
+        Row(u"h{0}_windSpeedIcon", ('wspd', 'metric'), hourlyMpsIcon, units=('MS',)),
+        Row(u"h{0}_qpf",           ('qpf', 'metric'), fix, 'uiFormatRain', units=('M', 'MS')),
+        Row(u"h{0}_snow",          ('snow', 'metric'), fix, 'uiFormatSnow', units=('M', 'MS')),
+        Row(u"h{0}_qpf",           ('qpf', 'english'), fix, 'uiFormatRain', units=('I', 'S')),
+        Row(u"h{0}_snow",          ('snow', 'english'), fix, 'uiFormatSnow', units=('I', 'S')),
+        Row(u"h{0}_windSpeed",     ('wspd', 'english'), fix, 'uiFormatWind', units=('I', 'S')),
+        Row(u"h{0}_windSpeedIcon", ('wspd', 'english'), iconText, units=('I', 'S')),
+        Row(u"h{0}_windDir",       ('wdir', 'dir'), when={'configWindDirUnits': ('DIR',)}),
+        Row(u"h{0}_windDir",       ('wdir', 'degrees'), unless={'configWindDirUnits': ('DIR',)}),
+    ), records=('hourly_forecast',), slots=24, slot_id=u"{0:02d}"),
+)
+
+kTenDay = (
+    Table(kObservation + (
+        Row('currentObservation24hr', ('current_observation', 'observation_epoch'), observationTimeValue),
+    )),
+    Table((
+        Row(u"d{0}_conditions",    ('conditions',)),
+        Row(u"d{0}_day",           ('date', 'weekday')),
+        Row(u"d{0}_date",          ('date', 'epoch'), forecastDate),
+        Row(u"d{0}_pop",           ('pop',), fix, 'uiFormatPercentage'),
+        Row(u"d{0}_humidity",      ('maxhumidity',), fix, 'uiFormatPercentage'),
+        Row(u"d{0}_icon",          ('icon',), text),
+        Row(u"d{0}_windDegrees",   ('avewind', 'degrees'), fixIntText, when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windDir",       ('avewind', 'dir'), when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windDirLong",   ('avewind', 'dir'), windName, when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windDegrees",   ('maxwind', 'degrees'), fixIntText, unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windDir",       ('maxwind', 'dir'), unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windDirLong",   ('maxwind', 'dir'), windName, unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_high",          ('high', 'celsius'), fix, 'uiFormatTemperature', units=('I', 'M', 'MS')),
+        Row(u"d{0}_low",           ('low', 'celsius'), fix, 'uiFormatTemperature', units=('I', 'M', 'MS')),
+        Row(u"d{0}_qpf",           ('qpf_allday', 'mm'), fix, 'uiFormatRain', units=('M', 'MS')),
+        Row(u"d{0}_snow",          ('snow_allday', 'cm'), fix, 'uiFormatSnow', units=('M', 'MS')),
+        Row(u"d{0}_windSpeed",     ('avewind', 'kph'), fix, 'uiFormatWind', units=('M',), when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeedIcon", ('avewind', 'kph'), speedIcon, units=('M',), when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeed",     ('maxwind', 'kph'), fix, 'uiFormatWind', units=('M',), unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeedIcon", ('maxwind', 'kph'), speedIcon, units=('M',), unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeed",     ('avewind', 'kph'), dailyMps, 'uiFormatWind', units=('MS',), when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeedIcon", ('avewind', 'kph'), dailyMpsIcon, units=('MS',), when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeed",     ('maxwind', 'kph'), dailyMps, 'uiFormatWind', units=('MS',), unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeedIcon", ('maxwind', 'kph'), dailyMpsIcon, units=('MS',), unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_qpf",           ('qpf_allday', 'in'), fix, 'uiFormatRain', units=('I', 'S')),
+        Row(u"d{0}_snow",          ('snow_allday', 'in'), fix, 'uiFormatSnow', units=('I', 'S')),
+        Row(u"d{0}_windSpeed",     ('avewind', 'mph'), fix, 'uiFormatWind', units=('I', 'S'), when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeedIcon", ('avewind', 'mph'), speedIcon, units=('I', 'S'), when={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeed",     ('maxwind', 'mph'), fix, 'uiFormatWind', units=('I', 'S'), unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_windSpeedIcon", ('maxwind', 'mph'), speedIcon, units=('I', 'S'), unless={'configWindSpdUnits': ('AVG',)}),
+        Row(u"d{0}_high",          ('high', 'fahrenheit'), fix, 'uiFormatTemperature', units=('S',)),
+        Row(u"d{0}_low",           ('low', 'fahrenheit'), fix, 'uiFormatTemperature', units=('S',)),
+    ), records=('forecast', 'simpleforecast', 'forecastday'), slots=10, slot_id=u"{0:02d}"),
+)
+
+kTides = (
+    Table(kObservation + (
+        Row('currentObservation24hr', ('current_observation', 'observation_epoch'), observationTimeValue),
+        Row('tideSite',               ('tide', 'tideInfo', 'tideSite'), tideSite),
+        Row('minHeight',              ('tide', 'tideSummaryStats', 'minheight'), tideMinimum),
+        Row('maxHeight',              ('tide', 'tideSummaryStats', 'maxheight'), tideMaximum),
+    )),
+    Table((
+        Row(u"p{0}_height", ('data', 'height')),
+        Row(u"p{0}_pretty", ('date', 'pretty')),
+        Row(u"p{0}_type",   ('data', 'type')),
+    ), records=('tide', 'tideSummary'), slots=31),
+)
+
+kWeather = (
+    Table(kObservation + (
+        Row('temp',                   ('current_observation', 'temp_c'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row('tempIcon',               ('current_observation', 'temp_c'), temperatureIcon, units=('M', 'MS', 'I')),
+        Row('temp',                   ('current_observation', 'temp_f'), fix, 'uiFormatTemperature', unless={'configMenuUnits': ('M', 'MS', 'I')}),
+        Row('tempIcon',               ('current_observation', 'temp_f'), temperatureIcon, unless={'configMenuUnits': ('M', 'MS', 'I')}),
+        Row('onOffState',             paths(('current_observation', 'temp_c'), ('current_observation', 'temp_f')), itemListTemperature),
+        Row('locationCity',           ('location', 'city')),
+        Row('stationID',              ('current_observation', 'station_id')),
+        Row('neighborhood',           neighborhood),
+        Row('properIconNameAllDay',   ('current_observation', 'icon')),
+        Row('properIconName',         ('current_observation', 'icon')),
+        Row('currentObservation24hr', ('current_observation', 'observation_epoch'), observationTimeValue),
+        Row('currentWeather',         ('current_observation', 'weather')),
+        Row('pressureTrend',          ('current_observation', 'pressure_trend'), pressureSymbol),
+        Row('solarradiation',         ('current_observation', 'solarradiation'), fix),
+        Row('uv',                     ('current_observation', 'UV'), fix),
+        Row('windDIR',                ('current_observation', 'wind_dir')),
+        Row('windDIRlong',            ('current_observation', 'wind_dir'), windName),
+        Row('windDegrees',            ('current_observation', 'wind_degrees'), fixIntText),
+        Row('relativeHumidity',       ('current_observation', 'relative_humidity'), percentString, 'uiFormatPercentage'),
+
+        # History (yesterday's weather.)
+        Row('historyDate',            ('history', 'dailysummary', 'date', 'pretty'), value),
+        Row('historyHigh',            ('history', 'dailysummary', 'maxtempm'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row('historyLow',             ('history', 'dailysummary', 'mintempm'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row('historyPop',             ('history', 'dailysummary', 'precipm'), fix, 'uiFormatRain', units=('M', 'MS')),
+        Row('historyPop',             ('history', 'dailysummary', 'precipi'), fix, 'uiFormatRain', units=('I', 'S')),
+        Row('historyHigh',            ('history', 'dailysummary', 'maxtempi'), fix, 'uiFormatTemperature', units=('S',)),
+        Row('historyLow',             ('history', 'dailysummary', 'mintempi'), fix, 'uiFormatTemperature', units=('S',)),
+
+        # Metric (M), Mixed SI (MS), Mixed (I):
+        Row('dewpoint',               ('current_observation', 'dewpoint_c'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row('feelslike',              ('current_observation', 'feelslike_c'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row('heatIndex',              ('current_observation', 'heat_index_c'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row('windchill',              ('current_observation', 'windchill_c'), fix, 'uiFormatTemperature', units=('M', 'MS', 'I')),
+        Row('visibility',             ('current_observation', 'visibility_km'), visibility, units=('M', 'MS', 'I')),
+        Row('pressure',               ('current_observation', 'pressure_mb'), pressure, units=('M', 'MS', 'I')),
+        Row('pressureIcon',           ('current_observation', 'pressure_mb'), pressureIconMetric, units=('M', 'MS', 'I')),
+
+        # Metric (M), Mixed SI (MS):
+        Row('precip_today',           ('current_observation', 'precip_today_metric'), fix, 'uiFormatRain', units=('M', 'MS')),
+        Row('precip_1hr',             ('current_observation', 'precip_1hr_metric'), fix, 'uiFormatRain', units=('M', 'MS')),
+
+        # Winds in KPH (M) or MPS (MS). 1 KPH = 0.277778 MPS
+        Row('windGust',               ('current_observation', 'wind_gust_kph'), fix, 'uiFormatWind', units=('M',)),
+        Row('windSpeed',              ('current_observation', 'wind_kph'), fix, 'uiFormatWind', units=('M',)),
+        Row('windGustIcon',           ('current_observation', 'wind_gust_kph'), roundedIcon, units=('M',)),
+        Row('windSpeedIcon',          ('current_observation', 'wind_kph'), roundedIcon, units=('M',)),
+        Row('windString',             windKph, formatted(u"From the {0} at {1} KPH Gusting to {2} KPH"), units=('M',)),
+        Row('windShortString',        windKph, formatted(u"{0} at {1}"), units=('M',)),
+        Row('windStringMetric',       windKph, formatted(u"From the {0} at {1} KPH Gusting to {2} KPH"), units=('M',)),
+        Row('windGust',               ('current_observation', 'wind_gust_kph'), mps, 'uiFormatWind', units=('MS',)),
+        Row('windSpeed',              ('current_observation', 'wind_kph'), mps, 'uiFormatWind', units=('MS',)),
+        Row('windGustIcon',           ('current_observation', 'wind_gust_kph'), mpsRoundedIcon, units=('MS',)),
+        Row('windSpeedIcon',          ('current_observation', 'wind_kph'), mpsRoundedIcon, units=('MS',)),
+        Row('windString',             windMps, formatted(u"From the {0} at {1} MPS Gusting to {2} MPS"), units=('MS',)),
+        Row('windShortString',        windMps, formatted(u"{0} at {1}"), units=('MS',)),
+        Row('windStringMetric',       windMps, formatted(u"From the {0} at {1} KPH Gusting to {2} KPH"), units=('MS',)),
+
+        # Mixed (I), Standard (S):
+        Row('precip_today',           ('current_observation', 'precip_today_in'), fix, 'uiFormatRain', units=('I', 'S')),
+        Row('precip_1hr',             ('current_observation', 'precip_1hr_in'), fix, 'uiFormatRain', units=('I', 'S')),
+        Row('windGust',               ('current_observation', 'wind_gust_mph'), fix, 'uiFormatWind', units=('I', 'S')),
+        Row('windSpeed',              ('current_observation', 'wind_mph'), fix, 'uiFormatWind', units=('I', 'S')),
+        Row('windGustIcon',           ('current_observation', 'wind_gust_mph'), roundedIcon, units=('I', 'S')),
+        Row('windSpeedIcon',          ('current_observation', 'wind_mph'), roundedIcon, units=('I', 'S')),
+        Row('windString',             windMph, formatted(u"From the {0} at {1} MPH Gusting to {2} MPH"), units=('I', 'S')),
+        Row('windShortString',        windKph, formatted(u"{0} at {1}"), units=('I', 'S')),
+        Row('windStringMetric',       ('current_observation', 'wind_dir'), constant(u" "), units=('I', 'S')),
+
+        # Standard (S):
+        Row('dewpoint',               ('current_observation', 'dewpoint_f'), fix, 'uiFormatTemperature', units=('S',)),
+        Row('feelslike',              ('current_observation', 'feelslike_f'), fix, 'uiFormatTemperature', units=('S',)),
+        Row('heatIndex',              ('current_observation', 'heat_index_f'), fix, 'uiFormatTemperature', units=('S',)),
+        Row('windchill',              ('current_observation', 'windchill_f'), fix, 'uiFormatTemperature', units=('S',)),
+        Row('pressure',               ('current_observation', 'pressure_in'), pressure, units=('S',)),
+        Row('pressureIcon',           ('current_observation', 'pressure_in'), pressureIconStandard, units=('S',)),
+        Row('visibility',             ('current_observation', 'visibility_mi'), visibility, units=('S',)),
+    )),
+)
+
+# Tables by name (see Plugin.stateTable().)
+kStateTables = {
+    'almanac':   kAlmanac,
+    'astronomy': kAstronomy,
+    'hourly':    kHourly,
+    'tenDay':    kTenDay,
+    'tides':     kTides,
+    'weather':   kWeather,
+}
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuTransport.py
+Author: DaveL17
+
+The Transport class holds the single HTTP session that the WUnderground plugin
+uses for all of its outbound traffic (weather data, radar images, satellite
+images.) The session keeps connections alive between calls, so each refresh
+cycle reuses the connections opened during the previous one instead of paying
+for a new TCP (and TLS) handshake per request.
+
+Failed requests (connection errors, timeouts and 5xx responses) are retried a
+limited number of times with exponential backoff. Each delay is randomized
+(jitter) so that many requests failing together don't all retry at the same
+moment.
+
+Weather Underground API calls are not retried here (they are made with
+retries=0): every try is counted against the API key, so getLocationData()
+retries through the plugin's call limits instead. Transport retries are for
+images and the update check, which carry no quota.
+"""
+
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Transport"
+__version__ = "0.1.00"
+
+# Raised for any failed request (connection, timeout, too many retries...)
+TransportError = requests.exceptions.RequestException
+
+# Response codes that are worth another try.
+kRetryStatus = (500, 502, 503, 504)
+
+# Failures where the request didn't reach the server, so another try can't be a second call against the quota. (A
+# request that timed out waiting for the response may already have been counted.)
+RetrySafeError = requests.exceptions.ConnectionError
+
+
+class Transport(object):
+    """
+    Keep-alive HTTP transport shared by the whole plugin.
+
+    pool_connections -- number of hosts to keep connection pools for.
+    pool_maxsize     -- number of connections kept open to each host. Requests
+                        beyond this wait for a free connection.
+    retries          -- number of times a failed connection or a 5xx response
+                        is retried before the request fails.
+    backoff_factor   -- base delay between retries (0.5, 1, 2... seconds), each
+                        randomized by +/- 50%.
+    backoff_max      -- longest delay between retries (seconds.)
+    """
+
+    def __init__(self, plugin, pool_connections=4, pool_maxsize=8, retries=2, backoff_factor=0.5, backoff_max=8):
+        self.plugin         = plugin
+        self.retries        = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max    = backoff_max
+
+        # Retries are handled by get(), not by urllib3.
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              max_retries=0,
+                              pool_block=True,
+                              )
+
+        self.session = requests.Session()
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate',
+                                     'User-Agent': u"{0}/{1}".format(plugin.pluginDisplayName, plugin.pluginVersion),
+                                     })
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def backoff(self, attempt):
+        """ Return the delay before retry number attempt (1, 2...) """
+
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.5)
+
+    def get(self, url, timeout=10, stream=False, headers=None, retries=None):
+        """
+        Issue a GET request over the pooled session and return the response.
+        Connection errors, timeouts and 5xx responses are retried (see
+        backoff()). If the last try returns a 5xx response, that response is
+        returned. Streamed responses must be read to the end (or closed) to
+        return the connection to the pool.
+        """
+
+        if retries is None:
+            retries = self.retries
+
+        attempt = 0
+
+        while True:
+            try:
+                response = self.session.get(url, timeout=timeout, stream=stream, headers=headers)
+
+                if response.status_code not in kRetryStatus or attempt >= retries:
+                    return response
+
+                response.close()
+
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= retries:
+                    raise
+
+            attempt += 1
+            time.sleep(self.backoff(attempt))
+
+    def close(self):
+        """ Close all pooled connections. """
+
+        self.session.close()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+wuUpdate.py
+Author: DaveL17
+
+The UpdateChecker class looks for a new release of the plugin. It reads the
+same version file as the DLFramework indigoPluginUpdateChecker module (and
+keeps its interface: checkVersionPoll() and checkVersionNow()) but:
+  - the file is requested over the plugin's shared HTTP transport, instead of
+    starting a curl process and changing the default timeout of every socket
+    in the plugin process.
+  - the request is conditional. The ETag/Last-Modified of the last download
+    and the file itself are kept in the plugin prefs, so an unchanged file is
+    not downloaded again (and is still available if the server can't be
+    reached.)
+  - each check runs on a background thread, so a check never holds up a
+    weather refresh.
+
+The version file looks like this (the email lines are optional):
+
+    Version: 6.0.09
+    EmailSubject: WUnderground Plugin Update
+    EmailBody: The WUnderground Plugin has been updated.
+    ...
+"""
+
+import threading
+import time
+
+try:
+    import indigo
+except ImportError:
+    pass
+
+__author__ = "DaveL17"
+__title__ = "WUnderground Update Checker"
+__version__ = "0.1.00"
+
+
+def versionTuple(version):
+    """ Return a version string ('6.0.09') as a tuple of ints so that versions
+    compare numerically (6.0.10 is newer than 6.0.9.) Parts that aren't
+    numbers compare as 0. """
+
+    parts = []
+
+    for part in u"{0}".format(version).strip().split(u"."):
+        try:
+            parts.append(int(part))
+        except ValueError:
+            parts.append(0)
+
+    return tuple(parts)
+
+
+class UpdateChecker(object):
+    """
+    Background plugin update checker.
+
+    plugin              -- the plugin instance.
+    file_url            -- URL of the version file.
+    transport           -- the plugin's wuTransport.Transport.
+    days_between_checks -- days between automatic checks (see
+                           checkVersionPoll().)
+    """
+
+    def __init__(self, plugin, file_url, transport, days_between_checks=1):
+        self.plugin                   = plugin
+        self.fileUrl                  = file_url
+        self.transport                = transport
+        self.lock                     = threading.Lock()
+        self.thread                   = None
+        self.secondsBetweenAutoChecks = days_between_checks * 86400
+        self.nextCheck                = float(self.plugin.pluginPrefs.get('updaterLastCheck', '0')) + self.secondsBetweenAutoChecks
+
+    def errorLog(self, log):
+        """ Write log to the Indigo log as an error. """
+
+        indigo.server.log(log, isError=True)
+
+    def checkVersionPoll(self):
+        """ Start a check if none has been made within the check period. """
+
+        if time.time() > self.nextCheck:
+            self.checkVersionNow()
+
+    def checkVersionNow(self):
+        """ Start a check on a background thread. Returns at once. A check
+        that is already running is not started again. """
+
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                self.plugin.debugLog(u"versionCheck: A check is already running.")
+                return
+
+            # Save the last check time (now) so a failing server isn't asked again until the next period.
+            time_now = time.time()
+            self.plugin.pluginPrefs[u'updaterLastCheck'] = time_now
+            self.nextCheck = time_now + self.secondsBetweenAutoChecks
+
+            self.thread = threading.Thread(target=self.run, name=u"WUnderground update check")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def run(self):
+        """ Check thread. """
+
+        try:
+            self.checkVersion()
+        except Exception:
+            self.errorLog(u"versionCheck: Error checking for a new version of the plugin.")
+
+    def fetchVersionFile(self):
+        """ Return the text of the version file. The cached copy is used if the
+        server reports that the file hasn't changed, or can't be reached.
+        Returns None if there is neither. """
+
+        prefs   = self.plugin.pluginPrefs
+        cached  = prefs.get(u'updaterVersionFile', u"")
+        headers = {}
+
+        if cached:
+            if prefs.get(u'updaterETag'):
+                headers['If-None-Match'] = prefs[u'updaterETag']
+            if prefs.get(u'updaterLastModified'):
+                headers['If-Modified-Since'] = prefs[u'updaterLastModified']
+
+        self.plugin.debugLog(u"versionCheck: Version Server Url: {0}".format(self.fileUrl))
+
+        try:
+            response = self.transport.get(self.fileUrl, timeout=10, headers=headers)
+        except Exception:
+            self.errorLog(u"versionCheck: Unable to reach the version server.")
+            return cached or None
+
+        try:
+            if response.status_code == 304:
+                self.plugin.debugLog(u"versionCheck: The version file hasn't changed.")
+                return cached
+
+            if response.status_code != 200:
+                self.errorLog(u"versionCheck: The version server returned status {0}.".format(response.status_code))
+                return cached or None
+
+            text = response.text
+            prefs[u'updaterVersionFile']  = text
+            prefs[u'updaterETag']         = response.headers.get('ETag', u"")
+            prefs[u'updaterLastModified'] = response.headers.get('Last-Modified', u"")
+            return text
+
+        finally:
+            response.close()
+
+    def checkVersion(self):
+        """ Compare the version on the server with ours, and email the user
+        about a new release if they have asked for it. Runs on the check
+        thread. """
+
+        self.plugin.debugLog(u"versionCheck: Started")
+
+        my_version = u"{0}".format(self.plugin.pluginVersion)
+        text       = self.fetchVersionFile()
+
+        if text is None:
+            return
+
+        # Parse the file
+        lines = text.split(u"\n")
+        if lines[0].startswith(u"Version:"):
+            latest_version = lines[0][8:].strip()
+        else:
+            self.plugin.debugLog(u'versionCheck: The version file does not start with "Version:"')
+            self.errorLog(u"versionCheck: There was an error parsing the server's version file.")
+            return
+
+        # Compare the version in the server file to ours
+        if versionTuple(my_version) < versionTuple(latest_version):
+            self.errorLog(u"You are running v{0}. A newer version, v{1} is available.".format(my_version, latest_version))
+        else:
+            indigo.server.log(u"Your plugin version, v{0}, is current.".format(my_version))
+            return
+
+        # Email the user (only once per release, and only if they want to be told.)
+        email_address = self.plugin.pluginPrefs.get(u'updaterEmail', u"")
+
+        if self.plugin.pluginPrefs.get(u'updaterEmailsEnabled', True) is False:
+            email_address = u""
+
+        if len(email_address) == 0:
+            self.plugin.debugLog(u"versionCheck: No email address for updates found in the config.")
+            return
+
+        if self.plugin.pluginPrefs.get(u'updaterLastVersionEmailed', u"0") == latest_version:
+            self.plugin.debugLog(u"versionCheck: We already emailed the user about this version, exiting.")
+            return
+
+        if len(lines) < 3 or not lines[1].startswith(u"EmailSubject:") or not lines[2].startswith(u"EmailBody:"):
+            self.plugin.debugLog(u"versionCheck: No email data found in the file, exiting.")
+            return
+
+        email_subject = lines[1][13:].strip()
+        email_body    = lines[2][10:].lstrip() + u"\n" + u"\n".join(lines[3:]) + u"\n"
+
+        indigo.server.log(u"Emailing the user about the new version.")
+
+        # Save this version as the last one emailed in the prefs
+        self.plugin.pluginPrefs[u'updaterLastVersionEmailed'] = latest_version
+
+        try:
+            indigo.server.sendEmailTo(email_address, subject=email_subject, body=email_body)
+        except Exception:
+            self.errorLog(u"versionCheck: Unable to email the user about the new version.")